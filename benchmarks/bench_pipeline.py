@@ -0,0 +1,211 @@
+"""
+整条流程的性能测试：用合成字幕和模拟 ffprobe（不需要真实视频），按集数规模分别计时
+
+用法:
+    python benchmarks/bench_pipeline.py [--episodes 10,100,1000,5000] [--cues 200] [--ffprobe-latency 0]
+                                        [--workers 8] [--repeat 1] [--output result.json] [--compare baseline.json]
+
+各规模依次计时以下阶段（与界面操作对应的引擎方法）:
+    update_file_lists                   扫描并排序文件、建立匹配索引（界面「更新文件列表」，引擎 scan_file_lists）
+    scan_video_durations                并发探测全部视频的帧数和时长（不使用探测缓存，每个视频都调用一次 ffprobe）
+    check_subtitle_problems_after_scan  解析全部字幕，检查时间轴乱序和超出时长
+    merge_subtitles                     合并全部字幕并写出（界面 _merge_srt_files_thread 调用的方法）
+    remerge_unchanged                   文件都没变时再次合并到同一输出（复用上次的逐集结果）
+
+结果以 JSON 输出（--output，默认打印到标准输出），包含环境信息、参数和每个规模的各阶段耗时（秒）及计数；
+--compare 指定以前的结果文件时，另外打印各阶段耗时的变化倍数，便于比较不同版本。
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+import subtitle_engine as tool
+from fake_ffprobe import install_fake_ffprobe
+from synthetic_data import DEFAULT_ENCODINGS, generate_dataset, parse_encodings
+
+STAGES = ('update_file_lists', 'scan_video_durations', 'check_subtitle_problems_after_scan', 'merge_subtitles', 'remerge_unchanged')
+
+
+class BenchEngine(tool.SubtitleMergeEngine):
+    """不输出日志的引擎（--verbose 时照常写到标准错误）"""
+    verbose = False
+
+    def log_message(self, message, level=tool.LOG_INFO):
+        if self.verbose:
+            tool.SubtitleMergeEngine.log_message(self, message, level)
+
+
+def git_revision():
+    """当前代码的 git 版本（不在 git 仓库中时为 None）"""
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], cwd=os.path.dirname(BENCH_DIR),
+                              capture_output=True, text=True, check=True).stdout.strip() or None
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def count_lines(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return sum(1 for _ in f)
+    except OSError:
+        return 0
+
+
+def run_scenario(data, ffprobe_path, call_log, args):
+    """
+    对一份数据依次执行各阶段一次
+
+    返回: ({阶段: 秒}, 计数dict)
+    """
+    engine = BenchEngine(ffprobe_path, use_probe_cache=False)
+    engine.video_folder, engine.srt_folder = data['video_dir'], data['srt_dir']
+    engine.backup = False
+    if args.workers:
+        engine.probe_workers = engine.parse_workers = args.workers
+    timings = {}
+    open(call_log, 'w').close()
+
+    start = time.perf_counter()
+    engine.scan_file_lists()
+    timings['update_file_lists'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    engine.scan_video_durations()
+    timings['scan_video_durations'] = time.perf_counter() - start
+    ffprobe_calls = count_lines(call_log)
+
+    start = time.perf_counter()
+    time_disorder, large_time_diff = engine.check_subtitle_problems_after_scan()
+    timings['check_subtitle_problems_after_scan'] = time.perf_counter() - start
+
+    output_path = os.path.join(data['root'], '输出', '合并字幕.srt')
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    # 合并使用全新的解析缓存，与界面中先检查再合并（解析结果复用）不同，这里单独计入解析成本
+    engine.subtitle_cache = tool.ParsedSubtitleCache()
+    start = time.perf_counter()
+    result = engine.merge_subtitles(output_path, engine.video_files_data, 1, data['episodes'], show_completion_dialog=False)
+    timings['merge_subtitles'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    remerge = engine.merge_subtitles(output_path, engine.video_files_data, 1, data['episodes'], show_completion_dialog=False)
+    timings['remerge_unchanged'] = time.perf_counter() - start
+
+    counts = {
+        'videos': len(engine.video_files_data),
+        'subtitles': len(engine.srt_files_data),
+        'srt_bytes': data['srt_bytes'],
+        'ffprobe_calls': ffprobe_calls,
+        'time_disorder': len(time_disorder),
+        'large_time_diff': len(large_time_diff),
+        'merge_status': result['status'],
+        'cues_written': result['cue_count'],
+        'skipped': len(result['skipped']),
+        'remerge_reused': remerge['reused_count'],
+    }
+    if result['status'] != 'ok' or remerge['status'] != 'ok':
+        counts['error'] = result.get('error') or remerge.get('error')
+    return timings, counts
+
+
+def run_benchmarks(args):
+    results = {
+        'tool': 'subtitle_engine',
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': tool.np is not None,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'parameters': {'cues': args.cues, 'encodings': list(args.encodings), 'ffprobe_latency': args.ffprobe_latency,
+                       'workers': args.workers, 'repeat': args.repeat, 'disorder_rate': args.disorder_rate,
+                       'overlong_rate': args.overlong_rate, 'broken_rate': args.broken_rate},
+        'scenarios': [],
+    }
+    with tempfile.TemporaryDirectory(prefix='subtitle_bench_') as temp_dir:
+        ffprobe_path = install_fake_ffprobe(temp_dir)
+        call_log = os.path.join(temp_dir, 'ffprobe_calls.log')
+        os.environ['FAKE_FFPROBE_LATENCY'] = str(args.ffprobe_latency)
+        os.environ['FAKE_FFPROBE_CALL_LOG'] = call_log
+        for episodes in args.episodes:
+            root = os.path.join(temp_dir, f'ep{episodes}')
+            start = time.perf_counter()
+            data = generate_dataset(root, episodes, args.cues, args.encodings, args.disorder_rate,
+                                    args.overlong_rate, args.broken_rate)
+            data['root'] = root
+            generate_seconds = time.perf_counter() - start
+            best = {}
+            for _ in range(args.repeat):
+                timings, counts = run_scenario(data, ffprobe_path, call_log, args)
+                for stage, seconds in timings.items():
+                    best[stage] = min(seconds, best.get(stage, seconds))
+            scenario = {'episodes': episodes, 'generate_seconds': round(generate_seconds, 4),
+                        'seconds': {stage: round(best[stage], 4) for stage in STAGES}, 'counts': counts}
+            results['scenarios'].append(scenario)
+            print(f"{episodes:>6} 集: " + '，'.join(f"{stage} {best[stage]:.3f}s" for stage in STAGES), file=sys.stderr)
+    return results
+
+
+def print_comparison(results, baseline):
+    """打印与以前结果的对比（>1 表示变慢）"""
+    old_scenarios = {scenario['episodes']: scenario for scenario in baseline.get('scenarios', ())}
+    print(f"与 {baseline.get('revision') or '以前的结果'} 对比（当前耗时 / 以前耗时）:", file=sys.stderr)
+    for scenario in results['scenarios']:
+        old = old_scenarios.get(scenario['episodes'])
+        if old is None:
+            continue
+        ratios = []
+        for stage in STAGES:
+            new_seconds, old_seconds = scenario['seconds'].get(stage), old.get('seconds', {}).get(stage)
+            if new_seconds is not None and old_seconds:
+                ratios.append(f"{stage} {new_seconds / old_seconds:.2f}x")
+        print(f"{scenario['episodes']:>6} 集: " + '，'.join(ratios), file=sys.stderr)
+
+
+def parse_episode_counts(text):
+    counts = [int(item) for item in text.split(',') if item.strip()]
+    if not counts or min(counts) < 1:
+        raise argparse.ArgumentTypeError('集数必须是正整数，如 10,100,1000')
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='合成数据的整条流程性能测试（模拟ffprobe，不需要真实视频）')
+    parser.add_argument('--episodes', type=parse_episode_counts, default=[10, 100, 1000, 5000], help='集数规模，逗号分隔')
+    parser.add_argument('--cues', type=int, default=200, help='每集字幕条数')
+    parser.add_argument('--encodings', type=parse_encodings, default=DEFAULT_ENCODINGS, help='字幕编码，逗号分隔，按集轮流使用')
+    parser.add_argument('--disorder-rate', type=float, default=0.02, help='时间轴乱序的字幕比例')
+    parser.add_argument('--overlong-rate', type=float, default=0.02, help='结尾超出视频时长的字幕比例')
+    parser.add_argument('--broken-rate', type=float, default=0.01, help='无法解码的字幕比例')
+    parser.add_argument('--ffprobe-latency', type=float, default=0.0, help='模拟ffprobe每次调用的额外延迟（秒）')
+    parser.add_argument('--workers', type=int, help='探测和解析的并发数，默认等于CPU核心数')
+    parser.add_argument('--repeat', type=int, default=1, help='每个规模重复次数（各阶段取最快一次）')
+    parser.add_argument('--output', help='结果JSON文件，默认输出到标准输出')
+    parser.add_argument('--compare', help='以前的结果JSON文件，打印各阶段耗时的变化')
+    parser.add_argument('--verbose', action='store_true', help='输出引擎日志')
+    args = parser.parse_args()
+    args.repeat = max(1, args.repeat)
+    BenchEngine.verbose = args.verbose
+
+    results = run_benchmarks(args)
+    results_text = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(results_text + '\n')
+    else:
+        print(results_text)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            print_comparison(results, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
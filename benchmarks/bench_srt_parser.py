@@ -0,0 +1,96 @@
+"""
+字幕解析性能对比：内置SRT解析器（文本 / 直通字节）vs pysrt
+
+用法:
+    python benchmarks/bench_srt_parser.py [--cues 20000] [--repeat 5]
+
+会在临时目录生成 UTF-8 / UTF-8(BOM) / GBK 三种大字幕文件，分别计时。
+pysrt 按旧流程计时：先按UTF-8解析，失败再按GBK重新读取解析。需要先 pip install pysrt。
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import subtitle_engine as tool
+
+
+def format_time(ms):
+    return '%02d:%02d:%02d,%03d' % (ms // 3600000, ms % 3600000 // 60000, ms % 60000 // 1000, ms % 1000)
+
+
+def write_srt(path, cue_count, encoding, bom=False):
+    """生成测试字幕：中英双语两行，CRLF换行"""
+    rng = random.Random(cue_count)
+    blocks = []
+    ms = 0
+    for index in range(1, cue_count + 1):
+        ms += rng.randint(200, 1500)
+        end = ms + rng.randint(800, 4000)
+        blocks.append(f"{index}\r\n{format_time(ms)} --> {format_time(end)}\r\n第{index}句台词，测试字幕内容\r\nLine {index}: sample subtitle text\r\n\r\n")
+        ms = end
+    data = ''.join(blocks).encode(encoding)
+    with open(path, 'wb') as f:
+        f.write((b'\xef\xbb\xbf' if bom else b'') + data)
+
+
+def time_it(func, repeat):
+    """返回最短一次耗时（秒）"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def pysrt_load(pysrt, path):
+    try:
+        return pysrt.open(path, encoding='utf-8')
+    except UnicodeDecodeError:
+        return pysrt.open(path, encoding='gbk')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='内置SRT解析器与pysrt性能对比')
+    parser.add_argument('--cues', type=int, default=20000, help='每个测试文件的字幕条数')
+    parser.add_argument('--repeat', type=int, default=5, help='每项重复次数（取最快一次）')
+    args = parser.parse_args()
+
+    try:
+        import pysrt
+    except ImportError:
+        pysrt = None
+        print('未安装 pysrt，只测试内置解析器')
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cases = [('UTF-8', 'utf-8', False), ('UTF-8 BOM', 'utf-8', True), ('GBK', 'gbk', False)]
+        print(f"{'文件':<12}{'大小MB':>8}{'内置(秒)':>10}{'直通(秒)':>10}{'pysrt(秒)':>11}{'加速':>8}")
+        for name, encoding, bom in cases:
+            path = os.path.join(temp_dir, f'{encoding}_{int(bom)}.srt')
+            write_srt(path, args.cues, encoding, bom)
+            size_mb = os.path.getsize(path) / 1024 / 1024
+
+            native_time = time_it(lambda: tool.read_srt_file(path), args.repeat)
+            raw_time = time_it(lambda: tool.read_srt_file_raw(path), args.repeat)
+            if pysrt is None:
+                print(f"{name:<12}{size_mb:>8.2f}{native_time:>10.3f}{raw_time:>10.3f}{'-':>11}{'-':>8}")
+                continue
+            pysrt_time = time_it(lambda: pysrt_load(pysrt, path), args.repeat)
+
+            # 结果一致性校验
+            timeline, _ = tool.read_srt_file(path)
+            subs = pysrt_load(pysrt, path)
+            same = (len(timeline) == len(subs) and
+                    all(int(s) == sub.start.ordinal and int(e) == sub.end.ordinal and t == sub.text
+                        for s, e, t, sub in zip(timeline.starts, timeline.ends, timeline.texts, subs)))
+            print(f"{name:<12}{size_mb:>8.2f}{native_time:>10.3f}{raw_time:>10.3f}{pysrt_time:>11.3f}{pysrt_time / native_time:>7.1f}x"
+                  + ('' if same else '  (结果不一致!)'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+模拟 ffprobe：按文件名返回确定的帧数和帧率，不读取视频内容，用于没有真实视频时的性能测试
+
+用法（一般由 bench_pipeline.py 通过 install_fake_ffprobe() 生成的启动脚本调用）:
+    python benchmarks/fake_ffprobe.py -v error -select_streams v:0 -show_streams -show_format -of json EP1.mkv
+
+环境变量:
+    FAKE_FFPROBE_LATENCY: 每次调用额外等待的秒数，模拟真实ffprobe或网络盘的延迟（默认0）
+    FAKE_FFPROBE_CALL_LOG: 设置后每次调用向该文件追加一行，用于统计调用次数
+"""
+import json
+import os
+import stat
+import sys
+import time
+import zlib
+
+
+def video_info(filename):
+    """
+    按文件名得到确定的视频参数（与文件内容无关，生成测试字幕时也用它计算时长）
+
+    返回: (总帧数, 帧率分子, 帧率分母)，时长约 20~30 分钟
+    """
+    h = zlib.crc32(os.path.basename(filename).encode('utf-8'))
+    frames = 30000 + h % 15000
+    fps_num, fps_den = (30000, 1001) if h % 2 else (25, 1)
+    return frames, fps_num, fps_den
+
+
+def video_duration(filename):
+    """按帧数和帧率计算的视频时长（秒）"""
+    frames, fps_num, fps_den = video_info(filename)
+    return frames * fps_den / fps_num
+
+
+def install_fake_ffprobe(directory):
+    """
+    在 directory 中生成调用本脚本的启动文件（Windows 为 .cmd，其余为 shell 脚本），
+    可直接作为 ffprobe_path 传给引擎
+
+    返回: 启动文件路径
+    """
+    script = os.path.abspath(__file__)
+    if os.name == 'nt':
+        launcher = os.path.join(directory, 'ffprobe.cmd')
+        with open(launcher, 'w', encoding='utf-8') as f:
+            f.write(f'@"{sys.executable}" "{script}" %*\r\n')
+    else:
+        launcher = os.path.join(directory, 'ffprobe')
+        with open(launcher, 'w', encoding='utf-8') as f:
+            f.write(f'#!/bin/sh\nexec "{sys.executable}" "{script}" "$@"\n')
+        os.chmod(launcher, os.stat(launcher).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    return launcher
+
+
+def main(args):
+    latency = float(os.environ.get('FAKE_FFPROBE_LATENCY') or 0)
+    if latency > 0:
+        time.sleep(latency)
+    call_log = os.environ.get('FAKE_FFPROBE_CALL_LOG')
+    if call_log:
+        with open(call_log, 'a', encoding='utf-8') as f:
+            f.write(' '.join(args[-2:]) + '\n')
+    if '-version' in args:
+        print('ffprobe version fake (benchmark stub)')
+        return 0
+    path = args[-1]
+    if not os.path.exists(path):
+        print(f'{path}: No such file or directory', file=sys.stderr)
+        return 1
+    frames, fps_num, fps_den = video_info(path)
+    duration = frames * fps_den / fps_num
+    if '-of' in args and args[args.index('-of') + 1] == 'json':
+        stream = {'codec_type': 'video', 'r_frame_rate': f'{fps_num}/{fps_den}', 'avg_frame_rate': f'{fps_num}/{fps_den}',
+                  'duration': f'{duration:.6f}', 'nb_frames': str(frames)}
+        output = {'streams': [stream]}
+        if '-show_format' in args:
+            output['format'] = {'duration': f'{duration + 0.021:.6f}'}
+        print(json.dumps(output))
+        return 0
+    # 逐层计数（-count_packets / -count_frames）和旧式单项查询
+    entry = args[args.index('-show_entries') + 1] if '-show_entries' in args else ''
+    if entry == 'stream=r_frame_rate':
+        print(f'{fps_num}/{fps_den}')
+    elif entry in ('stream=nb_frames', 'stream=nb_read_frames', 'stream=nb_read_packets'):
+        print(frames)
+    elif entry == 'format=duration':
+        print(f'{duration + 0.021:.6f}')
+    else:
+        print(f'unsupported arguments: {" ".join(args)}', file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,122 @@
+"""
+生成性能测试用的剧集数据：空的视频占位文件（时长由 fake_ffprobe 按文件名给出）和对应的SRT字幕
+
+用法:
+    python benchmarks/synthetic_data.py 输出目录 [--episodes 100] [--cues 200] [--encodings utf-8,gbk]
+                                        [--disorder-rate 0.02] [--overlong-rate 0.02] [--broken-rate 0.01]
+
+输出目录下生成 视频/ 和 字幕/ 两个文件夹，每 100 集一个子文件夹（如 1-100、101-200），
+文件名为 EP1.mkv / EP1.srt ...。字幕按 --encodings 轮流使用各编码，CRLF换行，中英双语两行。
+可按比例加入问题字幕：时间轴乱序、结尾超出视频时长、无法解码。
+"""
+import argparse
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fake_ffprobe import video_duration
+
+DEFAULT_ENCODINGS = ('utf-8', 'utf-8-sig', 'gbk', 'utf-16')
+
+
+def format_time(ms):
+    return '%02d:%02d:%02d,%03d' % (ms // 3600000, ms % 3600000 // 60000, ms % 60000 // 1000, ms % 1000)
+
+
+def build_srt_text(episode, cue_count, video_seconds, rng, disorder=False, overlong=False):
+    """
+    生成一集字幕文本（CRLF换行）
+
+    参数:
+        disorder: 在中间交换相邻两条的开始时间，制造时间轴倒退
+        overlong: 最后追加一条结束在视频时长之后10秒的字幕
+    """
+    span_ms = int(video_seconds * 1000) - 5000
+    step = max(span_ms // max(cue_count, 1), 10)
+    cues = []
+    for index in range(cue_count):
+        start = index * step + rng.randint(0, step // 4)
+        cues.append([start, start + max(step // 2, 5)])
+    if disorder and cue_count >= 4:
+        middle = cue_count // 2
+        cues[middle][0], cues[middle + 1][0] = cues[middle + 1][0], cues[middle][0]
+        cues[middle][1], cues[middle + 1][1] = cues[middle + 1][1], cues[middle][1]
+    if overlong:
+        end = int(video_seconds * 1000) + 10000
+        cues.append([end - 2000, end])
+    blocks = []
+    for index, (start, end) in enumerate(cues, 1):
+        blocks.append(f"{index}\r\n{format_time(start)} --> {format_time(end)}\r\n"
+                      f"第{episode}集第{index}句台词，测试字幕内容\r\nEpisode {episode} line {index}: sample subtitle text\r\n\r\n")
+    return ''.join(blocks)
+
+
+def generate_dataset(root, episodes, cues=200, encodings=DEFAULT_ENCODINGS, disorder_rate=0.0, overlong_rate=0.0,
+                     broken_rate=0.0, per_folder=100, seed=0):
+    """
+    在 root 下生成 episodes 集的视频占位文件和字幕
+
+    返回: dict，包含 video_dir, srt_dir, episodes, srt_bytes，以及各类问题字幕的集数列表
+          disorder / overlong / broken
+    """
+    rng = random.Random(seed)
+    video_dir = os.path.join(root, '视频')
+    srt_dir = os.path.join(root, '字幕')
+    info = {'video_dir': video_dir, 'srt_dir': srt_dir, 'episodes': episodes, 'srt_bytes': 0,
+            'disorder': [], 'overlong': [], 'broken': []}
+    for episode in range(1, episodes + 1):
+        first = (episode - 1) // per_folder * per_folder + 1
+        folder = f"{first}-{first + per_folder - 1}"
+        for directory in (os.path.join(video_dir, folder), os.path.join(srt_dir, folder)):
+            os.makedirs(directory, exist_ok=True)
+        video_name = f"EP{episode}.mkv"
+        open(os.path.join(video_dir, folder, video_name), 'wb').close()
+
+        srt_path = os.path.join(srt_dir, folder, f"EP{episode}.srt")
+        roll = rng.random()
+        if roll < broken_rate:
+            # UTF-8 和 GBK 都无法解码，合并时跳过该集
+            data = b'1\r\n00:00:01,000 --> 00:00:02,000\r\n\x81\xff\xfe broken\r\n\r\n'
+            info['broken'].append(episode)
+        else:
+            disorder = roll < broken_rate + disorder_rate
+            overlong = broken_rate + disorder_rate <= roll < broken_rate + disorder_rate + overlong_rate
+            text = build_srt_text(episode, cues, video_duration(video_name), rng, disorder, overlong)
+            data = text.encode(encodings[(episode - 1) % len(encodings)])
+            if disorder:
+                info['disorder'].append(episode)
+            if overlong:
+                info['overlong'].append(episode)
+        with open(srt_path, 'wb') as f:
+            f.write(data)
+        info['srt_bytes'] += len(data)
+    return info
+
+
+def parse_encodings(text):
+    encodings = tuple(item.strip() for item in text.split(',') if item.strip())
+    for encoding in encodings:
+        ''.encode(encoding)  # 未知编码在这里报错
+    return encodings or DEFAULT_ENCODINGS
+
+
+def main():
+    parser = argparse.ArgumentParser(description='生成性能测试用的剧集视频占位文件和字幕')
+    parser.add_argument('root', help='输出目录')
+    parser.add_argument('--episodes', type=int, default=100, help='集数')
+    parser.add_argument('--cues', type=int, default=200, help='每集字幕条数')
+    parser.add_argument('--encodings', default=','.join(DEFAULT_ENCODINGS), help='字幕编码，逗号分隔，按集轮流使用')
+    parser.add_argument('--disorder-rate', type=float, default=0.02, help='时间轴乱序的字幕比例')
+    parser.add_argument('--overlong-rate', type=float, default=0.02, help='结尾超出视频时长的字幕比例')
+    parser.add_argument('--broken-rate', type=float, default=0.01, help='无法解码的字幕比例')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    args = parser.parse_args()
+    info = generate_dataset(args.root, args.episodes, args.cues, parse_encodings(args.encodings),
+                            args.disorder_rate, args.overlong_rate, args.broken_rate, seed=args.seed)
+    print(f"已生成 {args.episodes} 集：视频 {info['video_dir']}，字幕 {info['srt_dir']}（{info['srt_bytes'] / 1024 / 1024:.1f} MB）")
+    print(f"问题字幕：乱序 {len(info['disorder'])} 个，超出时长 {len(info['overlong'])} 个，无法解码 {len(info['broken'])} 个")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,3961 @@
+"""
+字幕合并引擎：扫描、探测、匹配、检查与合并流程，不依赖tkinter
+
+图形界面（专业字幕合并工具.py）在此基础上添加界面；也可以直接在命令行运行：
+    python subtitle_engine.py --video-dir 视频文件夹 --srt-dir 字幕文件夹 --output 合并字幕.srt [--range 1-20]
+"""
+import os
+import subprocess
+import threading
+import argparse
+import time
+from pathlib import Path
+import re # 引入正则表达式库用于自然排序
+import sys
+import codecs
+import tempfile
+import json
+from decimal import Decimal, ROUND_HALF_UP
+from fractions import Fraction
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, BrokenExecutor
+import multiprocessing
+from collections import OrderedDict
+from contextlib import nullcontext, contextmanager
+from array import array
+import sqlite3
+import struct
+import itertools
+import queue
+try:
+    import numpy as np # type: ignore # 可选：有NumPy时时间轴运算向量化
+except ImportError:
+    np = None
+try:
+    import resource # 可选：Unix下读取内存占用峰值（Windows没有此模块，改用 GetProcessMemoryInfo）
+except ImportError:
+    resource = None
+
+def get_user_cache_dir():
+    """获取用户缓存目录（可用环境变量 SUBTITLE_MERGER_CACHE_DIR 覆盖），不存在时自动创建"""
+    cache_dir = os.environ.get('SUBTITLE_MERGER_CACHE_DIR')
+    if not cache_dir:
+        if os.name == 'nt':
+            base_dir = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+        else:
+            base_dir = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+        cache_dir = os.path.join(base_dir, 'SubtitleMerger')
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+# 日志级别（数值与标准库 logging 相同）；逐集、逐条的细节为 DEBUG，界面和命令行可以只显示 INFO 以上
+LOG_DEBUG = 10
+LOG_INFO = 20
+LOG_WARNING = 30
+LOG_ERROR = 40
+LOG_LEVEL_NAMES = {'debug': LOG_DEBUG, 'info': LOG_INFO, 'warning': LOG_WARNING, 'error': LOG_ERROR}
+
+def default_log_path():
+    """完整日志文件的默认位置（用户缓存目录下 logs/subtitle_merger.log），目录无法创建时返回None"""
+    try:
+        log_dir = os.path.join(get_user_cache_dir(), 'logs')
+        os.makedirs(log_dir, exist_ok=True)
+    except OSError:
+        return None
+    return os.path.join(log_dir, 'subtitle_merger.log')
+
+class LogPipeline:
+    """
+    多线程日志管道：工作线程 put() 只把 (时间, 级别, 消息) 放进线程安全队列，不触碰界面；
+    界面线程定时 drain() 成批取出。全部日志（不受界面显示级别限制）同时写入日志文件，
+    文件超过 max_bytes 时轮转为 .1 ~ .backup_count。
+    """
+    LEVEL_LABELS = {LOG_DEBUG: 'DEBUG', LOG_INFO: 'INFO', LOG_WARNING: 'WARNING', LOG_ERROR: 'ERROR'}
+
+    def __init__(self, log_path=None, max_bytes=5 * 1024 * 1024, backup_count=3):
+        self.records = queue.SimpleQueue()
+        self.log_path = log_path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.log_file = None
+        if log_path:
+            try:
+                self.log_file = open(log_path, 'a', encoding='utf-8')
+            except OSError:
+                self.log_path = None
+
+    def put(self, message, level=LOG_INFO):
+        """记录一条日志（任意线程）"""
+        self.records.put((time.time(), level, message))
+
+    def drain(self, max_records=2000):
+        """
+        取出最多 max_records 条日志并写入日志文件
+        
+        返回: [(时间戳 "HH:MM:SS", 级别, 消息), ...]
+        """
+        records = []
+        while len(records) < max_records:
+            try:
+                created, level, message = self.records.get_nowait()
+            except queue.Empty:
+                break
+            records.append((created, level, message))
+        if records and self.log_file is not None:
+            self._write_file(''.join(
+                f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(created))} [{self.LEVEL_LABELS.get(level, level)}] {message}\n"
+                for created, level, message in records))
+        return [(time.strftime("%H:%M:%S", time.localtime(created)), level, message) for created, level, message in records]
+
+    def _write_file(self, text):
+        try:
+            if self.log_file.tell() + len(text) > self.max_bytes:
+                self._rotate()
+            self.log_file.write(text)
+            self.log_file.flush()
+        except (OSError, ValueError):
+            self.log_file = None  # 磁盘写满等情况下放弃写文件，界面日志不受影响
+
+    def _rotate(self):
+        self.log_file.close()
+        for i in range(self.backup_count - 1, 0, -1):
+            if os.path.exists(f"{self.log_path}.{i}"):
+                os.replace(f"{self.log_path}.{i}", f"{self.log_path}.{i + 1}")
+        if self.backup_count > 0:
+            os.replace(self.log_path, f"{self.log_path}.1")
+        self.log_file = open(self.log_path, 'w', encoding='utf-8')
+
+    def close(self):
+        if self.log_file is not None:
+            self.log_file.close()
+            self.log_file = None
+
+# 工作线程发给界面线程的事件类型
+EVENT_PROBE_DONE = 'probe-done'  # (行键, 帧数显示, 时长显示)：一个视频探测完成
+EVENT_PROGRESS = 'merge-progress'  # (当前值, 最大值或None)：扫描/合并进度
+EVENT_STATUS = 'status'  # (状态栏文本,)
+EVENT_PROBLEM = 'problem-found'  # (类别 info/warning/error, 标题, 内容)：需要弹窗提示的问题
+EVENT_CALL = 'call'  # (函数, 参数元组)：需要在界面线程执行的操作
+
+class EventChannel:
+    """
+    工作线程到界面线程的事件通道：publish() 可在任意线程调用，界面线程按固定帧率 drain() 成批处理
+    
+    drain() 时合并同类事件：同一行的 probe-done 只保留最后一次，进度和状态只保留最新值，
+    problem-found 和 call 按发布顺序保留。
+    """
+    def __init__(self):
+        self.events = queue.SimpleQueue()
+
+    def publish(self, kind, *payload):
+        self.events.put((kind, payload))
+
+    def drain(self, max_events=20000):
+        """
+        取出最多 max_events 个事件并合并
+        
+        返回: dict：ordered 为按顺序的 (类型, 参数) 列表（problem-found / call），
+              rows 为 {行键: (帧数显示, 时长显示)}，progress 为 (当前值, 最大值或None) 或None，status 为最新文本或None
+        """
+        batch = {'ordered': [], 'rows': {}, 'progress': None, 'status': None}
+        for _ in range(max_events):
+            try:
+                kind, payload = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == EVENT_PROBE_DONE:
+                batch['rows'][payload[0]] = payload[1:]
+            elif kind == EVENT_PROGRESS:
+                value, maximum = payload
+                if maximum is None and batch['progress'] is not None:
+                    maximum = batch['progress'][1]  # 保留本批中较早设置的最大值
+                batch['progress'] = (value, maximum)
+            elif kind == EVENT_STATUS:
+                batch['status'] = payload[0]
+            else:
+                batch['ordered'].append((kind, payload))
+        return batch
+
+class JobCancelled(Exception):
+    """扫描、检查或合并被用户取消（JobControl.cancel）"""
+
+class JobControl:
+    """
+    扫描、检查和合并任务的协作式取消与暂停
+    
+    工作线程（包括探测线程池中的任务）在每个视频、每集字幕处理前调用 checkpoint()：
+    暂停时在此等待，取消后抛出 JobCancelled。cancel() 同时结束正在运行的 ffprobe 子进程。
+    可在任意线程调用；新任务开始前调用 reset()。
+    """
+    def __init__(self):
+        self.cancel_event = threading.Event()
+        self.resume_event = threading.Event()
+        self.resume_event.set()
+        self.lock = threading.Lock()
+        self.processes = set()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    @property
+    def paused(self):
+        return not self.resume_event.is_set()
+
+    def reset(self):
+        self.cancel_event.clear()
+        self.resume_event.set()
+
+    def pause(self):
+        self.resume_event.clear()
+
+    def resume(self):
+        self.resume_event.set()
+
+    def cancel(self):
+        """请求取消，并结束正在运行的子进程（暂停中的任务会被唤醒后退出）"""
+        self.cancel_event.set()
+        self.resume_event.set()
+        with self.lock:
+            processes = list(self.processes)
+        for process in processes:
+            try:
+                process.kill()
+            except OSError:
+                pass
+
+    def checkpoint(self):
+        """暂停时等待继续；已取消时抛出 JobCancelled"""
+        self.resume_event.wait()
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+
+    def register_process(self, process):
+        """登记正在运行的子进程，取消时一并结束（登记时已取消则立即结束）"""
+        with self.lock:
+            self.processes.add(process)
+        if self.cancel_event.is_set():
+            try:
+                process.kill()
+            except OSError:
+                pass
+
+    def unregister_process(self, process):
+        with self.lock:
+            self.processes.discard(process)
+
+# 性能统计中各阶段和计数项的显示名称，汇总按此顺序输出；「└」为探测视频的各方式（各探测线程耗时之和）
+METRIC_STAGE_NAMES = OrderedDict([
+    ('walk', '遍历文件夹'), ('sort', '排序'),
+    ('probe', '探测视频'), ('probe_cache', '└ 探测缓存'), ('probe_native', '└ 内置MP4/MKV解析'),
+    ('probe_ffprobe', '└ ffprobe探测'), ('probe_packets', '└ 数据包计数'), ('probe_decode', '└ 解码计数'),
+    ('cache_commit', '写入探测缓存'),
+    ('plan', '匹配字幕和计算偏移'), ('lookup', '查询字幕解析缓存'), ('parse', '读取和解析字幕'), ('check', '检查乱序和时长'),
+    ('offset', '应用时间偏移'), ('reuse', '读取上次合并结果'), ('write', '写入字幕'), ('save', '备份并保存'),
+])
+METRIC_COUNTER_NAMES = OrderedDict([
+    ('dirs_walked', '遍历目录'), ('files_walked', '遍历文件'), ('videos_found', '视频'), ('subtitles_found', '字幕'),
+    ('videos_probed', '探测视频'), ('ffprobe_spawned', '启动ffprobe'),
+    ('subtitles_parsed', '解析字幕文件'), ('bytes_read', '读取'), ('cues_parsed', '解析字幕条数'),
+    ('episodes', '处理集数'), ('episodes_reused', '复用集数'), ('episodes_skipped', '跳过集数'),
+    ('cues_written', '写入字幕条数'), ('bytes_written', '写入'),
+])
+
+def get_peak_rss():
+    """本进程启动以来的内存占用峰值（字节），并行解析的子进程不计入；无法获取时返回None"""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024  # Linux 以KB为单位，macOS 为字节
+    if os.name == 'nt':
+        try:
+            import ctypes
+            from ctypes import wintypes
+
+            class ProcessMemoryCounters(ctypes.Structure):
+                _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD)] + [
+                    (name, ctypes.c_size_t) for name in ('PeakWorkingSetSize', 'WorkingSetSize', 'QuotaPeakPagedPoolUsage',
+                                                         'QuotaPagedPoolUsage', 'QuotaPeakNonPagedPoolUsage',
+                                                         'QuotaNonPagedPoolUsage', 'PagefileUsage', 'PeakPagefileUsage')]
+            counters = ProcessMemoryCounters()
+            counters.cb = ctypes.sizeof(counters)
+            kernel32 = ctypes.WinDLL('kernel32')
+            kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+            psapi = ctypes.WinDLL('psapi')
+            psapi.GetProcessMemoryInfo.argtypes = [wintypes.HANDLE, ctypes.POINTER(ProcessMemoryCounters), wintypes.DWORD]
+            if psapi.GetProcessMemoryInfo(kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb):
+                return counters.PeakWorkingSetSize
+        except (OSError, AttributeError):
+            pass
+    return None
+
+def format_byte_size(size):
+    """字节数的显示文字（KB / MB / GB）"""
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.2f} GB"
+
+class RunMetrics:
+    """
+    一次扫描或合并的分阶段计时和计数，结束时写入日志汇总和JSON性能报告
+
+    stage() / add_time() / count() 可在任意线程调用（探测线程池中的任务同时记录）；
+    多个线程同时进行的阶段（探测视频的各方式）记录的是各线程耗时之和，可能超过总耗时。
+    """
+    def __init__(self, kind):
+        self.kind = kind  # 'scan' 扫描（含扫描后的字幕检查） / 'merge' 合并
+        self.started_at = time.strftime('%Y-%m-%dT%H:%M:%S')
+        self.start_time = time.perf_counter()
+        self.elapsed = None
+        self.peak_rss = None
+        self.stages = OrderedDict()  # {阶段: [累计秒数, 次数]}，按首次记录的顺序
+        self.counters = OrderedDict()
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        """对一段代码计时，同一阶段多次进入时耗时和次数累加（出错时同样计入）"""
+        stage_start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - stage_start)
+
+    def add_time(self, name, seconds, calls=1):
+        with self.lock:
+            entry = self.stages.setdefault(name, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += calls
+
+    def count(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def finish(self):
+        """记录到现在为止的总耗时和内存峰值（扫描后还有字幕检查时会再次调用，以最后一次为准）"""
+        self.elapsed = time.perf_counter() - self.start_time
+        self.peak_rss = get_peak_rss()
+        return self
+
+    def to_dict(self):
+        """JSON报告用的dict：耗时为秒，stages 中 calls 为该阶段的执行次数"""
+        elapsed = self.elapsed if self.elapsed is not None else time.perf_counter() - self.start_time
+        with self.lock:
+            return {
+                'kind': self.kind,
+                'started_at': self.started_at,
+                'elapsed_seconds': round(elapsed, 4),
+                'peak_rss_bytes': self.peak_rss,
+                'stages': {name: {'seconds': round(seconds, 4), 'calls': calls} for name, (seconds, calls) in self.stages.items()},
+                'counters': dict(self.counters),
+            }
+
+    def summary_lines(self, title):
+        """汇总文本行：各阶段耗时及占总耗时的比例、计数和内存峰值"""
+        elapsed = self.elapsed if self.elapsed is not None else time.perf_counter() - self.start_time
+        with self.lock:
+            stages = dict(self.stages)
+            counters = dict(self.counters)
+        lines = ["=" * 70, f"{title}（总耗时 {elapsed:.2f} 秒）"]
+        for name in [name for name in METRIC_STAGE_NAMES if name in stages] + [name for name in stages if name not in METRIC_STAGE_NAMES]:
+            seconds, calls = stages[name]
+            if name.startswith('probe_'):
+                lines.append(f"    {METRIC_STAGE_NAMES.get(name, name)}: {seconds:.3f} 秒（{calls} 次，各线程合计）")
+            else:
+                share = f"，{seconds / elapsed * 100:.0f}%" if elapsed > 0 else ""
+                lines.append(f"  {METRIC_STAGE_NAMES.get(name, name)}: {seconds:.3f} 秒（{calls} 次{share}）")
+        counter_texts = []
+        for name in [name for name in METRIC_COUNTER_NAMES if name in counters] + [name for name in counters if name not in METRIC_COUNTER_NAMES]:
+            value = format_byte_size(counters[name]) if name.startswith('bytes_') else counters[name]
+            counter_texts.append(f"{METRIC_COUNTER_NAMES.get(name, name)} {value}")
+        for start in range(0, len(counter_texts), 6):
+            lines.append(("  计数: " if start == 0 else "        ") + "，".join(counter_texts[start:start + 6]))
+        lines.append(f"  内存峰值: {format_byte_size(self.peak_rss) if self.peak_rss else '无法获取'}（本进程）")
+        lines.append("=" * 70)
+        return lines
+
+class ProbeCache:
+    """
+    视频探测结果的持久化缓存（SQLite，位于用户缓存目录）
+    
+    以 绝对路径 + 文件大小 + 修改时间 作为键，文件被替换或修改后自动失效；
+    条目数超过 max_entries 时按最近访问时间淘汰（LRU）。
+    可被多个探测线程同时调用；写入在 commit() 时统一提交。
+    """
+    def __init__(self, db_path, max_entries=20000):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS probe_cache ("
+            " path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL,"
+            " fps_num INTEGER, fps_den INTEGER, nb_frames INTEGER,"
+            " stream_duration REAL, container_duration REAL, last_access REAL NOT NULL,"
+            " frame_tier TEXT)")
+        # 兼容旧版本创建的缓存表（没有帧数来源列）
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(probe_cache)")]
+        if 'frame_tier' not in columns:
+            self.conn.execute("ALTER TABLE probe_cache ADD COLUMN frame_tier TEXT")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_probe_cache_access ON probe_cache(last_access)")
+        self.conn.commit()
+        # 打开以来的累计命中统计（批量合并时为各剧之和；单次扫描的命中数按探测结果来源统计）
+        self.hits = 0
+        self.misses = 0
+
+    def _file_key(self, video_path):
+        """返回 (绝对路径, 大小, 修改时间ns)，文件不可访问时返回None"""
+        try:
+            abs_path = os.path.abspath(video_path)
+            stat = os.stat(abs_path)
+            return abs_path, stat.st_size, stat.st_mtime_ns
+        except OSError:
+            return None
+
+    def get(self, video_path, required_tier=None):
+        """
+        查询缓存，命中时返回探测结果dict（格式同 probe_video_info_ffprobe），否则返回None
+        
+        required_tier: 只接受指定帧数来源层级的条目（如要求解码校验时传入 'decode'）
+        """
+        key = self._file_key(video_path)
+        with self.lock:
+            row = None
+            if key:
+                row = self.conn.execute(
+                    "SELECT fps_num, fps_den, nb_frames, stream_duration, container_duration, frame_tier FROM probe_cache"
+                    " WHERE path = ? AND size = ? AND mtime_ns = ?", key).fetchone()
+            if row is not None and required_tier and row[5] != required_tier:
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.conn.execute("UPDATE probe_cache SET last_access = ? WHERE path = ?", (time.time(), key[0]))
+        fps_num, fps_den, nb_frames, stream_duration, container_duration, frame_tier = row
+        return {
+            'fps': Fraction(fps_num, fps_den) if fps_num and fps_den else None,
+            'nb_frames': nb_frames,
+            'stream_duration': stream_duration,
+            'container_duration': container_duration,
+            'frame_tier': frame_tier or ('metadata' if nb_frames is not None else None),
+        }
+
+    def put(self, video_path, probe_info):
+        """写入一条探测结果（同一路径的旧条目会被替换）"""
+        key = self._file_key(video_path)
+        if not key or not probe_info:
+            return
+        fps = probe_info.get('fps')
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO probe_cache"
+                " (path, size, mtime_ns, fps_num, fps_den, nb_frames, stream_duration, container_duration, last_access, frame_tier)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                key + (fps.numerator if fps else None, fps.denominator if fps else None,
+                       probe_info.get('nb_frames'), probe_info.get('stream_duration'),
+                       probe_info.get('container_duration'), time.time(), probe_info.get('frame_tier')))
+
+    def commit(self):
+        """提交写入，并淘汰超出容量的最久未访问条目"""
+        with self.lock:
+            count = self.conn.execute("SELECT COUNT(*) FROM probe_cache").fetchone()[0]
+            if count > self.max_entries:
+                self.conn.execute(
+                    "DELETE FROM probe_cache WHERE path IN"
+                    " (SELECT path FROM probe_cache ORDER BY last_access LIMIT ?)", (count - self.max_entries,))
+            self.conn.commit()
+
+# 可由内置解析器直接读取的MP4/MOV扩展名
+MP4_EXTENSIONS = ('.mp4', '.mov')
+# stts条目超过此数量视为可变帧率，交给ffprobe处理
+MP4_MAX_STTS_ENTRIES = 4096
+# 视频轨道时长与容器（mvhd）时长相差超过此比例（且超过2秒）时视为轨道信息不可靠，交给ffprobe处理
+MP4_MAX_DURATION_MISMATCH = 0.05
+
+def _iter_mp4_boxes(f, start, end):
+    """
+    遍历 [start, end) 范围内的同级box，只读取box头部（之后直接seek跳过内容）
+    
+    产出: (box类型, 内容起始偏移, box结束偏移)
+    """
+    offset = start
+    while offset + 8 <= end:
+        f.seek(offset)
+        header = f.read(8)
+        if len(header) < 8:
+            return
+        size, box_type = struct.unpack('>I4s', header)
+        header_size = 8
+        if size == 1:
+            # 64位扩展大小
+            large = f.read(8)
+            if len(large) < 8:
+                return
+            size = struct.unpack('>Q', large)[0]
+            header_size = 16
+        elif size == 0:
+            # 一直延伸到文件（或父box）末尾
+            size = end - offset
+        if size < header_size:
+            raise ValueError(f"无效的box大小: {box_type!r} @ {offset}")
+        yield box_type, offset + header_size, min(offset + size, end)
+        offset += size
+
+def _read_mp4_box_payload(f, payload_start, box_end, length):
+    """读取box内容的前length个字节（不足时抛出ValueError）"""
+    if payload_start + length > box_end:
+        raise ValueError("box内容不完整")
+    f.seek(payload_start)
+    data = f.read(length)
+    if len(data) < length:
+        raise ValueError("文件被截断")
+    return data
+
+def _read_mp4_time_header(f, payload_start, box_end):
+    """读取 mvhd/mdhd 的 (timescale, duration)，兼容version 0/1"""
+    version = _read_mp4_box_payload(f, payload_start, box_end, 1)[0]
+    if version == 1:
+        data = _read_mp4_box_payload(f, payload_start, box_end, 32)
+        return struct.unpack('>IQ', data[20:32])
+    data = _read_mp4_box_payload(f, payload_start, box_end, 20)
+    return struct.unpack('>II', data[12:20])
+
+def _read_mp4_video_track(f, trak_start, trak_end):
+    """
+    解析一个trak，若为视频轨道返回 (timescale, duration, stts条目列表, 样本数)，否则返回None
+    
+    可变帧率（stts条目过多）的视频轨道同样返回元组，但stts条目列表为None
+    """
+    handler_type = None
+    timescale = duration = None
+    stts_entries = None
+    sample_count = None
+    variable_rate = False
+    for box_type, payload_start, box_end in _iter_mp4_boxes(f, trak_start, trak_end):
+        if box_type != b'mdia':
+            continue
+        for mdia_type, mdia_start, mdia_end in _iter_mp4_boxes(f, payload_start, box_end):
+            if mdia_type == b'hdlr':
+                # version/flags(4) + pre_defined/component type(4) + handler_type(4)
+                handler_type = _read_mp4_box_payload(f, mdia_start, mdia_end, 12)[8:12]
+            elif mdia_type == b'mdhd':
+                timescale, duration = _read_mp4_time_header(f, mdia_start, mdia_end)
+            elif mdia_type == b'minf':
+                for minf_type, minf_start, minf_end in _iter_mp4_boxes(f, mdia_start, mdia_end):
+                    if minf_type != b'stbl':
+                        continue
+                    for stbl_type, stbl_start, stbl_end in _iter_mp4_boxes(f, minf_start, minf_end):
+                        if stbl_type == b'stts':
+                            entry_count = struct.unpack('>I', _read_mp4_box_payload(f, stbl_start, stbl_end, 8)[4:8])[0]
+                            if entry_count > MP4_MAX_STTS_ENTRIES:
+                                # 可变帧率（条目过多），交给ffprobe处理
+                                variable_rate = True
+                                continue
+                            data = _read_mp4_box_payload(f, stbl_start, stbl_end, 8 + entry_count * 8)
+                            stts_entries = [struct.unpack_from('>II', data, 8 + i * 8) for i in range(entry_count)]
+                        elif stbl_type in (b'stsz', b'stz2'):
+                            # stsz: version/flags(4) + sample_size(4) + sample_count(4)
+                            # stz2: version/flags(4) + reserved(3) + field_size(1) + sample_count(4)
+                            sample_count = struct.unpack('>I', _read_mp4_box_payload(f, stbl_start, stbl_end, 12)[8:12])[0]
+    if handler_type != b'vide':
+        return None
+    return timescale, duration, None if variable_rate else stts_entries, sample_count
+
+def read_mp4_video_info(video_path):
+    """
+    不调用ffprobe，直接读取MP4/MOV的moov头部信息（mvhd、mdhd、stts、stsz）
+    
+    只读取各box头部和极少量内容，不读取媒体数据。
+    返回: dict（格式同 probe_video_info_ffprobe）或 None（非MP4、分片MP4、可变帧率、视频轨道与容器时长不符等无法可靠解析的情况）
+    """
+    with open(video_path, 'rb') as f:
+        file_size = os.fstat(f.fileno()).st_size
+        moov = None
+        for box_type, payload_start, box_end in _iter_mp4_boxes(f, 0, file_size):
+            if box_type == b'moov':
+                moov = (payload_start, box_end)
+                break
+            if box_type in (b'moof', b'sidx'):
+                # 分片MP4：样本信息在moof中，交给ffprobe
+                return None
+        if moov is None:
+            return None
+
+        container_duration = None
+        video_track = None
+        for box_type, payload_start, box_end in _iter_mp4_boxes(f, *moov):
+            if box_type == b'mvex':
+                # 分片MP4（moov中只有轨道描述，没有完整样本表）
+                return None
+            if box_type == b'mvhd':
+                movie_timescale, movie_duration = _read_mp4_time_header(f, payload_start, box_end)
+                if movie_timescale and movie_duration and movie_duration not in (0xFFFFFFFF, 0xFFFFFFFFFFFFFFFF):
+                    container_duration = movie_duration / movie_timescale
+            elif box_type == b'trak' and video_track is None:
+                # 只认第一条视频轨道：它被拒绝（如可变帧率）时不能改用后面的封面等轨道
+                video_track = _read_mp4_video_track(f, payload_start, box_end)
+
+    if not video_track:
+        return None
+    timescale, duration, stts_entries, sample_count = video_track
+    if not timescale or not stts_entries or not sample_count:
+        return None
+    # stts样本总数必须与stsz一致，否则说明样本表不完整
+    if sum(count for count, _ in stts_entries) != sample_count:
+        return None
+
+    # 帧率取覆盖样本最多的帧间隔；除个别帧（通常是最后一帧）外必须恒定，否则视为可变帧率
+    delta_counts = {}
+    for count, delta in stts_entries:
+        delta_counts[delta] = delta_counts.get(delta, 0) + count
+    dominant_delta, dominant_count = max(delta_counts.items(), key=lambda x: x[1])
+    if dominant_delta == 0 or sample_count - dominant_count > max(2, sample_count // 1000):
+        return None
+    fps = Fraction(timescale, dominant_delta)
+
+    if not duration or duration in (0xFFFFFFFF, 0xFFFFFFFFFFFFFFFF):
+        duration = sum(count * delta for count, delta in stts_entries)
+    stream_duration = duration / timescale
+    if container_duration is not None and abs(stream_duration - container_duration) > max(
+            2.0, container_duration * MP4_MAX_DURATION_MISMATCH):
+        # 视频轨道只覆盖影片的一小部分（或时长信息有误），交给ffprobe
+        return None
+    return {
+        'fps': fps,
+        'nb_frames': sample_count,
+        'stream_duration': stream_duration,
+        'container_duration': container_duration if container_duration is not None else stream_duration,
+        'source': 'mp4',
+        'frame_tier': 'metadata',
+    }
+
+# 可由内置解析器直接读取的Matroska扩展名
+MKV_EXTENSIONS = ('.mkv',)
+# 用到的EBML/Matroska元素ID
+EBML_ID_HEADER = 0x1A45DFA3
+MKV_ID_SEGMENT = 0x18538067
+MKV_ID_SEEKHEAD = 0x114D9B74
+MKV_ID_SEEK = 0x4DBB
+MKV_ID_SEEK_ID = 0x53AB
+MKV_ID_SEEK_POSITION = 0x53AC
+MKV_ID_INFO = 0x1549A966
+MKV_ID_TIMECODE_SCALE = 0x2AD7B1
+MKV_ID_DURATION = 0x4489
+MKV_ID_TRACKS = 0x1654AE6B
+MKV_ID_TRACK_ENTRY = 0xAE
+MKV_ID_TRACK_TYPE = 0x83
+MKV_ID_TRACK_UID = 0x73C5
+MKV_ID_DEFAULT_DURATION = 0x23E383
+MKV_ID_TAGS = 0x1254C367
+MKV_ID_TAG = 0x7373
+MKV_ID_TARGETS = 0x63C0
+MKV_ID_TAG_TRACK_UID = 0x63C5
+MKV_ID_SIMPLE_TAG = 0x67C8
+MKV_ID_TAG_NAME = 0x45A3
+MKV_ID_TAG_STRING = 0x4487
+MKV_ID_CLUSTER = 0x1F43B675
+
+def _read_ebml_vint(f, keep_marker):
+    """
+    读取一个EBML变长整数
+    
+    返回: (数值, 字节数, 是否为"未知大小")；keep_marker=True 用于元素ID（保留长度标记位）
+    """
+    first = f.read(1)
+    if not first:
+        raise EOFError("EBML数据意外结束")
+    length = 1
+    mask = 0x80
+    while length <= 8 and not (first[0] & mask):
+        mask >>= 1
+        length += 1
+    if length > 8:
+        raise ValueError("无效的EBML变长整数")
+    rest = f.read(length - 1)
+    if len(rest) < length - 1:
+        raise EOFError("EBML数据意外结束")
+    value = int.from_bytes(first + rest, 'big')
+    if keep_marker:
+        return value, length, False
+    value &= (1 << (7 * length)) - 1
+    return value, length, value == (1 << (7 * length)) - 1
+
+def _iter_ebml_elements(f, start, end):
+    """
+    遍历 [start, end) 范围内的同级EBML元素，只读取元素头（内容通过seek跳过）
+    
+    产出: (元素ID, 内容起始偏移, 内容结束偏移)；未知大小的元素视为延伸到end
+    """
+    offset = start
+    while offset < end:
+        f.seek(offset)
+        try:
+            element_id, id_length, _ = _read_ebml_vint(f, True)
+            size, size_length, unknown_size = _read_ebml_vint(f, False)
+        except EOFError:
+            return
+        data_start = offset + id_length + size_length
+        data_end = end if unknown_size else min(data_start + size, end)
+        yield element_id, data_start, data_end
+        if unknown_size:
+            return
+        offset = data_end
+
+def _read_ebml_data(f, data_start, data_end):
+    """读取元素内容（只用于小元素）"""
+    f.seek(data_start)
+    return f.read(data_end - data_start)
+
+def _read_ebml_uint(f, data_start, data_end):
+    return int.from_bytes(_read_ebml_data(f, data_start, data_end), 'big')
+
+def _read_ebml_float(f, data_start, data_end):
+    data = _read_ebml_data(f, data_start, data_end)
+    if len(data) == 4:
+        return struct.unpack('>f', data)[0]
+    if len(data) == 8:
+        return struct.unpack('>d', data)[0]
+    return None
+
+def _read_mkv_info(f, data_start, data_end, result):
+    """Segment Info: TimecodeScale（默认1ms）和 Duration"""
+    for element_id, start, end in _iter_ebml_elements(f, data_start, data_end):
+        if element_id == MKV_ID_TIMECODE_SCALE:
+            result['timecode_scale'] = _read_ebml_uint(f, start, end)
+        elif element_id == MKV_ID_DURATION:
+            result['duration'] = _read_ebml_float(f, start, end)
+    result.setdefault('timecode_scale', 1000000)
+    result.setdefault('duration', None)
+
+def _read_mkv_tracks(f, data_start, data_end, result):
+    """Tracks: 取第一条视频轨道（TrackType=1）的 TrackUID 和 DefaultDuration（纳秒/帧）"""
+    for element_id, start, end in _iter_ebml_elements(f, data_start, data_end):
+        if element_id != MKV_ID_TRACK_ENTRY:
+            continue
+        track = {}
+        for track_element_id, track_start, track_end in _iter_ebml_elements(f, start, end):
+            if track_element_id == MKV_ID_TRACK_TYPE:
+                track['type'] = _read_ebml_uint(f, track_start, track_end)
+            elif track_element_id == MKV_ID_TRACK_UID:
+                track['uid'] = _read_ebml_uint(f, track_start, track_end)
+            elif track_element_id == MKV_ID_DEFAULT_DURATION:
+                track['default_duration'] = _read_ebml_uint(f, track_start, track_end)
+        if track.get('type') == 1:
+            result['video_track'] = track
+            return
+    result['video_track'] = None
+
+def _read_mkv_tags(f, data_start, data_end, result):
+    """Tags: 收集各轨道的 NUMBER_OF_FRAMES 统计标签（mkvmerge写入的精确帧数）"""
+    frame_tags = {}
+    for element_id, start, end in _iter_ebml_elements(f, data_start, data_end):
+        if element_id != MKV_ID_TAG:
+            continue
+        track_uids = []
+        frames = None
+        for tag_element_id, tag_start, tag_end in _iter_ebml_elements(f, start, end):
+            if tag_element_id == MKV_ID_TARGETS:
+                for target_id, target_start, target_end in _iter_ebml_elements(f, tag_start, tag_end):
+                    if target_id == MKV_ID_TAG_TRACK_UID:
+                        track_uids.append(_read_ebml_uint(f, target_start, target_end))
+            elif tag_element_id == MKV_ID_SIMPLE_TAG:
+                name = value = None
+                for simple_id, simple_start, simple_end in _iter_ebml_elements(f, tag_start, tag_end):
+                    if simple_id == MKV_ID_TAG_NAME:
+                        name = _read_ebml_data(f, simple_start, simple_end).decode('utf-8', 'replace')
+                    elif simple_id == MKV_ID_TAG_STRING:
+                        value = _read_ebml_data(f, simple_start, simple_end).decode('utf-8', 'replace')
+                if name == 'NUMBER_OF_FRAMES' and value and value.strip().isdigit():
+                    frames = int(value.strip())
+        if frames is not None:
+            for uid in track_uids:
+                frame_tags[uid] = frames
+    result['frame_tags'] = frame_tags
+
+def read_mkv_video_info(video_path):
+    """
+    不调用ffprobe，直接读取Matroska的 Segment Info 和 Tracks（必要时通过SeekHead跳转，不扫描Cluster）
+    
+    帧数优先取mkvmerge写入的 NUMBER_OF_FRAMES 统计标签，否则由 Duration / DefaultDuration 推算。
+    返回: dict（格式同 probe_video_info_ffprobe，另含 confidence: 'high' 或 'low'）或 None（非Matroska/无视频轨道）
+        confidence为'low'表示推算结果不在整帧上，调用方应改用ffprobe
+    """
+    with open(video_path, 'rb') as f:
+        if f.read(4) != EBML_ID_HEADER.to_bytes(4, 'big'):
+            return None
+        file_size = os.fstat(f.fileno()).st_size
+        elements = _iter_ebml_elements(f, 0, file_size)
+        header = next(elements, None)
+        if not header or header[0] != EBML_ID_HEADER:
+            return None
+        segment = next(elements, None)
+        if not segment or segment[0] != MKV_ID_SEGMENT:
+            return None
+        segment_start, segment_end = segment[1], segment[2]
+
+        readers = {MKV_ID_INFO: _read_mkv_info, MKV_ID_TRACKS: _read_mkv_tracks, MKV_ID_TAGS: _read_mkv_tags}
+        result = {}
+        seek_positions = {}
+        # 顺序读取Segment开头的一级元素，遇到第一个Cluster即停止
+        for element_id, start, end in _iter_ebml_elements(f, segment_start, segment_end):
+            if element_id == MKV_ID_CLUSTER:
+                break
+            if element_id in readers:
+                readers.pop(element_id)(f, start, end, result)
+            elif element_id == MKV_ID_SEEKHEAD:
+                for seek_element_id, seek_start, seek_end in _iter_ebml_elements(f, start, end):
+                    if seek_element_id != MKV_ID_SEEK:
+                        continue
+                    target_id = target_position = None
+                    for child_id, child_start, child_end in _iter_ebml_elements(f, seek_start, seek_end):
+                        if child_id == MKV_ID_SEEK_ID:
+                            target_id = _read_ebml_uint(f, child_start, child_end)
+                        elif child_id == MKV_ID_SEEK_POSITION:
+                            target_position = _read_ebml_uint(f, child_start, child_end)
+                    if target_id is not None and target_position is not None:
+                        seek_positions.setdefault(target_id, segment_start + target_position)
+            if MKV_ID_INFO not in readers and MKV_ID_TRACKS not in readers and (
+                    MKV_ID_TAGS not in readers or MKV_ID_TAGS not in seek_positions):
+                break
+
+        # Cluster之后的元素（常见于文件末尾的Tags）通过SeekHead直接跳转
+        for element_id in list(readers):
+            position = seek_positions.get(element_id)
+            if position is None or position >= segment_end:
+                continue
+            for found_id, start, end in _iter_ebml_elements(f, position, segment_end):
+                if found_id == element_id:
+                    readers.pop(element_id)(f, start, end, result)
+                break
+
+    track = result.get('video_track')
+    duration = result.get('duration')
+    if not track or not duration:
+        return None
+    duration_ns = duration * result['timecode_scale']
+    default_duration = track.get('default_duration')
+    tag_frames = result.get('frame_tags', {}).get(track.get('uid'))
+    if not default_duration:
+        return None
+
+    fps = Fraction(1000000000, default_duration).limit_denominator(1001)
+    estimated_frames = duration_ns / default_duration
+    if tag_frames:
+        total_frames = tag_frames
+        # 统计标签与时长推算相差不超过1帧才视为可信
+        confidence = 'high' if abs(estimated_frames - tag_frames) <= 1 else 'low'
+    else:
+        total_frames = round(estimated_frames)
+        # 时长必须落在整帧上（允许时间码取整误差），否则可能是可变帧率或时长不准
+        confidence = 'high' if total_frames > 0 and abs(estimated_frames - total_frames) <= 0.05 else 'low'
+    return {
+        'fps': fps,
+        'nb_frames': total_frames,
+        'stream_duration': duration_ns / 1e9,
+        'container_duration': duration_ns / 1e9,
+        'source': 'mkv',
+        'frame_tier': 'metadata',
+        'confidence': confidence,
+    }
+
+class ParsedSubtitleCache:
+    """
+    已解析字幕（CueTimeline）的内存缓存（扫描后的检查与合并共用，同一字幕只需读取解析一次）
+    
+    以 (路径, 解析方式) 为键，并校验 文件大小 + 修改时间：检查之后被修改过的文件会自动重新解析。
+    按原文件字节数限制总占用，超出 max_bytes 时淘汰最久未使用的条目（LRU）。
+    """
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # (path, kind) -> (size, mtime_ns, timeline, encoding)
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, srt_path, size, mtime_ns, kind='text'):
+        """命中且文件未变化时返回 (timeline, encoding)，否则返回None（过期条目同时被移除）"""
+        key = (srt_path, kind)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] == size and entry[1] == mtime_ns:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[2], entry[3]
+            if entry is not None:
+                self.total_bytes -= entry[0]
+                del self.entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, srt_path, size, mtime_ns, timeline, encoding, kind='text'):
+        """写入解析结果，超出容量时淘汰最久未使用的条目"""
+        if size > self.max_bytes:
+            return
+        key = (srt_path, kind)
+        with self.lock:
+            old_entry = self.entries.pop(key, None)
+            if old_entry is not None:
+                self.total_bytes -= old_entry[0]
+            self.entries[key] = (size, mtime_ns, timeline, encoding)
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.total_bytes -= evicted[0]
+
+    def reset_stats(self):
+        """清零命中统计（每次合并开始时调用）"""
+        with self.lock:
+            self.hits = 0
+            self.misses = 0
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
+
+class CueTimeline:
+    """
+    紧凑的字幕时间轴：开始/结束时间为连续的int64毫秒数组（有NumPy时为ndarray，否则为array('q')），
+    文本单独存放在列表中。偏移、乱序检测、最大结束时间都是对整个数组的一次运算。
+    
+    解析结果会被缓存共享，除 copy() 得到的副本外不要原地修改。
+    raw=True 时 texts/positions 为UTF-8字节串（直通合并，见 read_srt_file_raw）。
+    """
+    invalid_lines = ()  # 直通解析时无法解析的时间行 [(字节偏移, 行内容), ...]
+
+    def __init__(self, starts, ends, texts, positions, raw=False):
+        self.starts = _as_ms_array(starts)
+        self.ends = _as_ms_array(ends)
+        self.texts = texts
+        self.positions = positions  # 时间行后的坐标信息（通常为空）
+        self.raw = raw
+
+    def __len__(self):
+        return len(self.starts)
+
+    def copy(self):
+        """复制时间数组（文本列表共享，不会被修改）"""
+        return CueTimeline(self.starts.copy() if np is not None else array('q', self.starts),
+                           self.ends.copy() if np is not None else array('q', self.ends),
+                           self.texts, self.positions, self.raw)
+
+    def shifted(self, offset_ms):
+        """返回整体偏移 offset_ms 毫秒后的新时间轴"""
+        if np is not None:
+            return CueTimeline(self.starts + offset_ms, self.ends + offset_ms, self.texts, self.positions, self.raw)
+        return CueTimeline(array('q', [ms + offset_ms for ms in self.starts]),
+                           array('q', [ms + offset_ms for ms in self.ends]), self.texts, self.positions, self.raw)
+
+    def first_disorder(self):
+        """返回第一条开始时间早于前一条的字幕下标（从1起），没有乱序时返回-1"""
+        if len(self.starts) < 2:
+            return -1
+        if np is not None:
+            regressions = np.flatnonzero(self.starts[1:] < self.starts[:-1])
+            return int(regressions[0]) + 1 if len(regressions) else -1
+        starts = self.starts
+        return next((idx for idx in range(1, len(starts)) if starts[idx] < starts[idx - 1]), -1)
+
+    def max_end(self):
+        """返回 (结束时间最晚的字幕下标, 该结束时间ms)；并列时取靠前的一条，空时间轴返回 (-1, 0)"""
+        if len(self.ends) == 0:
+            return -1, 0
+        if np is not None:
+            idx = int(np.argmax(self.ends))
+        else:
+            idx = max(range(len(self.ends)), key=self.ends.__getitem__)
+        return idx, int(self.ends[idx])
+
+def _as_ms_array(values):
+    """转换为int64毫秒数组（NumPy可用时为ndarray）"""
+    if np is not None:
+        return np.asarray(values, dtype=np.int64)
+    return values if isinstance(values, array) else array('q', values)
+
+# SRT解析：整文件一次读入，按空行切分字幕块，时间行先用严格正则匹配，不规范时再宽松解析
+SRT_BOMS = ((codecs.BOM_UTF32_LE, 'utf-32-le'), (codecs.BOM_UTF32_BE, 'utf-32-be'),
+            (codecs.BOM_UTF8, 'utf-8'), (codecs.BOM_UTF16_LE, 'utf-16-le'), (codecs.BOM_UTF16_BE, 'utf-16-be'))
+SRT_BLOCK_SEPARATOR = re.compile(r'\n(?:[^\S\n]*\n)+')
+SRT_TIMESTAMP_PATTERN = re.compile(r'\s*(\d+)[:.,](\d+)[:.,](\d+)[:.,](\d+)\s*-->\s*(\d+)[:.,](\d+)[:.,](\d+)[:.,](\d+)(?: +(.*))?$')
+SRT_TIME_SEPARATOR = re.compile(r'[:.,]')
+SRT_LEADING_DIGITS = re.compile(r'^(\d+)')
+
+def decode_srt_bytes(data):
+    """
+    检测编码并解码字幕内容：有BOM按BOM，否则先按UTF-8严格解码，失败再用GBK
+    
+    返回: (文本, 编码名)；GBK也无法解码时抛出 UnicodeDecodeError
+    """
+    for bom, encoding in SRT_BOMS:
+        if data.startswith(bom):
+            return data[len(bom):].decode(encoding), encoding
+    try:
+        return data.decode('utf-8'), 'utf-8'
+    except UnicodeDecodeError:
+        return data.decode('gbk'), 'gbk'
+
+def _parse_srt_int(digits):
+    """宽松的整数解析：取开头的数字，没有则为0"""
+    try:
+        return int(digits)
+    except ValueError:
+        match = SRT_LEADING_DIGITS.match(digits)
+        return int(match.group()) if match else 0
+
+def _parse_srt_time_lenient(value):
+    """宽松解析 HH:MM:SS,mmm（分隔符可为 : . ,），格式不对返回None"""
+    items = SRT_TIME_SEPARATOR.split(value.strip())
+    if len(items) != 4:
+        return None
+    hours, minutes, seconds, milliseconds = (_parse_srt_int(item) for item in items)
+    return hours * 3600000 + minutes * 60000 + seconds * 1000 + milliseconds
+
+def _parse_srt_timestamp_line(line):
+    """解析时间行，返回 (开始ms, 结束ms, 坐标信息)，无法解析返回None"""
+    match = SRT_TIMESTAMP_PATTERN.match(line)
+    if match:
+        h1, m1, s1, ms1, h2, m2, s2, ms2 = map(int, match.group(1, 2, 3, 4, 5, 6, 7, 8))
+        return (h1 * 3600000 + m1 * 60000 + s1 * 1000 + ms1,
+                h2 * 3600000 + m2 * 60000 + s2 * 1000 + ms2,
+                (match.group(9) or '').strip())
+    # 不规范的时间行（如多余空格、毫秒位数不对），按字段宽松解析
+    parts = line.split('-->')
+    if len(parts) != 2:
+        return None
+    end_and_position = parts[1].lstrip().split(' ', 1)
+    start_ms = _parse_srt_time_lenient(parts[0])
+    end_ms = _parse_srt_time_lenient(end_and_position[0])
+    if start_ms is None or end_ms is None:
+        return None
+    return start_ms, end_ms, end_and_position[1].strip() if len(end_and_position) > 1 else ''
+
+def parse_srt_text(text):
+    """
+    解析SRT文本为 CueTimeline；序号行可省略，无法解析的字幕块直接跳过
+    """
+    starts = []
+    ends = []
+    texts = []
+    positions = []
+    text = text.replace('\r\n', '\n').replace('\r', '\n')
+    for block in SRT_BLOCK_SEPARATOR.split('\n\n' + text + '\n\n'):
+        if not block:
+            continue
+        lines = [line.rstrip() for line in block.split('\n')]
+        if len(lines) < 2:
+            continue
+        if '-->' not in lines[0]:
+            lines.pop(0)  # 序号行
+        timestamps = _parse_srt_timestamp_line(lines[0])
+        if timestamps is None:
+            continue
+        starts.append(timestamps[0])
+        ends.append(timestamps[1])
+        positions.append(timestamps[2])
+        texts.append('\n'.join(lines[1:]))
+    return CueTimeline(starts, ends, texts, positions)
+
+def read_srt_file(srt_path):
+    """
+    读取并解析字幕文件（只读一次文件、只解码一次）
+    
+    返回: (CueTimeline, 编码名)
+    """
+    with open(srt_path, 'rb') as f:
+        data = f.read()
+    text, encoding = decode_srt_bytes(data)
+    return parse_srt_text(text), encoding
+
+# 直通合并：按字节切分，只解析时间行。GBK的尾字节都 >= 0x40，不会与换行、数字、"-->" 混淆，可以直接按字节处理
+SRT_RAW_BLOCK_SEPARATOR = re.compile(rb'(\n(?:[ \t\f\v]*\n)+)')
+SRT_RAW_WHITESPACE_LINE = re.compile(rb'\n[ \t\f\v]+\n')
+# 规范的字幕块：可选的数字序号行 + 时间行 + 文本（块内不含空行，换行已统一为LF）
+SRT_RAW_CUE_PATTERN = re.compile(
+    rb'\s*(?:(\d+)[ \t]*\n[ \t]*)?'
+    rb'(\d+)[:.,](\d+)[:.,](\d+)[:.,](\d+)[ \t]*-->[ \t]*(\d+)[:.,](\d+)[:.,](\d+)[:.,](\d+)'
+    rb'(?: +([^\n]*?))?[ \t]*(?:\n(.*))?\Z', re.DOTALL)
+
+def _is_valid_utf8(data, chunk_size=1024 * 1024):
+    """分块校验UTF-8合法性（解码结果随即丢弃，内存占用与文件大小无关）"""
+    if data.isascii():
+        return True
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    view = memoryview(data)
+    try:
+        for pos in range(0, len(data), chunk_size):
+            decoder.decode(view[pos:pos + chunk_size])
+        decoder.decode(b'', True)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+def _original_byte_offset(data, normalized_offset):
+    """CRLF统一为LF之后的偏移 -> 原始字节偏移"""
+    offset = normalized_offset
+    pos = data.find(b'\r\n')
+    while pos != -1 and pos < offset:
+        offset += 1
+        pos = data.find(b'\r\n', pos + 2)
+    return offset
+
+def _parse_raw_srt_block(block, block_pos, encoding):
+    """
+    不规范字幕块的慢速路径，规则与 parse_srt_text 相同
+    
+    返回: (开始ms, 结束ms, 文本, 坐标信息)；不是有效字幕块返回None；
+    时间行无法解析时返回 (时间行偏移, 行内容)
+    """
+    stripped = block.lstrip()
+    block_pos += len(block) - len(stripped)
+    block = stripped.rstrip()
+    line_end = block.find(b'\n')
+    if line_end < 0:
+        return None  # 少于两行，不是有效字幕块
+    line_pos = block_pos
+    line = block[:line_end]
+    body_start = line_end + 1
+    if b'-->' not in line:
+        # 序号行
+        line_pos = block_pos + body_start
+        line_end = block.find(b'\n', body_start)
+        if line_end < 0:
+            line_end = len(block)
+        line = block[body_start:line_end]
+        body_start = line_end + 1
+    line = line.rstrip().decode(encoding, 'replace')
+    timestamps = _parse_srt_timestamp_line(line)
+    if timestamps is None:
+        return line_pos, line
+    start_ms, end_ms, position = timestamps
+    return start_ms, end_ms, block[body_start:], position.encode(encoding, 'replace')
+
+def read_srt_file_raw(srt_path):
+    """
+    直通模式读取字幕：只解析序号行和时间行，字幕文本保留原始字节（GBK文件逐条转为UTF-8）
+    
+    返回: (CueTimeline, 编码名)，时间轴的 texts/positions 为 bytes（换行统一为LF）；
+    无法解析的时间行记录在 timeline.invalid_lines = [(原文件字节偏移, 行内容), ...]。
+    UTF-16/32 文件返回None，由调用方改用 read_srt_file。
+    """
+    with open(srt_path, 'rb') as f:
+        original = f.read()
+    base_offset = 0
+    if original.startswith(codecs.BOM_UTF8):
+        base_offset = len(codecs.BOM_UTF8)
+        original = original[base_offset:]
+        encoding = 'utf-8'
+    elif any(original.startswith(bom) for bom, _ in SRT_BOMS):
+        return None
+    else:
+        encoding = 'utf-8' if _is_valid_utf8(original) else 'gbk'
+    data = original.replace(b'\r\n', b'\n')
+    if b'\n' not in data:
+        data = data.replace(b'\r', b'\n')  # 只用CR换行的旧文件
+    data = data.rstrip()
+
+    # 没有只含空白的行时，空行就是连续的LF，直接按 b'\n\n' 切分最快
+    if SRT_RAW_WHITESPACE_LINE.search(data):
+        pieces = SRT_RAW_BLOCK_SEPARATOR.split(data)
+        blocks = pieces[0::2]
+        separator_lengths = [len(separator) for separator in pieces[1::2]]
+    else:
+        blocks = data.split(b'\n\n')
+        separator_lengths = None
+
+    starts = []
+    ends = []
+    texts = []
+    positions = []
+    invalid_lines = []
+    match_cue = SRT_RAW_CUE_PATTERN.match
+    block_pos = 0
+    for i, block in enumerate(blocks):
+        match = match_cue(block)
+        if match:
+            text = match.group(11)
+            if text is not None or match.group(1) is not None:  # 只有时间行一行的不是有效字幕块
+                h1, m1, s1, ms1, h2, m2, s2, ms2 = map(int, match.group(2, 3, 4, 5, 6, 7, 8, 9))
+                starts.append(h1 * 3600000 + m1 * 60000 + s1 * 1000 + ms1)
+                ends.append(h2 * 3600000 + m2 * 60000 + s2 * 1000 + ms2)
+                texts.append(text or b'')
+                positions.append(match.group(10) or b'')
+        elif block.strip():
+            cue = _parse_raw_srt_block(block, block_pos, encoding)
+            if cue is not None and len(cue) == 2:
+                invalid_lines.append((base_offset + _original_byte_offset(original, cue[0]), cue[1]))
+            elif cue is not None:
+                starts.append(cue[0])
+                ends.append(cue[1])
+                texts.append(cue[2])
+                positions.append(cue[3])
+        block_pos += len(block) + (separator_lengths[i] if separator_lengths and i < len(separator_lengths) else 2)
+    if encoding == 'gbk':
+        texts = [text.decode('gbk').encode('utf-8') for text in texts]
+        positions = [position.decode('gbk').encode('utf-8') for position in positions]
+
+    timeline = CueTimeline(starts, ends, texts, positions, raw=True)
+    timeline.invalid_lines = invalid_lines
+    return timeline, encoding
+
+# 待解析字幕总大小达到该值时才启用进程池（启动进程有约零点几秒的固定开销，小批量逐个解析更快）
+PARALLEL_PARSE_MIN_BYTES = 8 * 1024 * 1024
+
+def parse_subtitle_file(srt_path, passthrough=False):
+    """
+    解析字幕文件（模块级函数，可在解析进程池中调用）
+    
+    返回: (CueTimeline, 编码名)；直通模式下UTF-16/32文件按文本方式解析
+    """
+    result = read_srt_file_raw(srt_path) if passthrough else None
+    return result if result is not None else read_srt_file(srt_path)
+
+def _srt_time_fields(ms_values):
+    """毫秒数组 -> (时, 分, 秒, 毫秒) 四个整数列表，负数按0输出"""
+    if np is not None:
+        ms_values = np.maximum(ms_values, 0)
+        return ((ms_values // 3600000).tolist(), (ms_values % 3600000 // 60000).tolist(),
+                (ms_values % 60000 // 1000).tolist(), (ms_values % 1000).tolist())
+    ms_values = [max(ms, 0) for ms in ms_values]
+    return ([ms // 3600000 for ms in ms_values], [ms % 3600000 // 60000 for ms in ms_values],
+            [ms % 60000 // 1000 for ms in ms_values], [ms % 1000 for ms in ms_values])
+
+class SrtStreamWriter:
+    """
+    流式SRT写入（UTF-8）：每集处理完立即重新编号并写入同目录下的临时文件，
+    全部完成后 commit() 原子替换到目标路径；出错或中途终止时 abort() 删除临时文件，
+    原有输出文件保持不变。内存占用只与单集字幕大小有关。
+    """
+    def __init__(self, output_path, eol=os.linesep):
+        self.output_path = output_path
+        self.eol = eol
+        self.cue_count = 0
+        self.bytes_written = 0
+        output_dir = os.path.dirname(os.path.abspath(output_path))
+        fd, self.temp_path = tempfile.mkstemp(prefix=os.path.basename(output_path) + '.', suffix='.tmp', dir=output_dir)
+        self.file = os.fdopen(fd, 'wb')
+
+    def write_timeline(self, timeline):
+        """写入一集字幕（序号接续前面各集），返回写入条数"""
+        if timeline.raw:
+            return self._write_raw_timeline(timeline)
+        blocks = []
+        index = self.cue_count
+        for sh, sm, ss, sms, eh, em, es, ems, position, text in zip(
+                *_srt_time_fields(timeline.starts), *_srt_time_fields(timeline.ends), timeline.positions, timeline.texts):
+            index += 1
+            block = '%d\n%02d:%02d:%02d,%03d --> %02d:%02d:%02d,%03d%s\n%s\n' % (
+                index, sh, sm, ss, sms, eh, em, es, ems, ' ' + position if position.strip() else '', text)
+            blocks.append(block if block.endswith('\n\n') else block + '\n')
+        data = ''.join(blocks)
+        if self.eol != '\n':
+            data = data.replace('\n', self.eol)
+        return self._write_block_data(data.encode('utf-8'), index)
+
+    def _write_raw_timeline(self, timeline):
+        """直通写入：只生成序号行和时间行，字幕文本字节原样拼接"""
+        blocks = []
+        index = self.cue_count
+        for sh, sm, ss, sms, eh, em, es, ems, position, text in zip(
+                *_srt_time_fields(timeline.starts), *_srt_time_fields(timeline.ends), timeline.positions, timeline.texts):
+            index += 1
+            block = b'%d\n%02d:%02d:%02d,%03d --> %02d:%02d:%02d,%03d%s\n%s\n' % (
+                index, sh, sm, ss, sms, eh, em, es, ems, b' ' + position if position.strip() else b'', text)
+            blocks.append(block if block.endswith(b'\n\n') else block + b'\n')
+        data = b''.join(blocks)
+        if self.eol != '\n':
+            data = data.replace(b'\n', self.eol.encode('ascii'))
+        return self._write_block_data(data, index)
+
+    def write_encoded_blocks(self, data, count):
+        """写入已编码、序号已接续的 count 条字幕块（复用上次合并的结果时使用）"""
+        return self._write_block_data(data, self.cue_count + count)
+
+    def _write_block_data(self, data, last_index):
+        """写入编码好的字幕块并更新序号，返回本次写入条数"""
+        self.file.write(data)
+        self.file.flush()
+        self.bytes_written += len(data)
+        written = last_index - self.cue_count
+        self.cue_count = last_index
+        return written
+
+    def commit(self):
+        """落盘并原子替换目标文件"""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+        os.replace(self.temp_path, self.output_path)
+        self.temp_path = None
+
+    def abort(self):
+        """放弃写入并删除临时文件（commit 之后调用无效果）"""
+        if self.temp_path is None:
+            return
+        self.file.close()
+        try:
+            os.remove(self.temp_path)
+        except OSError:
+            pass
+        self.temp_path = None
+
+_SRT_INDEX_PATTERNS = {}
+
+def renumber_srt_blocks(data, first_index, eol=os.linesep):
+    """
+    把 SrtStreamWriter 写出的一段字幕块的序号改为从 first_index + 1 起连续编号
+    
+    字幕文本中不会出现空行（解析时按空行切分字幕块），因此每个序号都在数据开头或空行之后。
+    返回: (新数据, 改写的序号个数)；调用方应核对个数与条数一致
+    """
+    pattern = _SRT_INDEX_PATTERNS.get(eol)
+    if pattern is None:
+        eol_bytes = re.escape(eol.encode('ascii'))
+        pattern = _SRT_INDEX_PATTERNS[eol] = re.compile(rb'(?:^|(?<=' + eol_bytes + eol_bytes + rb'))\d+(?=' + eol_bytes + rb')')
+    next_index = itertools.count(first_index + 1)
+    return pattern.subn(lambda match: b'%d' % next(next_index), data)
+
+class MergeArtifactCache:
+    """
+    记录每个输出文件上次合并的逐集产物，用于增量重新合并
+    
+    每集记录: 输入指纹（字幕路径+大小+修改时间、解析方式、视频、帧精确时长、累积偏移、换行符）、
+    该集在输出文件中的字节范围、起始序号和条数，以及检查发现的问题。
+    字幕块本身不放在内存里，复用时直接从上次的输出文件按字节范围复制；
+    输出文件被外部修改（大小或修改时间不同）时整条记录作废。
+    指定 db_path 时记录同时保存到SQLite（位于用户缓存目录），重新启动程序或命令行再次运行时仍可复用；
+    未指定时只在本进程内复用。数据库中超过 max_stored_outputs 个输出文件时按最近使用时间淘汰。
+    """
+    def __init__(self, db_path=None, max_outputs=16, max_stored_outputs=500):
+        self.max_outputs = max_outputs
+        self.max_stored_outputs = max_stored_outputs
+        self.outputs = OrderedDict()  # 输出路径 -> ((大小, 修改时间ns), [每集产物dict或None, ...])
+        self.lock = threading.Lock()
+        self.conn = None
+        if db_path:
+            self.conn = sqlite3.connect(db_path, check_same_thread=False)
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS merge_artifacts ("
+                " output_path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL,"
+                " artifacts TEXT NOT NULL, last_access REAL NOT NULL)")
+            self.conn.commit()
+
+    def get(self, output_path):
+        """返回输出文件仍与记录一致时的逐集产物列表，否则返回None"""
+        try:
+            stat = os.stat(output_path)
+        except OSError:
+            return None
+        file_state = (stat.st_size, stat.st_mtime_ns)
+        with self.lock:
+            record = self.outputs.get(output_path)
+            if record is None or record[0] != file_state:
+                # 内存中没有或已过期：其他进程（如命令行或上次运行）可能保存了更新的记录
+                self.outputs.pop(output_path, None)
+                record = self._load(output_path)
+                if record is None or record[0] != file_state:
+                    return None
+                self.outputs[output_path] = record
+                self._trim_memory()
+            self.outputs.move_to_end(output_path)
+            return record[1]
+
+    def put(self, output_path, artifacts):
+        """输出文件提交后记录本次的逐集产物"""
+        stat = os.stat(output_path)
+        record = ((stat.st_size, stat.st_mtime_ns), artifacts)
+        with self.lock:
+            self.outputs.pop(output_path, None)
+            self.outputs[output_path] = record
+            self._trim_memory()
+            self._store(output_path, record)
+
+    def clear(self):
+        """清空内存中的记录；已保存的记录仍会在输出文件未变时被读回复用"""
+        with self.lock:
+            self.outputs.clear()
+
+    def _trim_memory(self):
+        while len(self.outputs) > self.max_outputs:
+            self.outputs.popitem(last=False)
+
+    def _load(self, output_path):
+        """从数据库读取一条记录（持有锁时调用），没有或无法读取时返回None"""
+        if self.conn is None:
+            return None
+        abs_path = os.path.abspath(output_path)
+        try:
+            row = self.conn.execute("SELECT size, mtime_ns, artifacts FROM merge_artifacts WHERE output_path = ?",
+                                    (abs_path,)).fetchone()
+            if row is None:
+                return None
+            artifacts = json.loads(row[2])
+            for artifact in artifacts:
+                if artifact is not None:
+                    artifact['key'] = tuple(artifact['key'])  # JSON中为列表，与 _merge_artifact_key 的元组比较
+            self.conn.execute("UPDATE merge_artifacts SET last_access = ? WHERE output_path = ?", (time.time(), abs_path))
+            self.conn.commit()
+        except (sqlite3.Error, ValueError, TypeError, KeyError):
+            return None
+        return (row[0], row[1]), artifacts
+
+    def _store(self, output_path, record):
+        """把记录写入数据库并淘汰超出容量的最久未使用条目（持有锁时调用），写入失败时只保留在内存中"""
+        if self.conn is None:
+            return
+        try:
+            (size, mtime_ns), artifacts = record
+            self.conn.execute(
+                "INSERT OR REPLACE INTO merge_artifacts (output_path, size, mtime_ns, artifacts, last_access)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (os.path.abspath(output_path), size, mtime_ns, json.dumps(artifacts, ensure_ascii=False), time.time()))
+            count = self.conn.execute("SELECT COUNT(*) FROM merge_artifacts").fetchone()[0]
+            if count > self.max_stored_outputs:
+                self.conn.execute(
+                    "DELETE FROM merge_artifacts WHERE output_path IN"
+                    " (SELECT output_path FROM merge_artifacts ORDER BY last_access LIMIT ?)",
+                    (count - self.max_stored_outputs,))
+            self.conn.commit()
+        except (sqlite3.Error, ValueError, TypeError):
+            pass
+
+# 集数识别规则：EP + 数字（忽略大小写，允许EP和数字之间有空格）
+EPISODE_PATTERN = re.compile(r'EP\s*(\d+)', re.IGNORECASE)
+
+def extract_episode_number(name):
+    """从文件名中提取EP集数，没有EP前缀时返回None"""
+    ep_match = EPISODE_PATTERN.search(name)
+    return int(ep_match.group(1)) if ep_match else None
+
+class SubtitleMatchIndex:
+    """
+    视频↔字幕匹配索引（每次扫描文件列表后构建一次，之后每次匹配都是O(1)查字典）
+    
+    匹配规则与逐个比较时相同：优先完全相同的基础名（忽略大小写），其次EP集数；
+    同一基础名/集数对应多个文件时，取排序靠前的那个，并在 duplicate_* 中记录以便提前提示。
+    """
+    def __init__(self, video_files_data, srt_files_data):
+        self.srt_by_name = {}
+        self.srt_by_episode = {}
+        for srt_data_item in srt_files_data:
+            srt_base_name = srt_data_item[2]
+            self.srt_by_name.setdefault(srt_base_name.lower(), srt_data_item)
+            ep_num = extract_episode_number(srt_base_name)
+            if ep_num is not None:
+                self.srt_by_episode.setdefault(ep_num, []).append(srt_data_item)
+
+        # 反向索引保存 (列表序号, 视频数据项)
+        self.video_by_name = {}
+        self.video_by_episode = {}
+        for video_idx, video_data_item in enumerate(video_files_data):
+            self.video_by_name.setdefault(video_data_item[2].lower(), (video_idx, video_data_item))
+            ep_num = extract_episode_number(video_data_item[2])
+            if ep_num is not None:
+                self.video_by_episode.setdefault(ep_num, []).append((video_idx, video_data_item))
+
+        # 同一集数对应多个文件：匹配时只会用到第一个，需要提醒用户
+        self.duplicate_srt_episodes = {ep: [item[0] for item in items]
+                                       for ep, items in self.srt_by_episode.items() if len(items) > 1}
+        self.duplicate_video_episodes = {ep: [item[1][0] for item in items]
+                                         for ep, items in self.video_by_episode.items() if len(items) > 1}
+
+    def match_subtitle(self, video_data_item):
+        """正向匹配：视频 → 字幕数据项 (srt_name, srt_full_path, srt_base_name) 或 None"""
+        video_base_name = video_data_item[2]
+        matched_srt_data = self.srt_by_name.get(video_base_name.lower())
+        if matched_srt_data is None:
+            ep_num = extract_episode_number(video_base_name)
+            if ep_num is not None and ep_num in self.srt_by_episode:
+                matched_srt_data = self.srt_by_episode[ep_num][0]
+        return matched_srt_data
+
+    def match_video(self, srt_data_item):
+        """反向匹配：字幕 → (视频列表序号, 视频数据项)，找不到时返回 (-1, None)"""
+        srt_base_name = srt_data_item[2]
+        matched = self.video_by_name.get(srt_base_name.lower())
+        if matched is None:
+            ep_num = extract_episode_number(srt_base_name)
+            if ep_num is not None and ep_num in self.video_by_episode:
+                matched = self.video_by_episode[ep_num][0]
+        return matched if matched is not None else (-1, None)
+
+def find_ffprobe_path():
+    """查找ffprobe：打包资源 → 程序所在目录的ffprobe.exe → 系统PATH，都没有时返回None"""
+    # 1. 首先尝试从打包的资源中获取
+    if getattr(sys, 'frozen', False):
+        # 运行在PyInstaller打包的exe中
+        bundle_dir = sys._MEIPASS
+        ffprobe_path = os.path.join(bundle_dir, 'ffprobe.exe')
+        if os.path.exists(ffprobe_path):
+            return ffprobe_path
+    
+    # 2. 尝试在当前目录查找
+    current_dir_ffprobe = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ffprobe.exe')
+    if os.path.exists(current_dir_ffprobe):
+        return current_dir_ffprobe
+    
+    # 3. 检查系统PATH中是否有ffprobe
+    try:
+        subprocess.run(['ffprobe', '-version'], capture_output=True, check=True)
+        return 'ffprobe'
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        pass
+    
+    # 4. 如果都没有找到，返回None
+    return None
+
+VIDEO_EXTENSIONS = ('.mp4', '.mov', '.avi', '.mkv', '.wmv', '.flv')
+SUBTITLE_EXTENSIONS = ('.srt',)
+
+# 帧数来源层级的显示名称
+FRAME_TIER_NAMES = {'metadata': '容器元数据', 'packets': '数据包计数', 'decode': '解码计数'}
+
+# 命令行退出码（参数错误时 argparse 以2退出）
+EXIT_OK = 0
+EXIT_MERGE_FAILED = 1  # 没有视频、没有可写入的字幕或合并出错
+EXIT_MATCH_FAILED = 3  # 有视频找不到对应字幕
+EXIT_SUBTITLE_PROBLEMS = 4  # --strict 时发现时间轴乱序或超出时长
+
+class SubtitleMergeEngine:
+    """
+    字幕合并流程（扫描 → 探测 → 匹配 → 检查 → 合并），不包含任何界面代码
+    
+    选项用普通属性保存（界面中对应各复选框）；日志、进度和提示通过 log_message / _notify /
+    _on_progress / _on_status / _on_video_probed 输出，图形界面重写这些方法即可。
+    """
+    # 可由界面或批量任务统一设置的合并选项
+    OPTION_NAMES = ('auto_sort', 'backup', 'auto_suffix', 'verify_frames', 'passthrough', 'perf_report')
+
+    def __init__(self, ffprobe_path=None, use_probe_cache=True):
+        # 初始化ffprobe路径（未指定时自动查找）
+        self.ffprobe_path = ffprobe_path or self._get_ffprobe_path()
+        # 视频探测结果的持久化缓存，打不开时（如缓存目录只读）不影响正常扫描
+        self.probe_cache = self._open_probe_cache() if use_probe_cache else None
+        # 上次合并的逐集产物，重新合并时复用未变化的集；不使用持久化缓存时只在本进程内复用
+        self.merge_artifacts = self._open_merge_artifact_cache() if use_probe_cache else MergeArtifactCache()
+
+        self.video_folder = ''
+        self.srt_folder = ''
+        self.auto_sort = True  # 智能数字排序文件
+        self.backup = True  # 合并前备份原文件
+        self.auto_suffix = True  # 自动添加集数后缀
+        self.probe_workers = os.cpu_count() or 4  # 视频时长扫描的并发数
+        self.parse_workers = None  # 字幕解析进程数，None表示CPU核心数
+        self.verify_frames = False  # 是否对每个视频解码校验帧数
+        self.passthrough = False  # 直通合并：只改写序号和时间行，字幕文本按原始字节复制
+        self.perf_report = True  # 合并成功后在输出文件旁写出性能报告（同名 .perf.json）
+        # 批量合并时多部剧共用的线程池（视频探测）和进程池（字幕解析），为None时各自创建
+        self.probe_executor = None
+        self.probe_executor_workers = 0  # 共用探测线程池的线程数（创建线程池时一并设置）
+        self.parse_executor = None
+
+        # (filename, full_path, relative_subfolder, base_name_for_matching)
+        self.video_files_data = []
+        self.srt_files_data = []
+        self.folder_durations = {}
+        self.total_duration_seconds = 0.0
+        # 增量重新扫描用：上次扫描的视频文件夹、各视频的 (大小, 修改时间ns)，
+        # 以及已计入统计的 (子文件夹, 时长)；文件夹时长与总时长按差量增减
+        self.scanned_video_folder = None
+        self.video_file_stats = {}
+        self.video_durations_counted = {}
+        self.folder_video_counts = {}
+        self.match_index = SubtitleMatchIndex([], [])  # 视频↔字幕匹配索引，文件列表变化后重建
+        self.subtitle_cache = ParsedSubtitleCache()  # 已解析字幕，检查与合并共用
+        self.log_level = LOG_DEBUG  # 低于此级别的日志不输出（LOG_INFO 可隐藏逐集细节）
+        self.job_control = JobControl()  # 取消、暂停当前的扫描或合并
+        self.metrics = RunMetrics('scan')  # 当前扫描或合并的分阶段计时和计数
+        self.scan_metrics = None  # 最近一次扫描的统计，一并写入合并的性能报告
+        self.processing = False
+
+    def log_message(self, message, level=LOG_INFO):
+        """输出一条日志（命令行下写到标准错误）；低于 log_level 的日志不输出"""
+        if level < self.log_level:
+            return
+        timestamp = time.strftime("%H:%M:%S", time.localtime())
+        print(f"[{timestamp}] {message}", file=sys.stderr, flush=True)
+
+    def _notify(self, kind, title, message):
+        """需要用户注意的提示（kind: info / warning / error）；内容已写入日志，命令行下不再重复输出"""
+
+    def _on_progress(self, value, maximum=None):
+        """进度更新"""
+
+    def _on_status(self, text):
+        """状态文字更新"""
+
+    def _on_video_probed(self, index, framerate_display, duration_display):
+        """单个视频探测完成（index 为在 video_files_data 中的位置）"""
+
+    def get_base_filename(self, filename_with_ext):
+        """获取不带后缀的文件主名，用于匹配"""
+        return os.path.splitext(filename_with_ext)[0]
+
+    def natural_sort_key_for_filename(self, filename_str):
+        """针对纯文件名的自然排序键函数"""
+        return [int(text) if text.isdigit() else text.lower()
+                for text in re.split('([0-9]+)', filename_str)]
+
+    def smart_folder_sort_key(self, folder_name):
+        """智能文件夹排序键函数，专门处理包含数字范围的文件夹名称"""
+        # 寻找文件夹名中的数字范围模式，如 "1-30", "31-61" 等
+        range_pattern = r'(\d+)-(\d+)'
+        range_matches = re.findall(range_pattern, folder_name)
+        
+        if range_matches:
+            # 如果找到数字范围，使用第一个数字作为主要排序键
+            first_number = int(range_matches[0][0])
+            # 为了处理重叠范围，也考虑结束数字
+            last_number = int(range_matches[0][1])
+            # 使用起始数字作为主排序键，结束数字作为次排序键
+            return (first_number, last_number, folder_name.lower())
+        else:
+            # 如果没有找到范围，寻找单独的数字
+            numbers = re.findall(r'\d+', folder_name)
+            if numbers:
+                # 使用第一个找到的数字作为排序键
+                first_number = int(numbers[0])
+                return (first_number, 0, folder_name.lower())
+            else:
+                # 如果没有数字，使用字母排序，但排在有数字的后面
+                return (float('inf'), 0, folder_name.lower())
+
+    def _open_probe_cache(self):
+        """打开用户缓存目录中的探测缓存数据库，失败时返回None"""
+        try:
+            return ProbeCache(os.path.join(get_user_cache_dir(), 'probe_cache.sqlite3'))
+        except (OSError, sqlite3.Error):
+            return None
+
+    def _open_merge_artifact_cache(self):
+        """打开用户缓存目录中保存的合并产物记录，失败时只在内存中记录"""
+        try:
+            return MergeArtifactCache(os.path.join(get_user_cache_dir(), 'merge_artifacts.sqlite3'))
+        except (OSError, sqlite3.Error):
+            return MergeArtifactCache()
+
+    def _get_ffprobe_path(self):
+        """获取ffprobe.exe的路径"""
+        return find_ffprobe_path()
+
+    def get_episode_number_from_filename(self, filename):
+        """从文件名中提取集数数字（仅识别EP前缀标准格式）"""
+        # 只匹配 EP + 数字 模式（例如：EP1, EP2, EP01, EP 1等）
+        # 如果没有EP前缀，返回None（不符合命名标准）
+        return extract_episode_number(filename)
+
+    def find_matching_subtitle(self, video_data_item):
+        """
+        统一的字幕匹配函数
+        
+        参数:
+            video_data_item: 视频数据项 [文件名, 完整路径, 基础名, 时长, 帧数, 帧率]
+            
+        返回:
+            匹配的字幕数据项 (srt_name, srt_full_path, srt_base_name) 或 None
+        """
+        # 1. 首先尝试精确匹配（忽略大小写）
+        # 2. 如果没有精确匹配，尝试EP模式匹配
+        return self.match_index.match_subtitle(video_data_item)
+
+    def generate_output_filename_with_suffix(self, original_path, start_episode, end_episode):
+        """生成带集数后缀的输出文件名"""
+        if not self.auto_suffix:
+            return original_path
+            
+        path_obj = Path(original_path)
+        name_without_ext = path_obj.stem
+        extension = path_obj.suffix
+        directory = path_obj.parent
+        
+        # 生成集数后缀
+        suffix = f"{start_episode}-{end_episode}"
+        new_name = f"{name_without_ext}{suffix}{extension}"
+        
+        return str(directory / new_name)
+
+    def _rebuild_match_index(self):
+        """根据当前文件列表重建匹配索引，并提前报告重复的集数"""
+        self.match_index = SubtitleMatchIndex(self.video_files_data, self.srt_files_data)
+        for label, duplicates in (("字幕", self.match_index.duplicate_srt_episodes),
+                                  ("视频", self.match_index.duplicate_video_episodes)):
+            if not duplicates:
+                continue
+            self.log_message(f"⚠ 发现 {len(duplicates)} 个集数对应多个{label}文件，匹配时只使用排序靠前的文件：")
+            for ep_num in sorted(duplicates)[:10]:
+                self.log_message(f"  • EP{ep_num}: {'、'.join(duplicates[ep_num])}")
+            if len(duplicates) > 10:
+                self.log_message(f"  ... 还有 {len(duplicates) - 10} 个集数")
+
+    def _get_probe_worker_count(self):
+        """读取探测并发数设置，非法输入时回退到CPU核心数"""
+        try:
+            workers = int(self.probe_workers)
+        except (ValueError, TypeError):
+            workers = os.cpu_count() or 4
+        return max(1, min(workers, 64))
+
+    def _probe_video_file(self, video_full_path):
+        """
+        在工作线程中探测单个视频（不操作界面）
+        
+        返回: dict，包含 total_frames, fps, duration, raw_duration, framerate
+        """
+        self.job_control.checkpoint()  # 暂停时排队中的视频在此等待，取消后不再开始
+        # 先查持久化缓存；未命中时每个视频只调用一次ffprobe，以下三个函数共用同一份探测结果
+        # 要求校验帧数时，只接受经过解码计数的缓存结果
+        required_tier = 'decode' if self.verify_frames else None
+        metrics = self.metrics
+        probe_info = None
+        if self.probe_cache:
+            with metrics.stage('probe_cache'):
+                probe_info = self.probe_cache.get(video_full_path, required_tier)
+        from_cache = probe_info is not None
+        if not from_cache:
+            with metrics.stage('probe_native'):
+                probe_info = self._read_video_info_native(video_full_path)
+        if probe_info is None and self.ffprobe_path:
+            with metrics.stage('probe_ffprobe'):
+                probe_info = self.probe_video_info_ffprobe(video_full_path)
+            if probe_info is not None:
+                probe_info['source'] = 'ffprobe'
+        if probe_info is None:
+            # ffprobe不可用或探测失败（已记录日志），不再重复调用
+            if not self.ffprobe_path:
+                self.log_message(f"警告: ffprobe不可用，跳过 '{os.path.basename(video_full_path)}' 时长获取")
+            return {'total_frames': None, 'fps': None, 'duration': None, 'raw_duration': 0.0,
+                    'framerate': "错误" if self.ffprobe_path else "未知", 'source': None, 'frame_tier': None}
+        # 获取基于帧的精确信息
+        total_frames, fps_decimal, duration = self.get_video_frame_info_ffprobe(video_full_path, probe_info)
+        # 同时获取ffprobe直接报告的duration（用于文件夹时长统计）
+        raw_duration = self.get_video_duration_ffprobe(video_full_path, probe_info)
+        # 缓存最终结果（包含逐层计数回填的帧数），下次扫描无需再调用ffprobe；
+        # 取消时被结束的ffprobe结果不完整，不写入缓存
+        self.job_control.checkpoint()
+        if not from_cache and self.probe_cache:
+            self.probe_cache.put(video_full_path, probe_info)
+        result = {'total_frames': total_frames, 'fps': fps_decimal, 'duration': duration,
+                  'raw_duration': raw_duration, 'framerate': None,
+                  'source': 'cache' if from_cache else probe_info.get('source'),
+                  'frame_tier': probe_info.get('frame_tier')}
+        if total_frames is None or fps_decimal is None or duration is None:
+            # 回退到旧方法：只有流时长和帧率文字
+            result['framerate'] = self.get_video_framerate_ffprobe(video_full_path, probe_info)
+        return result
+
+    def _read_video_info_native(self, video_full_path):
+        """用内置解析器读取视频头部信息（MP4/MOV、MKV），无法可靠解析时返回None"""
+        lower_path = video_full_path.lower()
+        try:
+            if lower_path.endswith(MP4_EXTENSIONS):
+                return read_mp4_video_info(video_full_path)
+            if lower_path.endswith(MKV_EXTENSIONS):
+                probe_info = read_mkv_video_info(video_full_path)
+                # 只采用可信的结果，其余交给ffprobe
+                if probe_info and probe_info['confidence'] == 'high':
+                    return probe_info
+        except (OSError, ValueError, EOFError, struct.error):
+            pass
+        return None
+
+    def check_subtitle_problems_after_scan(self):
+        """
+        扫描完成后检查字幕文件问题并弹窗提醒
+        
+        返回: (时间轴乱序列表, 超出时长列表)
+        """
+        if not self.video_files_data or not self.srt_files_data:
+            return [], []
+        
+        self.log_message("开始检查字幕文件问题...")
+        # 检查计入最近一次扫描的统计，还没有扫描统计时开始新的一轮（解析耗时由 load_subtitle_file 记录）
+        if self.scan_metrics is None:
+            self.scan_metrics = RunMetrics('scan')
+        metrics = self.scan_metrics
+        check_start_time = time.perf_counter()
+        check_seconds = 0.0
+        
+        time_disorder_subtitles = []
+        large_time_diff_subtitles = []
+        
+        # 遍历所有字幕文件进行检查
+        for srt_idx, srt_data_item in enumerate(self.srt_files_data):
+            self.job_control.checkpoint()
+            srt_name, srt_full_path, srt_base_name = srt_data_item
+            # 反向匹配：从字幕找视频（精确匹配优先，其次EP模式）
+            video_idx, matched_video_data = self.match_index.match_video(srt_data_item)
+            
+            if not matched_video_data:
+                continue
+            
+            video_name = matched_video_data[0]
+            video_duration_seconds = matched_video_data[3]
+            
+            # 检查字幕文件（解析结果会缓存，合并时直接复用）
+            try:
+                timeline, _ = self.load_subtitle_file(srt_full_path, self.passthrough, metrics)
+            except Exception:
+                continue
+            
+            # 检查时间轴乱序
+            episode_check_start = time.perf_counter()
+            is_disorder, regression_details = self._check_subtitle_time_disorder(timeline, srt_name)
+            if is_disorder:
+                disorder_info = {
+                    'video_name': video_name,
+                    'srt_name': srt_name,
+                    'srt_path': srt_full_path,
+                    'episode_num': video_idx + 1,  # 序号
+                    'episode_display': srt_name,  # 显示文件名
+                    'details': regression_details
+                }
+                time_disorder_subtitles.append(disorder_info)
+            
+            # 检查字幕超出视频时长
+            if len(timeline) > 0 and video_duration_seconds > 0:
+                max_end_time_ms = max(timeline.max_end()[1], 0)
+                
+                srt_end_time_seconds = max_end_time_ms / 1000.0
+                time_diff = srt_end_time_seconds - video_duration_seconds
+                
+                if time_diff > 3.0:
+                    large_diff_info = {
+                        'video_name': video_name,
+                        'srt_name': srt_name,
+                        'srt_path': srt_full_path,
+                        'episode_num': video_idx + 1,  # 序号
+                        'episode_display': srt_name,  # 显示文件名
+                        'time_diff': time_diff,
+                        'srt_end': self.format_duration(srt_end_time_seconds),
+                        'video_duration': self.format_duration(video_duration_seconds)
+                    }
+                    large_time_diff_subtitles.append(large_diff_info)
+            check_seconds += time.perf_counter() - episode_check_start
+        metrics.add_time('check', check_seconds, len(self.srt_files_data))
+        metrics.finish()
+        self.log_message(f"字幕检查耗时 {time.perf_counter() - check_start_time:.2f} 秒（其中检查乱序和时长 {check_seconds:.2f} 秒）")
+
+        # 显示检查结果
+        has_problems = large_time_diff_subtitles or time_disorder_subtitles
+        
+        if has_problems:
+            self.show_subtitle_problems_dialog(time_disorder_subtitles, large_time_diff_subtitles)
+        else:
+            self.log_message("✓ 字幕文件检查完成，未发现问题！")
+        return time_disorder_subtitles, large_time_diff_subtitles
+
+    def show_subtitle_problems_dialog(self, time_disorder_subtitles, large_time_diff_subtitles):
+        """显示字幕问题弹窗"""
+        self.log_message("")
+        self.log_message("="*70)
+        self.log_message("🚨 检测到字幕文件存在问题！")
+        self.log_message("="*70)
+        
+        warning_details = []
+        
+        # 处理时间轴乱序
+        if time_disorder_subtitles:
+            self.log_message(f"\n【时间轴乱序】检测到 {len(time_disorder_subtitles)} 个字幕文件：")
+            for info in time_disorder_subtitles:
+                # 使用文件名显示，而不是序号
+                file_display = os.path.splitext(info['srt_name'])[0]  # 去掉扩展名
+                self.log_message(f"🔀 {file_display}: {info['srt_name']}")
+                self.log_message(f"   问题: {info['details']}")
+                warning_details.append(f"{file_display}: 时间轴乱序")
+        
+        # 处理超出3秒
+        if large_time_diff_subtitles:
+            self.log_message(f"\n【超出时长】检测到 {len(large_time_diff_subtitles)} 个字幕文件：")
+            for info in large_time_diff_subtitles:
+                # 使用文件名显示，而不是序号
+                file_display = os.path.splitext(info['srt_name'])[0]  # 去掉扩展名
+                self.log_message(f"⏰ {file_display}: {info['srt_name']}")
+                self.log_message(f"   超出: {info['time_diff']:.3f}秒")
+                warning_details.append(f"{file_display}: 超出 {info['time_diff']:.1f}秒")
+        
+        self.log_message("="*70)
+        
+        # 弹窗提醒
+        warning_message = "⚠️ 检测到字幕文件存在问题，建议修复后再合并！\n\n"
+        
+        if time_disorder_subtitles:
+            warning_message += f"🔀 时间轴乱序：{len(time_disorder_subtitles)} 个文件\n"
+            warning_message += "   • 字幕时间轴前后顺序混乱\n"
+            warning_message += "   • 拖入视频软件会显示很长\n\n"
+        
+        if large_time_diff_subtitles:
+            warning_message += f"⏰ 超出时长：{len(large_time_diff_subtitles)} 个文件\n"
+            warning_message += "   • 字幕比视频长超过3秒\n"
+            warning_message += "   • 可能版本不匹配\n\n"
+        
+        warning_message += "问题文件详情：\n"
+        display_items = warning_details[:8]
+        warning_message += "\n".join(display_items)
+        
+        if len(warning_details) > 8:
+            warning_message += f"\n... 还有 {len(warning_details) - 8} 个文件"
+        
+        warning_message += "\n\n⚠️ 建议先修复这些问题，再进行字幕合并！"
+        
+        self._notify('warning', "字幕文件问题警告", warning_message)
+
+    def check_video_subtitle_matching(self):
+        """
+        检查所有视频是否都能找到对应的字幕文件
+        
+        返回: 找不到字幕的视频列表（dict: index, name, ep_display）
+        """
+        if not self.video_files_data or not self.srt_files_data:
+            return []
+        
+        self.log_message("开始检查视频与字幕的匹配情况...")
+        
+        unmatched_videos = []
+        
+        # 遍历所有视频文件，检查是否有对应的字幕
+        for video_idx, video_data_item in enumerate(self.video_files_data):
+            video_name = video_data_item[0]
+            
+            # 使用统一的匹配函数
+            matched_srt_data = self.find_matching_subtitle(video_data_item)
+            
+            # 如果找不到匹配的字幕，记录下来
+            if not matched_srt_data:
+                # 尝试提取EP集数用于显示
+                ep_num = self.get_episode_number_from_filename(video_name)
+                ep_display = f"EP{ep_num}" if ep_num else "未知集数"
+                
+                unmatched_videos.append({
+                    'index': video_idx + 1,
+                    'name': video_name,
+                    'ep_display': ep_display
+                })
+        
+        # 如果有视频找不到字幕，弹窗警告
+        if unmatched_videos:
+            self.log_message("")
+            self.log_message("="*70)
+            self.log_message("❌ 视频与字幕匹配检查失败！")
+            self.log_message("="*70)
+            self.log_message(f"发现 {len(unmatched_videos)} 个视频文件无法找到对应的字幕：")
+            self.log_message("")
+            
+            for info in unmatched_videos:
+                self.log_message(f"❌ 序号{info['index']} ({info['ep_display']}): {info['name']}")
+            
+            self.log_message("")
+            self.log_message("="*70)
+            self.log_message("⚠️ 警告：如果继续合并，这些视频的时长会被跳过，")
+            self.log_message("      导致后续字幕的时间轴偏移出现严重错误！")
+            self.log_message("="*70)
+            
+            # 弹窗警告
+            warning_message = f"⚠️ 发现 {len(unmatched_videos)} 个视频无法找到对应的字幕文件！\n\n"
+            warning_message += "❌ 缺少字幕的视频：\n"
+            
+            # 最多显示10个
+            display_items = unmatched_videos[:10]
+            for info in display_items:
+                warning_message += f"• 序号{info['index']} ({info['ep_display']}): {info['name']}\n"
+            
+            if len(unmatched_videos) > 10:
+                warning_message += f"... 还有 {len(unmatched_videos) - 10} 个文件\n"
+            
+            warning_message += "\n⚠️ 严重警告：\n"
+            warning_message += "• 如果继续合并，这些视频的时长会被跳过\n"
+            warning_message += "• 会导致后续所有字幕的时间轴偏移错误\n"
+            warning_message += "• 合并后的字幕将无法正常使用\n\n"
+            warning_message += "🔧 建议解决方案：\n"
+            warning_message += "1. 检查字幕文件命名是否与视频一致\n"
+            warning_message += "2. 确保所有视频都有对应的字幕文件\n"
+            warning_message += "3. 确认字幕文件是否都包含EP前缀（如EP1、EP2）\n\n"
+            warning_message += "📋 匹配规则：\n"
+            warning_message += "• 优先：完全相同的文件名（不含扩展名）\n"
+            warning_message += "• 其次：EP+数字匹配（如EP1匹配EP1）"
+            
+            self._notify('error', "视频字幕匹配失败", warning_message)
+        else:
+            self.log_message("✓ 视频与字幕匹配检查通过！所有视频都找到了对应的字幕文件。")
+        return unmatched_videos
+
+    def format_duration(self, seconds_float):
+        if not isinstance(seconds_float, (int, float)) or seconds_float < 0: return "00:00:00,000"
+        milliseconds = int((seconds_float % 1) * 1000)
+        seconds_int = int(seconds_float)
+        hours = seconds_int // 3600
+        minutes = (seconds_int % 3600) // 60
+        seconds = seconds_int % 60
+        return f"{hours:02d}:{minutes:02d}:{seconds:02d},{milliseconds:03d}"
+
+    def format_duration_minutes_only(self, seconds_float):
+        """格式化时长为分钟:秒格式（用于文件夹时长显示）"""
+        if not isinstance(seconds_float, (int, float)) or seconds_float < 0: return "00:00"
+        seconds_int = int(seconds_float)
+        total_minutes = seconds_int // 60
+        seconds = seconds_int % 60
+        return f"{total_minutes}:{seconds:02d}"
+
+    def _run_ffprobe(self, args, timeout):
+        """
+        运行一次ffprobe（Windows下隐藏控制台窗口）
+        
+        返回: (returncode, stdout, stderr)；超时时结束子进程并抛出 subprocess.TimeoutExpired，
+              任务被取消时子进程随之结束，抛出 JobCancelled
+        """
+        startupinfo = None
+        if os.name == 'nt':
+            startupinfo = subprocess.STARTUPINFO()
+            startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+            startupinfo.wShowWindow = subprocess.SW_HIDE
+        process = subprocess.Popen([self.ffprobe_path] + args,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, encoding='utf-8', errors='replace', startupinfo=startupinfo)
+        self.metrics.count('ffprobe_spawned')
+        self.job_control.register_process(process)
+        try:
+            stdout, stderr = process.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            process.kill(); process.communicate()
+            raise
+        finally:
+            self.job_control.unregister_process(process)
+        if self.job_control.cancelled:
+            raise JobCancelled()
+        return process.returncode, stdout, stderr
+
+    def probe_video_info_ffprobe(self, video_path):
+        """
+        一次ffprobe调用同时获取视频流和容器信息（-show_streams -show_format -of json）
+        
+        返回: dict 或 None（探测失败）
+            fps: 帧率，Fraction分数形式（来自r_frame_rate，保持最高精度）
+            nb_frames: 容器记录的总帧数，未记录时为None
+            frame_tier: 帧数来源层级（'metadata' 容器元数据），帧数未知时为None
+            stream_duration: 视频流时长（秒），未记录时为None
+            container_duration: 容器时长（秒），未记录时为None
+        """
+        video_path_str = str(video_path)
+        if not self.ffprobe_path:
+            return None
+        try:
+            returncode, stdout, stderr = self._run_ffprobe(
+                ['-v', 'error', '-select_streams', 'v:0', '-show_streams', '-show_format', '-of', 'json', video_path_str],
+                timeout=30)
+        except subprocess.TimeoutExpired:
+            self.log_message(f"探测 '{os.path.basename(video_path_str)}' 超时。"); return None
+        except FileNotFoundError:
+            self.log_message("错误: ffprobe 命令未找到。"); self._notify('error', "ffprobe错误", "ffprobe 未找到"); return None
+
+        try:
+            data = json.loads(stdout) if stdout.strip() else {}
+        except ValueError:
+            data = {}
+        if returncode != 0 or not data:
+            self.log_message(f"警告: ffprobe未能探测 '{os.path.basename(video_path_str)}'. 错误: {stderr.strip() if stderr else '未知'}")
+            return None
+
+        streams = data.get('streams') or [{}]
+        stream = streams[0]
+        fmt = data.get('format') or {}
+        nb_frames = self._parse_ffprobe_number(stream.get('nb_frames'), int)
+        return {
+            'fps': self._parse_ffprobe_rational(stream.get('r_frame_rate')),
+            'nb_frames': nb_frames,
+            'stream_duration': self._parse_ffprobe_number(stream.get('duration'), float),
+            'container_duration': self._parse_ffprobe_number(fmt.get('duration'), float),
+            'frame_tier': 'metadata' if nb_frames is not None else None,
+        }
+
+    def _parse_ffprobe_rational(self, value):
+        """解析ffprobe的分数字段（如 "30000/1001"），无效时返回None"""
+        try:
+            if not value or value in ('N/A', '0/0'):
+                return None
+            fps = Fraction(value)
+            return fps if fps > 0 else None
+        except (ValueError, ZeroDivisionError):
+            return None
+
+    def _parse_ffprobe_number(self, value, cast):
+        """解析ffprobe的数字字段，"N/A" 或缺失时返回None"""
+        try:
+            return cast(value) if value not in (None, '', 'N/A') else None
+        except ValueError:
+            return None
+
+    def get_video_duration_ffprobe(self, video_path, probe_info=None):
+        """获取容器报告的视频时长（秒，保留3位小数）；可传入已有的探测结果避免重复调用ffprobe"""
+        video_path_str = str(video_path)
+        if not self.ffprobe_path and probe_info is None:
+            self.log_message(f"警告: ffprobe不可用，跳过 '{os.path.basename(video_path_str)}' 时长获取")
+            return 0.0
+        if probe_info is None:
+            probe_info = self.probe_video_info_ffprobe(video_path_str)
+        if probe_info is None:
+            return 0.0
+        duration = probe_info['container_duration']
+        if duration is None:
+            self.log_message(f"警告: ffprobe未能获取 '{os.path.basename(video_path_str)}' 时长 (无输出)."); return 0.0
+        # 使用Decimal来保持高精度
+        duration_decimal = Decimal(repr(duration)).quantize(Decimal('0.001'), rounding=ROUND_HALF_UP)
+        return float(duration_decimal)
+
+    def get_video_framerate_ffprobe(self, video_path, probe_info=None):
+        """获取视频帧率（显示用文字）；可传入已有的探测结果避免重复调用ffprobe"""
+        if probe_info is None:
+            if not self.ffprobe_path:
+                return "未知"
+            probe_info = self.probe_video_info_ffprobe(video_path)
+            if probe_info is None:
+                return "错误"
+        fps = probe_info['fps']
+        if fps is None:
+            return "未知"
+        framerate = float(fps)
+        # 格式化为常见的帧率显示
+        if framerate.is_integer():
+            return f"{int(framerate)}fps"
+        # 对于常见的帧率进行特殊处理
+        if abs(framerate - 23.976) < 0.1:
+            return "23.98fps"
+        elif abs(framerate - 29.97) < 0.1:
+            return "29.97fps"
+        elif abs(framerate - 59.94) < 0.1:
+            return "59.94fps"
+        return f"{framerate:.2f}fps"
+
+    def _count_video_frames(self, video_path_str):
+        """
+        容器未记录帧数时逐层计数
+        
+        1. 数据包计数（-count_packets，只解封装不解码，速度快）
+        2. 解码计数（-count_frames，逐帧解码，很慢）——仅在勾选「校验帧数」时使用
+        返回: (总帧数, 层级 'packets'/'decode')，失败时返回 (None, None)
+        """
+        video_name = os.path.basename(video_path_str)
+        if not self.ffprobe_path:
+            self.log_message(f"  错误：'{video_name}' 未记录帧数，且ffprobe不可用。")
+            return None, None
+        if self.verify_frames:
+            tier, count_option, entry, timeout = 'decode', '-count_frames', 'nb_read_frames', 600
+        else:
+            tier, count_option, entry, timeout = 'packets', '-count_packets', 'nb_read_packets', 60
+        try:
+            with self.metrics.stage(f'probe_{tier}'):
+                returncode, stdout, stderr = self._run_ffprobe(
+                    ['-v', 'error', '-select_streams', 'v:0', count_option,
+                     '-show_entries', f'stream={entry}',
+                     '-of', 'default=noprint_wrappers=1:nokey=1', video_path_str],
+                    timeout=timeout)
+            output = stdout.strip()
+            if returncode == 0 and output.isdigit():
+                return int(output), tier
+            error_details = stderr.strip()
+        except subprocess.TimeoutExpired:
+            error_details = f"{FRAME_TIER_NAMES[tier]}超时"
+        self.log_message(f"  错误：无法获取 '{video_name}' 的总帧数。{error_details}")
+        if not self.verify_frames:
+            self.log_message(f"  提示：可勾选「校验帧数（解码）」后重新扫描，使用解码计数。")
+        return None, None
+
+    def get_video_frame_info_ffprobe(self, video_path, probe_info=None):
+        """获取视频的帧数和精确帧率，并计算基于帧的精确时长；可传入已有的探测结果避免重复调用ffprobe"""
+        try:
+            if not self.ffprobe_path and probe_info is None:
+                return None, None, None
+                
+            video_path_str = str(video_path)
+            if probe_info is None:
+                probe_info = self.probe_video_info_ffprobe(video_path_str)
+            if probe_info is None:
+                return None, None, None
+
+            # 1. 帧率（分数形式，以获得最高精度）
+            fps = probe_info['fps']
+            if fps is None:
+                self.log_message(f"  错误：无法获取 '{os.path.basename(video_path_str)}' 的帧率。")
+                return None, None, None
+
+            # 2. 总帧数：优先使用容器元数据；不可用（或要求校验）时再逐层计数
+            total_frames = probe_info['nb_frames']
+            if self.verify_frames and probe_info.get('frame_tier') != 'decode':
+                total_frames = None
+            if total_frames is None:
+                total_frames, frame_tier = self._count_video_frames(video_path_str)
+                if total_frames is None:
+                    return None, None, None
+                # 回填探测结果，后续调用（及探测缓存）无需再次计数
+                probe_info['nb_frames'] = total_frames
+                probe_info['frame_tier'] = frame_tier
+
+            # 3. 核心逻辑：使用帧数和帧率计算精确时长（秒）
+            fps_decimal = float(fps)
+            calculated_duration = total_frames / fps_decimal
+
+            return total_frames, fps_decimal, calculated_duration
+            
+        except JobCancelled:
+            raise
+        except Exception as e:
+            self.log_message(f"获取视频帧信息失败: {str(e)}")
+            return None, None, None
+
+    def load_subtitle_file(self, srt_full_path, passthrough=False, metrics=None):
+        """
+        读取并解析字幕文件（编码自动检测，见 decode_srt_bytes），解析结果在检查与合并之间共享
+        
+        参数:
+            passthrough: 直通模式，字幕文本保留原始字节（UTF-16/32 文件仍按文本方式解析）
+            metrics: 记录解析耗时和计数的 RunMetrics，默认为当前的 self.metrics
+        返回: (CueTimeline, encoding)；缓存中的时间轴不可直接修改，需要修改时请先 copy()
+        无法解码或读取时抛出异常（UnicodeDecodeError / OSError 等）
+        """
+        kind = 'raw' if passthrough else 'text'
+        # 先取文件状态再读取：读取期间文件若被修改，下次校验时会因状态不同而重新解析
+        stat = os.stat(srt_full_path)
+        cached = self.subtitle_cache.get(srt_full_path, stat.st_size, stat.st_mtime_ns, kind)
+        if cached is not None:
+            return cached
+        if metrics is None:
+            metrics = self.metrics
+        with metrics.stage('parse'):
+            timeline, encoding = parse_subtitle_file(srt_full_path, passthrough)
+        metrics.count('subtitles_parsed')
+        metrics.count('bytes_read', stat.st_size)
+        metrics.count('cues_parsed', len(timeline))
+        self.subtitle_cache.put(srt_full_path, stat.st_size, stat.st_mtime_ns, timeline, encoding, kind)
+        return timeline, encoding
+
+    def _backup_output_file(self, output_path):
+        """备份已存在的输出文件"""
+        if not self.backup or not os.path.exists(output_path):
+            return
+        
+        backup_idx = 0
+        backup_path_base = output_path + ".bak"
+        backup_path = backup_path_base
+        
+        while os.path.exists(backup_path):
+            backup_idx += 1
+            backup_path = f"{backup_path_base}{backup_idx}"
+        
+        try:
+            os.rename(output_path, backup_path)
+            self.log_message(f"已创建备份: {backup_path}")
+        except Exception as e:
+            self.log_message(f"备份失败: {str(e)}")
+
+    def _check_subtitle_time_disorder(self, timeline, srt_name):
+        """
+        检查字幕时间轴是否乱序
+        
+        返回: (是否乱序, 详细信息字符串)
+        """
+        idx = timeline.first_disorder()
+        if idx < 0:
+            return False, ""
+        
+        prev_time_ms = int(timeline.starts[idx - 1])
+        curr_time_ms = int(timeline.starts[idx])
+        regression_details = f"第{idx}条 ({self.format_duration(curr_time_ms/1000)}) < 第{idx+1}条 ({self.format_duration(prev_time_ms/1000)})"
+        return True, regression_details
+
+    def _check_and_fix_subtitle_duration(self, timeline, video_duration_seconds, video_name, srt_name, processed_count):
+        """
+        检查并修正字幕时长（修正会直接写入 timeline，调用前须先 copy()）
+        
+        返回: (修正信息dict或None, 超出时长问题dict或None)
+        """
+        if len(timeline) == 0:
+            return None, None
+        
+        # 找到最大结束时间
+        max_end_idx, max_end_time_ms = timeline.max_end()
+        if max_end_time_ms <= 0:
+            max_end_idx, max_end_time_ms = -1, 0
+        
+        srt_end_time_seconds = max_end_time_ms / 1000.0
+        time_diff = srt_end_time_seconds - video_duration_seconds
+        
+        if abs(time_diff) <= 0.01:
+            self.log_message(f"  ✓ 字幕时长完美（差异 {time_diff:.3f}秒）", LOG_DEBUG)
+            return None, None
+        
+        if time_diff > 0:
+            # 字幕超出视频时长
+            formatted_vid_dur = self.format_duration(video_duration_seconds)
+            self.log_message(f"  ⚠️ 警告：字幕结束时间超出视频时长 {time_diff:.3f}秒", LOG_WARNING)
+            self.log_message(f"     字幕最大结束: {self.format_duration(srt_end_time_seconds)}", LOG_DEBUG)
+            self.log_message(f"     视频时长: {formatted_vid_dur}", LOG_DEBUG)
+            
+            if time_diff > 3.0:
+                # 超过3秒，记录问题但不修正
+                large_diff_info = {
+                    'video_name': video_name,
+                    'srt_name': srt_name,
+                    'episode_num': processed_count + 1,
+                    'episode_display': srt_name,
+                    'time_diff': time_diff,
+                    'srt_end': self.format_duration(srt_end_time_seconds),
+                    'video_duration': formatted_vid_dur
+                }
+                self.log_message(f"     ⚠️ 超出时间过长（>{time_diff:.3f}秒），建议检查字幕和视频是否匹配", LOG_WARNING)
+                return None, large_diff_info
+            else:
+                # 小于3秒，自动修正
+                correction_info = {
+                    'video_name': video_name,
+                    'srt_name': srt_name,
+                    'episode_num': processed_count + 1,
+                    'episode_display': srt_name,
+                    'time_diff': time_diff,
+                    'srt_end': self.format_duration(srt_end_time_seconds),
+                    'video_duration': formatted_vid_dur
+                }
+                
+                # 修正最大结束时间的字幕
+                if max_end_idx >= 0:
+                    timeline.ends[max_end_idx] = round(video_duration_seconds * 1000)
+                    
+                    self.log_message(f"     ✓ 已自动修正为: {formatted_vid_dur}")
+                
+                return correction_info, None
+        elif time_diff < -0.01:
+            # 字幕提前结束是正常的
+            self.log_message(f"  ℹ️ 字幕提前结束 {abs(time_diff):.3f}秒（正常）", LOG_DEBUG)
+        
+        return None, None
+
+    def _apply_time_offset_to_subtitle(self, timeline, offset_ms):
+        """
+        对字幕应用时间偏移（整个时间轴一次向量加法）
+        
+        参数:
+            timeline: CueTimeline 字幕时间轴
+            offset_ms: 偏移量（毫秒）
+        返回: 偏移后的新时间轴
+        """
+        return timeline.shifted(offset_ms)
+
+    def _show_merge_problems_summary(self, time_disorder_subtitles, large_time_diff_subtitles, show_dialog=True):
+        """显示合并过程中发现的问题汇总"""
+        has_problems = large_time_diff_subtitles or time_disorder_subtitles
+        
+        if not has_problems:
+            return
+        
+        self.log_message("")
+        self.log_message("="*70)
+        self.log_message("🚨🚨🚨 字幕文件问题汇总 🚨🚨🚨")
+        self.log_message("="*70)
+        
+        warning_details = []
+        
+        # 处理时间轴乱序
+        if time_disorder_subtitles:
+            self.log_message(f"\n【时间轴乱序】检测到 {len(time_disorder_subtitles)} 个字幕文件时间轴混乱：")
+            self.log_message("")
+            for info in time_disorder_subtitles:
+                file_display = os.path.splitext(info['srt_name'])[0]
+                self.log_message(f"🔀 {file_display}: {info['srt_name']}")
+                self.log_message(f"   视频: {info['video_name']}")
+                self.log_message(f"   问题: {info['details']}")
+                self.log_message("")
+                warning_details.append(f"{file_display}: 时间轴乱序")
+        
+        # 处理超出3秒
+        if large_time_diff_subtitles:
+            self.log_message(f"\n【超出时长】检测到 {len(large_time_diff_subtitles)} 个字幕文件超出视频时长超过3秒：")
+            self.log_message("")
+            for info in large_time_diff_subtitles:
+                file_display = os.path.splitext(info['srt_name'])[0]
+                self.log_message(f"⏰ {file_display}: {info['srt_name']}")
+                self.log_message(f"   视频: {info['video_name']}")
+                self.log_message(f"   超出: {info['time_diff']:.3f}秒")
+                self.log_message(f"   字幕结束: {info['srt_end']}")
+                self.log_message(f"   视频时长: {info['video_duration']}")
+                self.log_message("")
+                warning_details.append(f"{file_display}: 超出 {info['time_diff']:.1f}秒")
+        
+        self.log_message("="*70)
+        self.log_message("⚠️ 以上字幕文件未自动修正，建议手动检查！")
+        self.log_message("="*70)
+        self.log_message("")
+        
+        if not show_dialog:
+            return
+        
+        # 统一弹窗提醒
+        warning_message = "检测到字幕文件存在以下问题：\n\n"
+        
+        if time_disorder_subtitles:
+            warning_message += f"🔀 时间轴乱序：{len(time_disorder_subtitles)} 个文件\n"
+            warning_message += "   • 字幕时间轴前后顺序混乱\n"
+            warning_message += "   • 拖入视频软件会显示很长\n\n"
+        
+        if large_time_diff_subtitles:
+            warning_message += f"⏰ 超出时长：{len(large_time_diff_subtitles)} 个文件\n"
+            warning_message += "   • 字幕比视频长超过3秒\n"
+            warning_message += "   • 可能版本不匹配\n\n"
+        
+        warning_message += "可能的原因：\n"
+        warning_message += "• 字幕和视频版本不匹配\n"
+        warning_message += "• 字幕文件本身有问题\n"
+        warning_message += "• 视频帧率与字幕制作时不一致\n\n"
+        warning_message += "问题文件详情：\n"
+        
+        display_items = warning_details[:8]
+        warning_message += "\n".join(display_items)
+        
+        if len(warning_details) > 8:
+            warning_message += f"\n... 还有 {len(warning_details) - 8} 个文件"
+        
+        warning_message += "\n\n⚠️ 这些文件未自动修正，建议手动检查后重新处理！"
+        
+        self._notify('warning', "字幕文件问题警告", warning_message)
+
+    def _show_correction_summary(self, corrected_subtitles):
+        """显示字幕修正汇总"""
+        if not corrected_subtitles:
+            self.log_message("")
+            self.log_message("="*70)
+            self.log_message("✓✓✓ 所有字幕时长检查通过！✓✓✓")
+            self.log_message("="*70)
+            self.log_message("所有字幕文件的结束时间都与视频时长完美匹配（误差<0.01秒）")
+            self.log_message("="*70)
+            self.log_message("")
+            return
+        
+        self.log_message("")
+        self.log_message("="*70)
+        self.log_message("⚠️⚠️⚠️ 字幕时长修正汇总报告 ⚠️⚠️⚠️")
+        self.log_message("="*70)
+        self.log_message(f"检测到 {len(corrected_subtitles)} 个字幕文件的结束时间超出视频时长，已自动修正：")
+        self.log_message("")
+        for info in corrected_subtitles:
+            self.log_message(f"❌ 第{info['episode_num']}集: {info['srt_name']}")
+            self.log_message(f"   视频: {info['video_name']}")
+            self.log_message(f"   超出: {info['time_diff']:.3f}秒")
+            self.log_message(f"   原字幕结束时间: {info['srt_end']}")
+            self.log_message(f"   修正为视频时长: {info['video_duration']}")
+            self.log_message("")
+        self.log_message("="*70)
+        self.log_message("✓ 所有超出的字幕已自动修正，确保后续集数字幕偏移准确！")
+        self.log_message("="*70)
+        self.log_message("")
+
+    def _plan_merge_episodes(self, selected_videos_data):
+        """
+        合并前的规划：为每个视频匹配字幕，并计算每集的字幕偏移
+        
+        偏移是帧精确时长（整数毫秒）的前缀和：第i集偏移 = 前i集时长之和，与字幕解析结果无关。
+        返回: 每集信息dict的列表；有视频找不到字幕时提示错误并返回None
+        """
+        merge_plan = []
+        cumulative_duration_ms = 0
+        for i, video_data_item in enumerate(selected_videos_data):
+            video_name = video_data_item[0]
+            video_base_name = video_data_item[2]
+            video_duration_seconds = video_data_item[3]
+            video_frames = video_data_item[4] if len(video_data_item) > 4 else 0
+            video_fps = video_data_item[5] if len(video_data_item) > 5 else 0.0
+
+            # 核心逻辑：使用基于帧的精确时长
+            current_video_duration_seconds = 0.0
+            if video_fps > 0 and video_frames > 0:
+                current_video_duration_seconds = video_frames / video_fps
+            else:
+                # 如果帧信息缺失，回退到旧的时长，并发出严重警告
+                current_video_duration_seconds = video_duration_seconds
+                self.log_message(f"严重警告：视频 '{video_name}' 帧信息缺失，将使用可能不准确的流时长进行计算。")
+
+            # 确保我们使用的是预扫描的权威时长，不再实时获取
+            if current_video_duration_seconds == 0.0 or current_video_duration_seconds is None:
+                self.log_message(f"严重警告：视频 '{video_name}' 在合并时计算出的时长为0。")
+                self.log_message(f"         这将导致后续字幕的偏移量不准确。请在合并前确保所有视频时长都已成功扫描。")
+                # 将时长强制设为0，避免None值导致崩溃
+                current_video_duration_seconds = 0.0
+
+            # 使用统一的匹配函数
+            matched_srt_data = self.find_matching_subtitle(video_data_item)
+            if not matched_srt_data:
+                self.log_message(f"❌ 严重错误：视频 '{video_name}' 找不到匹配的字幕文件！")
+                self.log_message(f"             这会导致后续所有字幕的时间轴偏移错误。")
+                self.log_message(f"             合并已终止，请先解决字幕匹配问题。")
+                
+                # 弹窗提示并终止合并
+                error_msg = f"❌ 合并终止！\n\n"
+                error_msg += f"视频文件找不到对应的字幕：\n"
+                error_msg += f"• 视频: {video_name}\n"
+                error_msg += f"• 位置: 第 {i + 1} 个待处理文件\n\n"
+                error_msg += f"⚠️ 如果继续合并，后续所有字幕的时间轴都会错位！\n\n"
+                error_msg += f"🔧 请检查：\n"
+                error_msg += f"1. 字幕文件是否存在\n"
+                error_msg += f"2. 字幕文件命名是否与视频匹配\n"
+                error_msg += f"3. 字幕文件是否包含EP前缀\n\n"
+                error_msg += f"提示：合并前应该已检查过匹配情况，\n"
+                error_msg += f"      如果仍出现此错误，请重新扫描文件。"
+                
+                self._notify('error', "合并失败", error_msg)
+                return None
+
+            srt_name, srt_full_path, srt_base_name = matched_srt_data
+            # 如果不是精确匹配，说明是通过EP模式匹配的
+            if srt_base_name.lower() != video_base_name.lower():
+                self.log_message(f"通过EP集数匹配: 视频'{video_name}'与字幕'{srt_name}'", LOG_DEBUG)
+
+            episode = {
+                'video_name': video_name,
+                'video_path': video_data_item[1],
+                'video_frames': video_frames,
+                'video_fps': video_fps,
+                'duration_seconds': current_video_duration_seconds,
+                'srt_name': srt_name,
+                'srt_full_path': srt_full_path,
+                'offset_ms': cumulative_duration_ms,
+            }
+            # 累加时长（整数毫秒运算，完全精确，不会有任何误差累积）
+            if current_video_duration_seconds > 0:
+                cumulative_duration_ms += round(current_video_duration_seconds * 1000)
+            episode['end_offset_ms'] = cumulative_duration_ms
+            merge_plan.append(episode)
+        return merge_plan
+
+    def _check_episode_timeline(self, episode, loaded_timeline, srt_encoding, passthrough, processed_count):
+        """
+        合并前检查一集字幕：记录编码和无法解析的时间行，检测时间轴乱序，检查并修正超出视频时长的结束时间
+        
+        返回: (修正后的时间轴副本（未偏移）, 乱序问题dict或None, 修正信息dict或None, 超出时长问题dict或None)
+        """
+        video_name = episode['video_name']
+        srt_name = episode['srt_name']
+        if srt_encoding == 'gbk':
+            self.log_message(f"'{srt_name}' UTF-8解码失败，已使用GBK")
+        if passthrough and not loaded_timeline.raw:
+            self.log_message(f"  ℹ️ '{srt_name}' 为 {srt_encoding} 编码，按文本方式合并")
+        for byte_offset, bad_line in loaded_timeline.invalid_lines:
+            self.log_message(f"  ⚠️ 无法解析的时间行（字节偏移 {byte_offset}），已跳过该条: {bad_line}")
+        # 缓存中的解析结果会被检查时复用，合并前先复制一份再修改时间轴
+        subs_for_current_file = loaded_timeline.copy()
+        
+        # 检测字幕时间轴顺序
+        disorder_info = None
+        is_disorder, disorder_details = self._check_subtitle_time_disorder(subs_for_current_file, srt_name)
+        if is_disorder:
+            self.log_message(f"  ⚠️ 检测到时间轴倒退: {disorder_details}", LOG_WARNING)
+            disorder_info = {
+                'video_name': video_name,
+                'srt_name': srt_name,
+                'episode_num': processed_count + 1,
+                'episode_display': srt_name,
+                'details': disorder_details
+            }
+            self.log_message(f"  ⚠️ 此字幕文件时间轴混乱，建议手动检查修复", LOG_WARNING)
+        
+        # 检测并修正字幕时长
+        correction_info, large_diff_info = self._check_and_fix_subtitle_duration(
+            subs_for_current_file, episode['duration_seconds'], 
+            video_name, srt_name, processed_count
+        )
+        return subs_for_current_file, disorder_info, correction_info, large_diff_info
+
+    def _merge_artifact_key(self, episode, kind, eol):
+        """一集合并产物的输入指纹；字幕文件无法读取状态时返回None（不缓存）"""
+        try:
+            stat = os.stat(episode['srt_full_path'])
+        except OSError:
+            return None
+        return (episode['srt_full_path'], stat.st_size, stat.st_mtime_ns, kind, eol,
+                episode['video_name'], episode['duration_seconds'], episode['offset_ms'])
+
+    def _iter_merge_subtitles(self, merge_plan, passthrough, skip=()):
+        """
+        按合并顺序逐集产出 (episode, timeline, encoding, error)
+        
+        缓存未命中的字幕较多时交给进程池并行解析，最多提前提交 2×进程数 个任务，
+        内存占用与总集数无关。解析失败时 timeline 为None、error 为异常对象。
+        skip 中的下标（可复用上次合并结果的集）不读取也不解析，timeline 与 error 均为None。
+        """
+        kind = 'raw' if passthrough else 'text'
+        metrics = self.metrics
+        lookup_start_time = time.perf_counter()
+        # 先查缓存（取文件状态在解析之前，与 load_subtitle_file 一致）
+        jobs = []
+        for i, episode in enumerate(merge_plan):
+            if i in skip:
+                jobs.append((None, None, None))
+                continue
+            try:
+                stat = os.stat(episode['srt_full_path'])
+            except OSError as e:
+                jobs.append((None, None, e))
+                continue
+            cached = self.subtitle_cache.get(episode['srt_full_path'], stat.st_size, stat.st_mtime_ns, kind)
+            jobs.append((cached, stat, None))
+        metrics.add_time('lookup', time.perf_counter() - lookup_start_time, len(merge_plan))
+
+        parse_stats = [stat for cached, stat, error in jobs if cached is None and stat is not None and error is None]
+        workers = min(self.parse_workers or os.cpu_count() or 1, len(parse_stats))
+        executor = None
+        use_pool = workers > 1 and sum(stat.st_size for stat in parse_stats) >= PARALLEL_PARSE_MIN_BYTES
+        if use_pool and self.parse_executor is not None:
+            executor = self.parse_executor
+            self.log_message(f"字幕解析: {len(parse_stats)} 个文件，使用共享进程池并行解析")
+        elif use_pool:
+            try:
+                # spawn：子进程只导入本模块（不含界面），也不继承各线程的状态
+                executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+                self.log_message(f"字幕解析: {len(parse_stats)} 个文件，使用 {workers} 个进程并行解析")
+            except (OSError, ValueError, NotImplementedError) as e:
+                self.log_message(f"无法启动解析进程池，改为逐个解析: {e}")
+        window = workers * 2
+        futures = {}
+        next_submit = 0
+        try:
+            for i, episode in enumerate(merge_plan):
+                # 保持最多 window 个解析任务在后台进行
+                while executor is not None and next_submit < len(merge_plan) and next_submit <= i + window:
+                    cached, stat, error = jobs[next_submit]
+                    if cached is None and stat is not None and error is None:
+                        try:
+                            futures[next_submit] = executor.submit(parse_subtitle_file, merge_plan[next_submit]['srt_full_path'], passthrough)
+                        except (BrokenExecutor, RuntimeError):
+                            # 进程池已失效（共享进程池可能已被其他任务关闭），剩余的在本进程解析
+                            executor = None
+                            break
+                    next_submit += 1
+
+                cached, stat, error = jobs[i]
+                jobs[i] = None
+                if error is not None:
+                    yield episode, None, None, error
+                    continue
+                if cached is not None:
+                    yield episode, cached[0], cached[1], None
+                    continue
+                if stat is None:
+                    yield episode, None, None, None  # 跳过的集
+                    continue
+                try:
+                    future = futures.pop(i, None)
+                    # 后台进程并行解析时，计入的是等待解析结果的时间
+                    with metrics.stage('parse'):
+                        try:
+                            timeline, encoding = future.result() if future is not None else parse_subtitle_file(episode['srt_full_path'], passthrough)
+                        except BrokenExecutor:
+                            # 子进程异常退出，剩余的改为在本进程解析
+                            if executor is not None and executor is not self.parse_executor:
+                                executor.shutdown(wait=False, cancel_futures=True)
+                            executor = None
+                            futures.clear()
+                            timeline, encoding = parse_subtitle_file(episode['srt_full_path'], passthrough)
+                except Exception as e:
+                    yield episode, None, None, e
+                    continue
+                metrics.count('subtitles_parsed')
+                metrics.count('bytes_read', stat.st_size)
+                metrics.count('cues_parsed', len(timeline))
+                self.subtitle_cache.put(episode['srt_full_path'], stat.st_size, stat.st_mtime_ns, timeline, encoding, kind)
+                yield episode, timeline, encoding, None
+        finally:
+            if executor is not None and executor is self.parse_executor:
+                # 共享进程池由批量任务统一关闭，这里只取消本剧尚未开始的解析
+                for future in futures.values():
+                    future.cancel()
+            elif executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+    def _collect_files(self):
+        """
+        遍历视频和字幕文件夹并按设置排序
+        
+        返回: (视频列表, 字幕列表, {视频完整路径: (大小, 修改时间ns)})；无法读取状态的视频不在字典中
+        """
+        video_root_dir, srt_root_dir = self.video_folder, self.srt_folder
+        raw_video_files, raw_srt_files, video_stats = [], [], {}
+        # 每次遍历开始新一轮扫描统计，之后的时长探测和字幕检查计入同一份
+        metrics = RunMetrics('scan')
+        self.scan_metrics = metrics
+        self.metrics = metrics  # 紧接着探测时长时沿用（见 scan_video_durations）
+        walk_start_time = time.perf_counter()
+        dirs_walked = files_walked = 0
+        if os.path.isdir(video_root_dir):
+            for dirpath, _, filenames in os.walk(video_root_dir):
+                dirs_walked += 1
+                files_walked += len(filenames)
+                for f in filenames:
+                    if f.lower().endswith(VIDEO_EXTENSIONS):
+                        full_path = os.path.join(dirpath, f)
+                        # 使用列表，包含：[文件名, 完整路径, 基础名, 时长(秒), 帧数, 帧率]
+                        raw_video_files.append([f, full_path, self.get_base_filename(f), 0.0, 0, 0.0])
+                        try:
+                            stat = os.stat(full_path)
+                            video_stats[full_path] = (stat.st_size, stat.st_mtime_ns)
+                        except OSError:
+                            pass
+        
+        if os.path.isdir(srt_root_dir):
+            for dirpath, _, filenames in os.walk(srt_root_dir):
+                dirs_walked += 1
+                files_walked += len(filenames)
+                for f in filenames:
+                    if f.lower().endswith(SUBTITLE_EXTENSIONS):
+                        raw_srt_files.append((f, os.path.join(dirpath, f), self.get_base_filename(f)))
+        metrics.add_time('walk', time.perf_counter() - walk_start_time)
+        metrics.count('dirs_walked', dirs_walked)
+        metrics.count('files_walked', files_walked)
+        metrics.count('videos_found', len(raw_video_files))
+        metrics.count('subtitles_found', len(raw_srt_files))
+        sort_start_time = time.perf_counter()
+
+        # --- 全局自然排序 ---
+        if self.auto_sort:
+            raw_video_files.sort(key=lambda x: self.natural_sort_key_for_filename(x[0]))
+            raw_srt_files.sort(key=lambda x: self.natural_sort_key_for_filename(x[0]))
+        else: # 传统字典序 (如果用户取消勾选)
+            raw_video_files.sort(key=lambda x: x[0].lower())
+            raw_srt_files.sort(key=lambda x: x[0].lower())
+        metrics.add_time('sort', time.perf_counter() - sort_start_time)
+        return raw_video_files, raw_srt_files, video_stats
+
+    def _log_file_scan_result(self):
+        if not self.video_files_data and os.path.isdir(self.video_folder): self.log_message("未在视频目录找到支持的视频文件。")
+        if not self.srt_files_data and os.path.isdir(self.srt_folder): self.log_message("未在字幕目录找到SRT文件。")
+        if self.video_files_data or self.srt_files_data: self.log_message("文件扫描完成。")
+
+    def scan_file_lists(self):
+        """遍历视频和字幕文件夹，按设置排序后重建匹配索引（不探测时长，之前的时长统计全部清空）"""
+        self.video_files_data, self.srt_files_data, self.video_file_stats = self._collect_files()
+        self._reset_duration_stats()
+        self.scanned_video_folder = self.video_folder
+        self._rebuild_match_index()
+        self._log_file_scan_result()
+
+    def rescan_file_lists(self):
+        """
+        增量重新扫描：按 路径+大小+修改时间 与上次的文件列表对比
+        
+        未变化的视频保留已探测的时长、帧数和帧率；已删除和变化的视频从文件夹时长与总时长中扣除。
+        视频文件夹变了（或从未扫描过）时退化为完整扫描。
+        返回: (需要探测的视频路径集合, 已删除的视频路径列表)
+        """
+        if self.scanned_video_folder != self.video_folder:
+            self.scan_file_lists()
+            return {item[1] for item in self.video_files_data}, []
+        old_items = {item[1]: item for item in self.video_files_data}
+        raw_video_files, raw_srt_files, video_stats = self._collect_files()
+        changed_paths = set()
+        for i, item in enumerate(raw_video_files):
+            path = item[1]
+            old_item = old_items.get(path)
+            if (old_item is not None and path in self.video_durations_counted
+                    and path in video_stats and video_stats[path] == self.video_file_stats.get(path)):
+                raw_video_files[i] = old_item  # 未变化：沿用上次的探测结果
+            else:
+                changed_paths.add(path)
+        removed_paths = [path for path in old_items if path not in video_stats and path not in changed_paths]
+        for path in removed_paths:
+            self._uncount_video_duration(path)
+        for path in changed_paths:
+            self._uncount_video_duration(path)
+
+        self.video_files_data, self.srt_files_data, self.video_file_stats = raw_video_files, raw_srt_files, video_stats
+        self._rebuild_match_index()
+        self.log_message(f"增量扫描: 新增或变化 {len(changed_paths)} 个视频，删除 {len(removed_paths)} 个，"
+                         f"未变化 {len(raw_video_files) - len(changed_paths)} 个")
+        self._log_file_scan_result()
+        return changed_paths, removed_paths
+
+    def _reset_duration_stats(self):
+        self.total_duration_seconds = 0.0
+        self.folder_durations = {}
+        self.video_durations_counted = {}
+        self.folder_video_counts = {}
+
+    def _count_video_duration(self, video_full_path, relative_folder, seconds):
+        """把一个视频的时长计入文件夹时长和总时长"""
+        self._uncount_video_duration(video_full_path)
+        self.video_durations_counted[video_full_path] = (relative_folder, seconds)
+        self.total_duration_seconds += seconds
+        self.folder_durations[relative_folder] = self.folder_durations.get(relative_folder, 0.0) + seconds
+        self.folder_video_counts[relative_folder] = self.folder_video_counts.get(relative_folder, 0) + 1
+
+    def _uncount_video_duration(self, video_full_path):
+        """从文件夹时长和总时长中扣除一个视频（未计入过时忽略）"""
+        counted = self.video_durations_counted.pop(video_full_path, None)
+        if counted is None:
+            return
+        relative_folder, seconds = counted
+        self.total_duration_seconds = max(0.0, self.total_duration_seconds - seconds)
+        self.folder_video_counts[relative_folder] -= 1
+        if self.folder_video_counts[relative_folder] <= 0:
+            # 文件夹里已没有计入的视频
+            del self.folder_video_counts[relative_folder]
+            self.folder_durations.pop(relative_folder, None)
+        else:
+            self.folder_durations[relative_folder] = max(0.0, self.folder_durations[relative_folder] - seconds)
+
+    def scan_video_durations(self, video_paths=None):
+        """
+        探测视频的帧数和时长，并按子文件夹统计总时长（耗时操作，界面中在工作线程调用）
+        
+        参数:
+            video_paths: 只探测这些路径的视频（增量重新扫描），其余视频的统计保持不变；None 表示全部重新探测
+        """
+        self.log_message("开始扫描视频时长...")
+        self._on_status("正在扫描视频时长...")
+        if video_paths is None:
+            self._reset_duration_stats()
+            scan_items = list(enumerate(self.video_files_data))
+        else:
+            scan_items = [(i, item) for i, item in enumerate(self.video_files_data) if item[1] in video_paths]
+        total_files_to_scan = len(scan_items); self._on_progress(0, total_files_to_scan)
+        # 紧接在遍历文件夹之后时计入同一轮扫描统计，否则（如只重新探测时长）开始新的一轮
+        metrics = self.scan_metrics
+        if metrics is None or self.metrics is not metrics or 'probe' in metrics.stages:
+            metrics = RunMetrics('scan')
+            self.scan_metrics = metrics
+        self.metrics = metrics
+        metrics.count('videos_probed', total_files_to_scan)
+        
+        video_root_dir = Path(self.video_folder)
+        workers = self.probe_executor_workers if self.probe_executor else self._get_probe_worker_count()
+        self.log_message(f"使用 {workers} 个并发任务探测 {total_files_to_scan} 个视频...")
+        scan_start_time = time.perf_counter()
+        # 是否要求解码校验帧数（扫描期间保持不变）
+        if self.verify_frames:
+            self.log_message("已启用帧数校验：每个视频都将逐帧解码计数，速度较慢。")
+        probe_sources = {}  # 结果来源统计: cache / mp4 / mkv / ffprobe / None(失败)
+
+        # 所有视频同时提交到线程池（ffprobe是外部进程，线程足够），
+        # 结果按原排序顺序依次取回，保证列表、日志和文件夹统计的顺序不变
+        with nullcontext(self.probe_executor) if self.probe_executor else ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(self._probe_video_file, item[1]) for _, item in scan_items]
+
+            try:
+                for n, (i, video_data_item) in enumerate(scan_items): # 遍历已排序的数据列表，i 为在完整列表中的位置
+                    self.job_control.checkpoint()
+                    video_name = video_data_item[0]
+                    video_full_path = video_data_item[1]
+
+                    try:
+                        relative_folder = str(Path(os.path.dirname(video_full_path)).relative_to(video_root_dir))
+                        if relative_folder == ".": relative_folder = "根目录"
+                    except ValueError:
+                        relative_folder = Path(os.path.dirname(video_full_path)).name # Fallback
+
+                    try:
+                        probe_result = futures[n].result()
+                        probe_sources[probe_result['source']] = probe_sources.get(probe_result['source'], 0) + 1
+                        total_frames = probe_result['total_frames']
+                        fps_decimal = probe_result['fps']
+                        duration = probe_result['duration']
+                        raw_duration = probe_result['raw_duration']
+                    
+                        if total_frames is not None and fps_decimal is not None and duration is not None:
+                            # 存储完整信息：[文件名, 路径, 基础名, 时长, 帧数, 帧率]
+                            video_data_item[3] = duration
+                            video_data_item[4] = total_frames
+                            video_data_item[5] = fps_decimal
+                        
+                            # 文件夹时长统计使用ffprobe直接报告的duration（类似Windows属性）
+                            self._count_video_duration(video_full_path, relative_folder, raw_duration)
+                        
+                            formatted_duration = self.format_duration(duration)
+                            framerate_display = f"{total_frames}f@{fps_decimal:.2f}fps"
+                            self._on_video_probed(i, framerate_display, formatted_duration)
+                        
+                            tier_display = FRAME_TIER_NAMES.get(probe_result['frame_tier'], '未知')
+                            self.log_message(f"[{n+1}/{total_files_to_scan}] {relative_folder}/{video_name}: {formatted_duration} ({framerate_display}) [帧数来源: {tier_display}]", LOG_DEBUG)
+                        else:
+                            # 回退到旧方法
+                            duration = raw_duration
+                            framerate = probe_result['framerate']
+                            video_data_item[3] = duration
+                            self._count_video_duration(video_full_path, relative_folder, duration)
+                            formatted_duration = self.format_duration(duration)
+                            self._on_video_probed(i, framerate, formatted_duration)
+                            self.log_message(f"[{n+1}/{total_files_to_scan}] {relative_folder}/{video_name}: {formatted_duration} ({framerate})", LOG_DEBUG)
+                    except JobCancelled:
+                        raise
+                    except Exception as e:
+                        self.log_message(f"扫描 {video_name} 出错: {str(e)}", LOG_ERROR)
+                        self._on_video_probed(i, "错误", "错误")
+                    finally:
+                        self._on_progress(n + 1)
+            except JobCancelled:
+                # 未开始的探测直接取消，正在运行的ffprobe已被结束；已探测完的视频保留统计并写入探测缓存
+                for future in futures:
+                    future.cancel()
+                self.log_message(f"扫描已取消：已完成 {n}/{total_files_to_scan} 个视频，未完成的下次刷新时重新探测", LOG_WARNING)
+                metrics.add_time('probe', time.perf_counter() - scan_start_time)
+                if self.probe_cache:
+                    try:
+                        with metrics.stage('cache_commit'):
+                            self.probe_cache.commit()
+                    except sqlite3.Error as e:
+                        self.log_message(f"警告: 探测缓存写入失败: {e}")
+                self._log_metrics_summary(metrics, "扫描性能统计（已取消）")
+                self._on_status("扫描已取消")
+                raise
+
+        scan_elapsed = time.perf_counter() - scan_start_time
+        metrics.add_time('probe', scan_elapsed)
+        files_per_second = total_files_to_scan / scan_elapsed if scan_elapsed > 0 else 0.0
+        self.log_message(f"探测耗时 {scan_elapsed:.2f} 秒，吞吐量 {files_per_second:.1f} 个/秒（{workers} 个并发任务）")
+        if self.probe_cache:
+            try:
+                with metrics.stage('cache_commit'):
+                    self.probe_cache.commit()
+            except sqlite3.Error as e:
+                self.log_message(f"警告: 探测缓存写入失败: {e}")
+            # 按本次扫描的结果来源统计（探测缓存可能被同时扫描的其他剧共用）
+            cache_hits = probe_sources.get('cache', 0)
+            self.log_message(f"探测缓存: 命中 {cache_hits} 个，未命中 {sum(probe_sources.values()) - cache_hits} 个")
+        self.log_message(f"探测方式: 内置MP4解析 {probe_sources.get('mp4', 0)} 个，内置MKV解析 {probe_sources.get('mkv', 0)} 个，"
+                         f"ffprobe {probe_sources.get('ffprobe', 0)} 个，失败 {probe_sources.get(None, 0)} 个")
+        self.log_message(f"扫描完成！视频总时长: {self.format_duration(self.total_duration_seconds)}")
+        if self.folder_durations: self.log_message("各文件夹时长已更新。")
+        self._log_metrics_summary(metrics, "扫描性能统计")
+
+    def _log_metrics_summary(self, metrics, title):
+        """结束计时并把性能汇总写入日志"""
+        for line in metrics.finish().summary_lines(title):
+            self.log_message(line)
+
+    def _finish_merge_metrics(self, metrics, result, report_path):
+        """
+        合并结束时输出性能汇总，并把统计附在合并结果中（metrics）；
+        成功写出时在输出文件旁写出JSON性能报告，其中附带最近一次扫描的统计（scan）
+
+        参数:
+            report_path: 性能报告路径（输出文件名去掉扩展名加 .perf.json）
+        """
+        if not result['episodes']:
+            return  # 没有视频或有视频找不到字幕，没有开始逐集处理
+        self._log_metrics_summary(metrics, "合并性能统计" if result['status'] != 'cancelled' else "合并性能统计（已取消）")
+        result['metrics'] = metrics.to_dict()
+        if result['status'] != 'ok' or not self.perf_report:
+            return
+        report = dict(result['metrics'], output_path=result['output_path'],
+                      scan=self.scan_metrics.to_dict() if self.scan_metrics is not None else None)
+        try:
+            _write_json_report(report, report_path)
+            self.log_message(f"性能报告已写入: {report_path}")
+        except OSError as e:
+            self.log_message(f"警告: 性能报告写入失败: {e}", LOG_WARNING)
+
+    def sorted_folder_durations(self):
+        """各文件夹时长，按文件夹名中的数字智能排序，返回 [(文件夹, 秒)]"""
+        return sorted(self.folder_durations.items(), key=lambda x: self.smart_folder_sort_key(x[0]))
+
+    def select_episode_range(self, start_num=1, end_num=None):
+        """
+        按文件名中的集数筛选视频（仅识别EP前缀标准格式）
+        
+        参数:
+            end_num: 结束集数，None表示到最后一集
+        返回: (符合范围的视频列表, 无法识别集数的视频文件名列表)
+        """
+        if end_num is None:
+            end_num = float('inf')
+        videos_to_merge = []
+        unmatched_videos = []  # 记录无法提取集数的文件
+        
+        for video_data in self.video_files_data:
+            video_name = video_data[0]
+            episode_num = self.get_episode_number_from_filename(video_name)
+            
+            if episode_num is None:
+                unmatched_videos.append(video_name)
+            elif start_num <= episode_num <= end_num:
+                videos_to_merge.append(video_data)
+        
+        # 如果有无法识别集数的文件，给出更详细的提示
+        if unmatched_videos:
+            self.log_message(f"警告：以下 {len(unmatched_videos)} 个文件无法识别集数：")
+            for vid in unmatched_videos[:5]:  # 只显示前5个
+                self.log_message(f"  • {vid}")
+            if len(unmatched_videos) > 5:
+                self.log_message(f"  ... 还有 {len(unmatched_videos) - 5} 个文件")
+        return videos_to_merge, unmatched_videos
+
+    def merge_subtitles(self, output_path, videos_to_process, start_num_for_suffix, end_num_for_suffix, show_completion_dialog=True):
+        """
+        按视频顺序合并字幕（耗时操作，界面中在工作线程调用）
+        
+        返回: 合并结果dict
+            status: 'ok' 成功 / 'unmatched' 有视频找不到字幕，已终止 / 'empty' 没有可写入的字幕 / 'error' 出错 /
+                    'cancelled' 被取消（JobControl），原输出文件保持不变
+            episodes: 每集的视频、字幕、时长与偏移（毫秒）
+            time_disorder / large_time_diff / corrected: 与日志中汇总相同的问题列表
+        """
+        self.processing = True
+        self._on_status("正在合并字幕...")
+        
+        # 生成带后缀的输出文件名
+        final_output_path = self.generate_output_filename_with_suffix(output_path, start_num_for_suffix, end_num_for_suffix)
+        self.log_message(f"字幕合并开始: {final_output_path}")
+        metrics = self.metrics = RunMetrics('merge')
+        output_writer = None
+        previous_output = None
+        result = {'output_path': final_output_path, 'status': 'error', 'cue_count': 0, 'processed_count': 0, 'reused_count': 0,
+                  'episodes': [], 'skipped': [], 'time_disorder': [], 'large_time_diff': [], 'corrected': []}
+        
+        try:
+            # 1. 验证视频列表
+            selected_videos_data = videos_to_process
+            if not selected_videos_data:
+                self.log_message("错误：没有需要处理的视频文件。")
+                self._notify('error', "错误", "未找到视频。")
+                result['status'] = 'empty'
+                return result
+
+            self.log_message(f"准备合并 {len(selected_videos_data)} 个视频对应的字幕...")
+            self.subtitle_cache.reset_stats()
+            passthrough = self.passthrough
+            if passthrough:
+                self.log_message("合并模式: 直通（只改写序号和时间行，字幕文本按原始字节复制）")
+            self._on_progress(0, len(selected_videos_data))
+
+            # 2. 逐集写入临时文件，全部完成后再备份并替换已存在的输出文件
+            output_writer = SrtStreamWriter(final_output_path)
+
+            # 3. 预先规划：匹配字幕，并用帧精确时长的前缀和算出每集偏移
+            #    偏移只取决于视频时长，与字幕能否解析无关，因此各集字幕可以并行解析
+            with metrics.stage('plan'):
+                merge_plan = self._plan_merge_episodes(selected_videos_data)
+            if merge_plan is None:
+                result['status'] = 'unmatched'
+                return result  # 有视频找不到字幕，已提示并终止
+            result['episodes'] = [{key: episode[key] for key in ('video_name', 'srt_name', 'video_frames', 'video_fps',
+                                                                  'duration_seconds', 'offset_ms', 'end_offset_ms')}
+                                  for episode in merge_plan]
+
+            # 4. 对照上次合并到同一输出文件的逐集产物：字幕、时长、偏移都没变的集直接复制上次写好的字幕块，
+            #    只需重新编号时改写序号行；这些集不再读取和解析字幕
+            kind = 'raw' if passthrough else 'text'
+            artifact_keys = [self._merge_artifact_key(episode, kind, output_writer.eol) for episode in merge_plan]
+            previous_artifacts = self.merge_artifacts.get(final_output_path) or []
+            reusable = {i: previous_artifacts[i] for i, key in enumerate(artifact_keys[:len(previous_artifacts)])
+                        if key is not None and previous_artifacts[i] is not None and previous_artifacts[i]['key'] == key}
+            new_artifacts = [None] * len(merge_plan)
+
+            # 5. 按顺序逐集检查、修正、偏移并写入（解析在后台进程中提前进行）
+            corrected_subtitles = []
+            large_time_diff_subtitles = []
+            time_disorder_subtitles = []
+            processed_count = 0
+            reused_count = 0
+            episode_results = self._iter_merge_subtitles(merge_plan, passthrough, skip=frozenset(reusable))
+            try:
+                for i, (episode, loaded_timeline, srt_encoding, load_error) in enumerate(episode_results):
+                    self.job_control.checkpoint()
+                    video_name = episode['video_name']
+                    srt_name = episode['srt_name']
+                    video_frames = episode['video_frames']
+                    video_fps = episode['video_fps']
+                    current_video_duration_seconds = episode['duration_seconds']
+                    cumulative_duration_ms = episode['offset_ms']
+
+                    artifact = reusable.get(i)
+                    # 前面有集被跳过时问题列表中的集序号不同，重新处理
+                    if artifact is not None and artifact['processed_index'] == processed_count:
+                        reuse_start_time = time.perf_counter()
+                        try:
+                            if previous_output is None:
+                                previous_output = open(final_output_path, 'rb')
+                            previous_output.seek(artifact['byte_start'])
+                            block_data = previous_output.read(artifact['byte_length'])
+                        except OSError as e:
+                            self.log_message(f"无法读取上次的合并结果，改为重新处理: {e}")
+                            reusable = {}  # 后续的集也不再尝试复用
+                            block_data = None
+                        if block_data is not None and artifact['first_index'] != output_writer.cue_count:
+                            block_data, renumbered = renumber_srt_blocks(block_data, output_writer.cue_count, output_writer.eol)
+                            if renumbered != artifact['cue_count']:
+                                block_data = None
+                        metrics.add_time('reuse', time.perf_counter() - reuse_start_time)
+                        if block_data is not None:
+                            self.log_message(f"处理字幕 [{processed_count+1}/{len(merge_plan)}]: '{srt_name}' 未变化，复用上次合并结果")
+                            new_artifacts[i] = dict(artifact, first_index=output_writer.cue_count,
+                                                    byte_start=output_writer.bytes_written, byte_length=len(block_data))
+                            with metrics.stage('write'):
+                                output_writer.write_encoded_blocks(block_data, artifact['cue_count'])
+                            for problem_list, problem_key in ((time_disorder_subtitles, 'time_disorder'),
+                                                              (corrected_subtitles, 'correction'),
+                                                              (large_time_diff_subtitles, 'large_time_diff')):
+                                if artifact[problem_key] is not None:
+                                    problem_list.append(artifact[problem_key])
+                            reused_count += 1
+                            processed_count += 1
+                            self._on_progress(i + 1)
+                            continue
+                    if loaded_timeline is None and load_error is None:
+                        # 解析时跳过了这一集但没能复用（见上），现在读取解析
+                        try:
+                            loaded_timeline, srt_encoding = self.load_subtitle_file(episode['srt_full_path'], passthrough)
+                        except Exception as e:
+                            load_error = e
+
+                    if current_video_duration_seconds == 0.0 and i < len(merge_plan) - 1:
+                        self.log_message(f"警告：视频 '{video_name}' 时长为0。后续字幕偏移可能不准确。")
+
+                    # 显示偏移信息
+                    formatted_vid_dur = self.format_duration(current_video_duration_seconds)
+                    formatted_offset = self.format_duration(cumulative_duration_ms / 1000.0)
+                    
+                    # 计算剪辑软件格式的时间（时:分:秒:帧）- 使用当前视频的帧率
+                    if video_fps > 0:
+                        offset_hours = cumulative_duration_ms // 3600000
+                        offset_minutes = (cumulative_duration_ms % 3600000) // 60000
+                        offset_seconds_int = (cumulative_duration_ms % 60000) // 1000
+                        offset_ms_remainder = cumulative_duration_ms % 1000
+                        # 将剩余毫秒转换为帧数（使用当前视频的帧率）
+                        offset_frames = int((offset_ms_remainder / 1000.0) * video_fps)
+                        editor_format_offset = f"{offset_hours:02d}:{offset_minutes:02d}:{offset_seconds_int:02d}:{offset_frames:02d}"
+                    else:
+                        editor_format_offset = "00:00:00:00"
+                    
+                    frame_info = f"{video_frames}帧@{video_fps:.3f}fps" if video_frames > 0 else "帧信息缺失"
+                    self.log_message(f"处理字幕 [{processed_count+1}/{len(merge_plan)}]: '{srt_name}'")
+                    self.log_message(f"  视频: '{video_name}' ({frame_info}, 时长: {formatted_vid_dur})", LOG_DEBUG)
+                    self.log_message(f"  偏移: {formatted_offset} | 剪辑格式: {editor_format_offset} (累积: {cumulative_duration_ms}ms)", LOG_DEBUG)
+                    
+                    if load_error is not None:
+                        if isinstance(load_error, UnicodeDecodeError):
+                            self.log_message(f"错误: 无法解码字幕 '{srt_name}': {load_error}", LOG_ERROR)
+                        else:
+                            self.log_message(f"错误: 打开字幕 '{srt_name}' 失败: {load_error}", LOG_ERROR)
+                        # 偏移已按视频时长预先算好，跳过这一集不影响后续字幕
+                        self.log_message(f"  已跳过该集字幕，后续偏移不受影响")
+                        result['skipped'].append({'srt_name': srt_name, 'error': str(load_error)})
+                        self._on_progress(i + 1)
+                        continue
+
+                    with metrics.stage('check'):
+                        subs_for_current_file, disorder_info, correction_info, large_diff_info = self._check_episode_timeline(
+                            episode, loaded_timeline, srt_encoding, passthrough, processed_count)
+                    if disorder_info:
+                        time_disorder_subtitles.append(disorder_info)
+                    if correction_info:
+                        corrected_subtitles.append(correction_info)
+                    if large_diff_info:
+                        large_time_diff_subtitles.append(large_diff_info)
+                    
+                    # 应用时间偏移
+                    if cumulative_duration_ms > 0:
+                        self.log_message(f"  应用偏移: {cumulative_duration_ms}毫秒 ({self.format_duration(cumulative_duration_ms / 1000.0)})", LOG_DEBUG)
+                        with metrics.stage('offset'):
+                            subs_for_current_file = self._apply_time_offset_to_subtitle(subs_for_current_file, cumulative_duration_ms)
+                    elif cumulative_duration_ms == 0:
+                        self.log_message(f"  首个视频，无需偏移", LOG_DEBUG)
+                    else:
+                        self.log_message(f"  警告：累积时长异常，跳过偏移")
+                    
+                    block_start, first_index = output_writer.bytes_written, output_writer.cue_count
+                    with metrics.stage('write'):
+                        output_writer.write_timeline(subs_for_current_file)
+                    if artifact_keys[i] is not None:
+                        new_artifacts[i] = {
+                            'key': artifact_keys[i],
+                            'processed_index': processed_count,
+                            'first_index': first_index,
+                            'cue_count': output_writer.cue_count - first_index,
+                            'byte_start': block_start,
+                            'byte_length': output_writer.bytes_written - block_start,
+                            'time_disorder': disorder_info,
+                            'correction': correction_info,
+                            'large_time_diff': large_diff_info,
+                        }
+                    
+                    if current_video_duration_seconds > 0:
+                        formatted_cumulative = self.format_duration(episode['end_offset_ms'] / 1000.0)
+                        self.log_message(f"  累加后时长: {episode['end_offset_ms']}ms ({formatted_cumulative})", LOG_DEBUG)
+                    
+                    processed_count +=1
+                    self._on_progress(i + 1)
+            finally:
+                episode_results.close()  # 停止后台解析
+                if previous_output is not None:
+                    previous_output.close()  # 备份会重命名上次的输出文件，先关闭
+                    previous_output = None
+            
+            self.log_message(f"共成功匹配并处理了 {processed_count} 对影音文件。")
+            metrics.count('episodes', processed_count)
+            metrics.count('episodes_reused', reused_count)
+            metrics.count('episodes_skipped', len(result['skipped']))
+            if reused_count:
+                self.log_message(f"增量合并: 复用上次结果 {reused_count} 集，重新处理 {processed_count - reused_count} 集")
+            self.log_message(f"字幕解析缓存: 命中 {self.subtitle_cache.hits} 次，重新解析 {self.subtitle_cache.misses} 次")
+            
+            # ===== 显示所有需要人工检查的字幕问题汇总 =====
+            # 统一弹窗提醒：时间轴乱序 + 超出3秒的情况
+            self._show_merge_problems_summary(time_disorder_subtitles, large_time_diff_subtitles, show_completion_dialog)
+            self._show_correction_summary(corrected_subtitles)
+            result['time_disorder'] = time_disorder_subtitles
+            result['large_time_diff'] = large_time_diff_subtitles
+            result['corrected'] = corrected_subtitles
+            result['processed_count'] = processed_count
+            result['reused_count'] = reused_count
+            # ===== 汇总结束 =====
+            
+            if output_writer.cue_count > 0:
+                with metrics.stage('save'):
+                    self._backup_output_file(final_output_path)
+                    output_writer.commit()
+                metrics.count('cues_written', output_writer.cue_count)
+                metrics.count('bytes_written', output_writer.bytes_written)
+                try:
+                    self.merge_artifacts.put(final_output_path, new_artifacts)
+                except OSError:
+                    pass
+                result['status'] = 'ok'
+                result['cue_count'] = output_writer.cue_count
+                msg_s = f"字幕合并成功！共 {output_writer.cue_count} 条字幕 ({processed_count}个文件)."; self.log_message(msg_s)
+                if show_completion_dialog:
+                    self._notify('info', "成功", msg_s)
+            else:
+                result['status'] = 'empty'
+                warn_m = "合并结束，未找到有效字幕内容或未成功配对文件。"; self.log_message(warn_m)
+                if show_completion_dialog:
+                    self._notify('warning', "无内容", warn_m)
+
+        except JobCancelled:
+            # 临时文件在下面删除，已存在的输出文件没有被备份或替换
+            self.log_message("合并已取消，输出文件保持不变。", LOG_WARNING)
+            result['status'] = 'cancelled'
+        except Exception as e:
+            import traceback; error_details = f"合并过程严重错误: {e}\n{traceback.format_exc()}"
+            self.log_message(error_details)
+            result['status'] = 'error'
+            result['error'] = str(e)
+            if show_completion_dialog:
+                self._notify('error', "严重错误", error_details)
+        finally:
+            # 未成功完成（终止、出错或没有内容）时删除临时文件，保留原输出
+            if output_writer is not None:
+                output_writer.abort()
+            self._finish_merge_metrics(metrics, result, os.path.splitext(final_output_path)[0] + '.perf.json')
+            self.processing = False
+            self._on_status("就绪")
+            self._on_progress(0)
+        return result
+
+    def merge_episode_range(self, output_path, episode_range=None):
+        """
+        按集数范围选出视频并合并（与界面的「合并全部」「自定义合并」相同的筛选和文件名后缀）
+        
+        参数:
+            episode_range: (起始, 结束或None)，见 parse_episode_range；None表示合并全部
+                          也可以是范围列表，多个范围一次合并（见 merge_episode_ranges）
+        返回: merge_subtitles 的结果dict；范围内没有视频时返回None
+        """
+        if isinstance(episode_range, list):
+            os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+            return self.merge_episode_ranges(output_path, episode_range, show_completion_dialog=False)
+        videos_to_merge, suffix_start, suffix_end = self._select_range_videos(episode_range)
+        if not videos_to_merge:
+            return None
+
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        self.log_message(f"开始合并字幕（{len(videos_to_merge)} 个视频，EP{suffix_start}-EP{suffix_end}）...")
+        return self.merge_subtitles(output_path, videos_to_merge, suffix_start, suffix_end, show_completion_dialog=False)
+
+    def _select_range_videos(self, episode_range):
+        """
+        按集数范围选出视频，并确定输出文件名的集数后缀
+        
+        返回: (视频列表, 后缀起始集数, 后缀结束集数)；范围内没有视频时记录错误并返回空列表
+        """
+        if episode_range is None:
+            videos_to_merge = self.video_files_data
+            suffix_start = self.get_episode_number_from_filename(videos_to_merge[0][0]) or 1
+            suffix_end = self.get_episode_number_from_filename(videos_to_merge[-1][0]) or len(videos_to_merge)
+            return videos_to_merge, suffix_start, suffix_end
+        suffix_start, suffix_end = episode_range
+        videos_to_merge, _ = self.select_episode_range(suffix_start, suffix_end)
+        if not videos_to_merge:
+            self.log_message(f"错误：没有集数在 EP{suffix_start}-EP{suffix_end or '最后'} 范围内的视频文件。")
+            return [], suffix_start, suffix_end
+        if suffix_end is None:
+            suffix_end = self.get_episode_number_from_filename(videos_to_merge[-1][0])
+        return videos_to_merge, suffix_start, suffix_end
+
+    def merge_episode_ranges(self, output_path, episode_ranges, show_completion_dialog=True):
+        """
+        一次合并多个集数范围（如 1-20、16-20、1-60），每个范围写一个输出文件（耗时操作，界面中在工作线程调用）
+        
+        每集字幕只读取、检查和修正一次，再按该集在各范围内的累积偏移写入包含它的每个输出；
+        输出文件名按各自的范围加集数后缀（generate_output_filename_with_suffix）。
+        参数:
+            episode_ranges: [(起始, 结束或None), ...]，见 parse_episode_ranges
+        返回: 合并结果dict，字段与 merge_subtitles 相同（问题列表覆盖所有范围，output_path 为成功写出的路径列表），
+              另有 outputs：按 episode_ranges 的顺序（与前面的范围输出到同一文件的范围除外），每个范围的 output_path / range / status / cue_count / processed_count / episodes
+              有范围没有写出文件（范围内没有视频或没有有效字幕）时 status 为 'empty'，其余范围照常写出；
+              有视频找不到字幕时不写任何输出，status 为 'unmatched'；被取消时同样不写任何输出，status 为 'cancelled'
+        性能报告覆盖所有范围，写到 output_path 去掉扩展名加 .perf.json（不带集数后缀，与各输出文件名不同）
+        """
+        self.processing = True
+        self._on_status("正在合并字幕...")
+        result = {'output_path': [], 'status': 'error', 'cue_count': 0, 'processed_count': 0, 'reused_count': 0,
+                  'episodes': [], 'skipped': [], 'time_disorder': [], 'large_time_diff': [], 'corrected': [], 'outputs': []}
+        metrics = self.metrics = RunMetrics('merge')
+        targets = []
+        try:
+            # 1. 逐个范围规划：筛选视频、计算相对范围起点的偏移和输出文件名
+            seen_paths = set()
+            for episode_range in episode_ranges:
+                videos, suffix_start, suffix_end = self._select_range_videos(episode_range)
+                if not videos:
+                    self.log_message(f"警告：范围 EP{suffix_start}-EP{suffix_end or '最后'} 没有视频，不写出该范围的文件", LOG_WARNING)
+                    result['outputs'].append({'output_path': None, 'range': list(episode_range), 'status': 'empty',
+                                              'cue_count': 0, 'processed_count': 0, 'episodes': []})
+                    continue
+                final_output_path = self.generate_output_filename_with_suffix(output_path, suffix_start, suffix_end)
+                if final_output_path in seen_paths:
+                    self.log_message(f"范围 EP{suffix_start}-EP{suffix_end} 与前面的范围输出到同一文件，已忽略")
+                    continue
+                seen_paths.add(final_output_path)
+                with metrics.stage('plan'):
+                    merge_plan = self._plan_merge_episodes(videos)
+                if merge_plan is None:
+                    result['status'] = 'unmatched'
+                    return result  # 有视频找不到字幕，已提示并终止
+                target = {
+                    'output_path': final_output_path,
+                    'range': [suffix_start, suffix_end],
+                    'status': 'empty',
+                    'cue_count': 0,
+                    'processed_count': 0,
+                    'episodes': [{key: episode[key] for key in ('video_name', 'srt_name', 'video_frames', 'video_fps',
+                                                                'duration_seconds', 'offset_ms', 'end_offset_ms')}
+                                 for episode in merge_plan],
+                    'offsets': {episode['video_path']: episode['offset_ms'] for episode in merge_plan},
+                    'plan': merge_plan,
+                }
+                targets.append(target)
+                result['outputs'].append(target)
+            if not targets:
+                result['status'] = 'empty'
+                return result
+
+            # 2. 所有范围的视频并集，按全局顺序逐集处理一次
+            video_order = {item[1]: i for i, item in enumerate(self.video_files_data)}
+            union_episodes = {}
+            for target in targets:
+                for episode in target['plan']:
+                    union_episodes.setdefault(episode['video_path'], episode)
+            union_plan = sorted(union_episodes.values(), key=lambda episode: video_order.get(episode['video_path'], 0))
+            result['episodes'] = [{key: episode[key] for key in ('video_name', 'srt_name', 'video_frames', 'video_fps', 'duration_seconds')}
+                                  for episode in union_plan]
+            for target in targets:
+                self.log_message(f"  输出 EP{target['range'][0]}-EP{target['range'][1]}: {len(target['plan'])} 集 → {target['output_path']}")
+                del target['plan']
+            self.log_message(f"多段合并: {len(targets)} 个输出，共 {len(union_plan)} 集字幕，每集只解析和检查一次")
+
+            self.subtitle_cache.reset_stats()
+            passthrough = self.passthrough
+            if passthrough:
+                self.log_message("合并模式: 直通（只改写序号和时间行，字幕文本按原始字节复制）")
+            self._on_progress(0, len(union_plan))
+            for target in targets:
+                target['writer'] = SrtStreamWriter(target['output_path'])
+
+            # 3. 逐集检查、修正一次，再按各输出中的偏移分别写入
+            processed_count = 0
+            episode_results = self._iter_merge_subtitles(union_plan, passthrough)
+            try:
+                for i, (episode, loaded_timeline, srt_encoding, load_error) in enumerate(episode_results):
+                    self.job_control.checkpoint()
+                    srt_name = episode['srt_name']
+                    episode_targets = [target for target in targets if episode['video_path'] in target['offsets']]
+                    self.log_message(f"处理字幕 [{i+1}/{len(union_plan)}]: '{srt_name}'（写入 {len(episode_targets)} 个输出）")
+                    if load_error is not None:
+                        if isinstance(load_error, UnicodeDecodeError):
+                            self.log_message(f"错误: 无法解码字幕 '{srt_name}': {load_error}", LOG_ERROR)
+                        else:
+                            self.log_message(f"错误: 打开字幕 '{srt_name}' 失败: {load_error}", LOG_ERROR)
+                        self.log_message(f"  已跳过该集字幕，后续偏移不受影响")
+                        result['skipped'].append({'srt_name': srt_name, 'error': str(load_error)})
+                        self._on_progress(i + 1)
+                        continue
+
+                    with metrics.stage('check'):
+                        subs_for_current_file, disorder_info, correction_info, large_diff_info = self._check_episode_timeline(
+                            episode, loaded_timeline, srt_encoding, passthrough, processed_count)
+                    if disorder_info:
+                        result['time_disorder'].append(disorder_info)
+                    if correction_info:
+                        result['corrected'].append(correction_info)
+                    if large_diff_info:
+                        result['large_time_diff'].append(large_diff_info)
+
+                    for target in episode_targets:
+                        offset_ms = target['offsets'][episode['video_path']]
+                        target_timeline = subs_for_current_file
+                        if offset_ms > 0:
+                            with metrics.stage('offset'):
+                                target_timeline = self._apply_time_offset_to_subtitle(subs_for_current_file, offset_ms)
+                        with metrics.stage('write'):
+                            target['writer'].write_timeline(target_timeline)
+                        target['processed_count'] += 1
+                    processed_count += 1
+                    self._on_progress(i + 1)
+            finally:
+                episode_results.close()  # 停止后台解析
+
+            self.log_message(f"共成功匹配并处理了 {processed_count} 对影音文件。")
+            metrics.count('episodes', processed_count)
+            metrics.count('episodes_skipped', len(result['skipped']))
+            self.log_message(f"字幕解析缓存: 命中 {self.subtitle_cache.hits} 次，重新解析 {self.subtitle_cache.misses} 次")
+            self._show_merge_problems_summary(result['time_disorder'], result['large_time_diff'], show_completion_dialog)
+            self._show_correction_summary(result['corrected'])
+            result['processed_count'] = processed_count
+
+            # 4. 各输出分别备份并替换
+            summary_lines = []
+            for target in result['outputs']:
+                if target['output_path'] is None:
+                    summary_lines.append(f"EP{target['range'][0]}-EP{target['range'][1] or '最后'}: 范围内没有视频，未写出")
+                    continue
+                output_writer = target.pop('writer')
+                if output_writer.cue_count > 0:
+                    with metrics.stage('save'):
+                        self._backup_output_file(target['output_path'])
+                        output_writer.commit()
+                    metrics.count('cues_written', output_writer.cue_count)
+                    metrics.count('bytes_written', output_writer.bytes_written)
+                    target['status'] = 'ok'
+                    target['cue_count'] = output_writer.cue_count
+                    result['output_path'].append(target['output_path'])
+                    result['cue_count'] += output_writer.cue_count
+                    summary_lines.append(f"{os.path.basename(target['output_path'])}: {output_writer.cue_count} 条字幕 ({target['processed_count']}个文件)")
+                else:
+                    output_writer.abort()
+                    summary_lines.append(f"{os.path.basename(target['output_path'])}: 没有有效字幕，未写出")
+            for line in summary_lines:
+                self.log_message(f"  {line}")
+            if all(target['status'] == 'ok' for target in result['outputs']):
+                result['status'] = 'ok'
+                msg_s = f"多段合并成功！共 {len(targets)} 个输出文件。"
+            else:
+                result['status'] = 'empty'
+                msg_s = (f"多段合并结束，{len(result['outputs']) - len(result['output_path'])} 个范围没有写出文件"
+                         f"（没有视频或未找到有效字幕内容）。")
+            self.log_message(msg_s)
+            if show_completion_dialog:
+                self._notify('info' if result['status'] == 'ok' else 'warning', "多段合并", msg_s + "\n\n" + "\n".join(summary_lines))
+
+        except JobCancelled:
+            # 临时文件在下面删除，已存在的输出文件没有被备份或替换
+            self.log_message("合并已取消，输出文件保持不变。", LOG_WARNING)
+            result['status'] = 'cancelled'
+        except Exception as e:
+            import traceback; error_details = f"合并过程严重错误: {e}\n{traceback.format_exc()}"
+            self.log_message(error_details)
+            result['status'] = 'error'
+            result['error'] = str(e)
+            if show_completion_dialog:
+                self._notify('error', "严重错误", error_details)
+        finally:
+            # 未成功完成时删除临时文件，保留原输出
+            for target in targets:
+                output_writer = target.pop('writer', None)
+                if output_writer is not None:
+                    output_writer.abort()
+            self._finish_merge_metrics(metrics, result, os.path.splitext(output_path)[0] + '.perf.json')
+            self.processing = False
+            self._on_status("就绪")
+            self._on_progress(0)
+        return result
+
+    def run_series(self, output_path, episode_range=None, strict=False, incremental=False):
+        """
+        无界面地处理一部剧：扫描文件、探测时长、检查匹配和字幕问题，再按集数范围合并
+        
+        参数:
+            episode_range: (起始, 结束或None)，见 parse_episode_range；None表示合并全部；范围列表时一次写出多个文件
+            strict: 有视频缺少字幕、时间轴乱序或超出时长时返回非零退出码
+            incremental: 增量重新扫描，只探测新增或变化的视频（监视模式使用）；字幕由解析缓存按修改时间复用
+        返回: 报告dict，包含每集偏移、问题列表、exit_code 和各阶段耗时 timings（秒）
+        """
+        report = {'video_dir': self.video_folder, 'srt_dir': self.srt_folder, 'videos': [], 'folder_durations': {},
+                  'unmatched_videos': [], 'time_disorder': [], 'large_time_diff': [], 'merge': None,
+                  'exit_code': EXIT_MERGE_FAILED, 'timings': {}}
+        timings = report['timings']
+        run_start_time = stage_start_time = time.perf_counter()
+        try:
+            if incremental:
+                changed_paths, _ = self.rescan_file_lists()
+            else:
+                self.scan_file_lists()
+            if not self.video_files_data:
+                self.log_message("错误：视频文件夹中没有支持的视频文件。")
+                return report
+            if not incremental:
+                self.scan_video_durations()
+            elif changed_paths:
+                self.scan_video_durations(changed_paths)
+            timings['scan'] = time.perf_counter() - stage_start_time
+            report['videos'] = [{'name': item[0], 'path': item[1], 'duration_seconds': item[3], 'frames': item[4], 'fps': item[5]}
+                                for item in self.video_files_data]
+            report['folder_durations'] = dict(self.sorted_folder_durations())
+
+            stage_start_time = time.perf_counter()
+            report['unmatched_videos'] = self.check_video_subtitle_matching()
+            report['time_disorder'], report['large_time_diff'] = self.check_subtitle_problems_after_scan()
+            timings['check'] = time.perf_counter() - stage_start_time
+
+            stage_start_time = time.perf_counter()
+            result = self.merge_episode_range(output_path, episode_range)
+            if result is None:
+                return report
+            timings['merge'] = time.perf_counter() - stage_start_time
+            report['merge'] = result
+            if result['status'] == 'unmatched':
+                report['exit_code'] = EXIT_MATCH_FAILED
+            elif result['status'] == 'ok':
+                report['exit_code'] = EXIT_OK
+                if strict and report['unmatched_videos']:
+                    report['exit_code'] = EXIT_MATCH_FAILED
+                elif strict and (result['time_disorder'] or result['large_time_diff']):
+                    report['exit_code'] = EXIT_SUBTITLE_PROBLEMS
+            return report
+        finally:
+            timings['total'] = time.perf_counter() - run_start_time
+
+    def watch_series(self, output_path, episode_range=None, strict=False, interval=2.0, debounce=3.0, on_report=None,
+                     on_start=None):
+        """
+        监视视频和字幕文件夹，文件变化稳定后自动增量扫描并重新合并（在后台线程中运行）
+        
+        参数:
+            interval: 轮询间隔（秒）
+            debounce: 最后一次变化后需保持不变的秒数，一批文件陆续复制进来时只合并一次
+            on_report: 每次自动合并后以 run_series 的报告调用（被取消或出错时以None调用）
+            on_start: 每批变化处理前以变化的路径集合调用，返回False表示暂时无法处理（如界面正在合并），下次轮询再试
+        返回: 已启动的 FolderWatcher，调用其 stop() 结束监视
+        """
+        def on_change(changed_paths):
+            if on_start is not None and on_start(changed_paths) is False:
+                return False
+            self.log_message(f"检测到 {len(changed_paths)} 个文件变化，开始自动合并...")
+            report = None
+            try:
+                report = self.run_series(output_path, episode_range, strict, incremental=True)
+                self.log_message(f"自动合并结束（退出码 {report['exit_code']}），继续监视...")
+            except JobCancelled:
+                self.log_message("自动合并已取消，继续监视...", LOG_WARNING)
+            finally:
+                if on_report:
+                    on_report(report)
+
+        watcher = FolderWatcher([self.video_folder, self.srt_folder], on_change, interval, debounce,
+                                ignored_prefixes=[os.path.splitext(os.path.abspath(output_path))[0]],
+                                log=self.log_message)
+        watcher.start()
+        self.log_message(f"开始监视文件夹（每 {interval:g} 秒检查一次，变化稳定 {debounce:g} 秒后合并）")
+        return watcher
+
+class FolderWatcher(threading.Thread):
+    """
+    轮询监视若干文件夹中的视频和字幕文件（路径、大小、修改时间），变化稳定后回调
+    
+    回调在监视线程中同步执行，执行期间不再检查；回调返回 False 表示暂时无法处理，
+    这批变化会在下次轮询时再次回调。轮询只读取目录和文件状态，不打开文件。
+    """
+    def __init__(self, folders, on_change, interval=2.0, debounce=3.0,
+                 extensions=VIDEO_EXTENSIONS + SUBTITLE_EXTENSIONS, ignored_prefixes=(), log=None):
+        super().__init__(daemon=True)
+        self.folders = [folder for folder in folders if folder]
+        self.on_change = on_change
+        self.interval = max(0.1, interval)
+        self.debounce = max(0.0, debounce)
+        self.extensions = extensions
+        self.ignored_prefixes = tuple(ignored_prefixes)  # 输出文件及其备份，避免合并结果触发下一次合并
+        self.log = log or (lambda message: None)
+        self.stop_event = threading.Event()
+
+    def snapshot(self):
+        """返回 {完整路径: (大小, 修改时间ns)}"""
+        files = {}
+        for folder in self.folders:
+            for dirpath, _, filenames in os.walk(folder):
+                for f in filenames:
+                    if not f.lower().endswith(self.extensions):
+                        continue
+                    full_path = os.path.join(dirpath, f)
+                    if self.ignored_prefixes and os.path.abspath(full_path).startswith(self.ignored_prefixes):
+                        continue
+                    try:
+                        stat = os.stat(full_path)
+                    except OSError:
+                        continue  # 扫描期间被删除
+                    files[full_path] = (stat.st_size, stat.st_mtime_ns)
+        return files
+
+    def run(self):
+        baseline = last_snapshot = self.snapshot()  # baseline: 上次处理完时的状态
+        last_change_time = time.monotonic()
+        while not self.stop_event.wait(self.interval):
+            current = self.snapshot()
+            if current != last_snapshot:
+                # 仍在变化（如正在复制文件），重新计时
+                last_snapshot = current
+                last_change_time = time.monotonic()
+                continue
+            if current == baseline or time.monotonic() - last_change_time < self.debounce:
+                continue
+            changed_paths = {path for path in baseline.keys() | current.keys() if baseline.get(path) != current.get(path)}
+            try:
+                handled = self.on_change(changed_paths)
+            except Exception as e:
+                self.log(f"✗ 处理文件变化时出错: {str(e)}")
+                handled = True  # 不反复重试同一批出错的变化
+            if handled is not False:
+                # 回调期间发生的变化与处理前的状态比较，下次轮询仍会被发现
+                baseline = current
+
+    def stop(self):
+        self.stop_event.set()
+
+def parse_episode_ranges(text):
+    """解析以逗号或分号分隔的多个集数范围，如 "1-20, 16-20, 1-60"，返回范围列表；格式错误时抛出 ValueError"""
+    parts = [part for part in re.split(r'[,，;；]', text or '') if part.strip()]
+    if not parts:
+        raise ValueError(f"无效的集数范围: {text!r}（示例: 1-20、16-、1-20,16-20）")
+    return [parse_episode_range(part) for part in parts]
+
+def parse_episode_range(text):
+    """解析集数范围 "1-20"、"16-"（到最后一集）或 "5"，返回 (起始, 结束或None)；格式错误时抛出 ValueError"""
+    match = re.fullmatch(r'\s*(\d+)\s*(?:(-)\s*(\d*)\s*)?', text or '')
+    if not match:
+        raise ValueError(f"无效的集数范围: {text!r}（示例: 1-20、16-）")
+    start_num = int(match.group(1))
+    if match.group(2) is None:
+        end_num = start_num
+    else:
+        end_num = int(match.group(3)) if match.group(3) else None
+    if start_num <= 0:
+        raise ValueError("起始集数必须大于0")
+    if end_num is not None and start_num > end_num:
+        raise ValueError("起始集数不能大于结束集数")
+    return start_num, end_num
+
+# 一部剧的父文件夹中，视频和字幕文件夹名称包含的标记
+SERIES_VIDEO_FOLDER_MARK = "【无字幕】"
+SERIES_SRT_FOLDER_MARK = "-英语SRT终版"
+
+def find_series_folders(parent_folder):
+    """
+    在一部剧的父文件夹中识别视频文件夹（名称含【无字幕】）和字幕文件夹（含-英语SRT终版）
+    
+    返回: (视频文件夹, 字幕文件夹)，未找到的为None；父文件夹无法读取时抛出 OSError
+    """
+    video_folder = None
+    srt_folder = None
+    for item in os.listdir(parent_folder):
+        item_path = os.path.join(parent_folder, item)
+        if os.path.isdir(item_path):
+            if SERIES_VIDEO_FOLDER_MARK in item:
+                video_folder = item_path
+            elif SERIES_SRT_FOLDER_MARK in item:
+                srt_folder = item_path
+    return video_folder, srt_folder
+
+def default_series_output(parent_folder):
+    """一部剧的默认输出路径：父文件夹/字幕/合并字幕.srt"""
+    return os.path.join(parent_folder, "字幕", "合并字幕.srt")
+
+def discover_series_jobs(root_dir):
+    """
+    把根目录下每个同时包含视频和字幕文件夹的子文件夹（或根目录本身）作为一部剧
+    
+    返回: 批量任务dict列表（name, video_dir, srt_dir, output, range），按文件夹名自然排序
+    """
+    folders = [root_dir]
+    for item in sorted(os.listdir(root_dir), key=lambda name: [int(text) if text.isdigit() else text.lower()
+                                                               for text in re.split('([0-9]+)', name)]):
+        if os.path.isdir(os.path.join(root_dir, item)):
+            folders.append(os.path.join(root_dir, item))
+    jobs = []
+    for folder in folders:
+        try:
+            video_folder, srt_folder = find_series_folders(folder)
+        except OSError:
+            continue
+        if video_folder and srt_folder:
+            jobs.append({'name': os.path.basename(os.path.normpath(folder)), 'video_dir': video_folder, 'srt_dir': srt_folder,
+                         'output': default_series_output(folder), 'range': None})
+    return jobs
+
+def load_batch_manifest(manifest_path):
+    """
+    读取批量任务清单（JSON），相对路径以清单所在目录为准
+    
+    格式: {"series": [...]} 或直接是列表，每项为
+        {"folder": "剧的父文件夹"}（按【无字幕】/-英语SRT终版 自动识别，输出到 字幕/合并字幕.srt），或
+        {"video_dir": ..., "srt_dir": ..., "output": ...}；
+        均可另加 "name" 和 "range"（如 "1-20"，多个范围 "1-20,16-20"）
+    返回: 批量任务dict列表；清单内容有误时抛出 ValueError
+    """
+    with open(manifest_path, 'r', encoding='utf-8-sig') as f:
+        data = json.load(f)
+    entries = data.get('series') if isinstance(data, dict) else data
+    if not isinstance(entries, list):
+        raise ValueError("清单应为列表，或包含 series 列表的对象")
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    jobs = []
+    for i, entry in enumerate(entries, 1):
+        if not isinstance(entry, dict):
+            raise ValueError(f"清单第{i}项不是对象")
+        paths = {key: os.path.join(base_dir, entry[key]) for key in ('folder', 'video_dir', 'srt_dir', 'output') if entry.get(key)}
+        if 'folder' in paths:
+            video_folder, srt_folder = find_series_folders(paths['folder'])
+            paths.setdefault('video_dir', video_folder)
+            paths.setdefault('srt_dir', srt_folder)
+            paths.setdefault('output', default_series_output(paths['folder']))
+        missing = [key for key in ('video_dir', 'srt_dir', 'output') if not paths.get(key)]
+        if missing:
+            raise ValueError(f"清单第{i}项缺少 {', '.join(missing)}")
+        name = entry.get('name') or os.path.basename(os.path.normpath(paths.get('folder') or os.path.dirname(paths['video_dir'])))
+        episode_range = None
+        if entry.get('range'):
+            episode_ranges = parse_episode_ranges(str(entry['range']))
+            episode_range = episode_ranges[0] if len(episode_ranges) == 1 else episode_ranges
+        jobs.append({'name': name, 'video_dir': paths['video_dir'], 'srt_dir': paths['srt_dir'],
+                     'output': paths['output'], 'range': episode_range})
+    return jobs
+
+class _BatchSeriesEngine(SubtitleMergeEngine):
+    """批量任务中的单部剧：日志加剧名前缀后交给 BatchMergeRunner 统一输出"""
+    def __init__(self, runner, name):
+        SubtitleMergeEngine.__init__(self, runner.ffprobe_path, use_probe_cache=False)
+        self.runner = runner
+        self.series_name = name
+
+    def log_message(self, message, level=LOG_INFO):
+        self.runner.log_message(f"[{self.series_name}] {message}", level)
+
+class BatchMergeRunner:
+    """
+    批量合并多部剧：同时处理 series_workers 部剧，所有剧共用一个探测线程池、一个解析进程池和探测缓存
+    
+    每部剧使用独立的引擎（文件列表、字幕缓存互不影响），engine_options 中的选项（auto_sort、backup、
+    auto_suffix、verify_frames、passthrough、perf_report，见 SubtitleMergeEngine.OPTION_NAMES）会设置到每个引擎上。
+    """
+    def __init__(self, jobs, workers=None, series_workers=2, ffprobe_path=None, use_probe_cache=True,
+                 engine_options=None, strict=False, log=None, log_level=LOG_DEBUG, job_control=None):
+        self.jobs = jobs
+        self.workers = max(1, workers or os.cpu_count() or 4)
+        self.series_workers = max(1, min(series_workers, len(jobs) or 1))
+        self.ffprobe_path = ffprobe_path or find_ffprobe_path()
+        self.probe_cache = None
+        self.merge_artifacts = MergeArtifactCache()  # 所有剧共用（以输出路径区分）
+        if use_probe_cache:
+            try:
+                self.probe_cache = ProbeCache(os.path.join(get_user_cache_dir(), 'probe_cache.sqlite3'))
+                self.merge_artifacts = MergeArtifactCache(os.path.join(get_user_cache_dir(), 'merge_artifacts.sqlite3'))
+            except (OSError, sqlite3.Error):
+                pass
+        self.engine_options = engine_options or {}
+        self.strict = strict
+        self.log = log  # 日志输出函数 log(message, level)，None时写到标准错误
+        self.log_level = log_level  # 写到标准错误时的最低级别
+        self.log_lock = threading.Lock()
+        self.job_control = job_control or JobControl()  # 所有剧共用，取消时尚未开始的剧不再处理
+
+    def log_message(self, message, level=LOG_INFO):
+        """输出一条日志（各剧的工作线程同时调用）"""
+        if self.log is not None:
+            self.log(message, level)
+            return
+        if level < self.log_level:
+            return
+        timestamp = time.strftime("%H:%M:%S", time.localtime())
+        with self.log_lock:
+            print(f"[{timestamp}] {message}", file=sys.stderr, flush=True)
+
+    def _run_job(self, job, probe_executor, parse_executor):
+        """处理一部剧，返回带剧名和输出路径的报告"""
+        engine = _BatchSeriesEngine(self, job['name'])
+        engine.job_control = self.job_control
+        engine.probe_cache = self.probe_cache
+        engine.merge_artifacts = self.merge_artifacts
+        engine.probe_executor = probe_executor
+        engine.probe_executor_workers = self.workers  # 与 run() 中创建探测线程池时的线程数相同
+        engine.parse_executor = parse_executor
+        engine.probe_workers = engine.parse_workers = self.workers
+        engine.video_folder, engine.srt_folder = job['video_dir'], job['srt_dir']
+        for key, value in self.engine_options.items():
+            setattr(engine, key, value)
+        try:
+            self.job_control.checkpoint()
+            report = engine.run_series(job['output'], job['range'], self.strict)
+        except JobCancelled:
+            engine.log_message("已取消", LOG_WARNING)
+            report = {'exit_code': EXIT_MERGE_FAILED, 'merge': None, 'cancelled': True, 'timings': {}}
+        except Exception as e:
+            engine.log_message(f"处理失败: {e}")
+            report = {'exit_code': EXIT_MERGE_FAILED, 'merge': None, 'error': str(e), 'timings': {}}
+        report['name'] = job['name']
+        return report
+
+    def run(self):
+        """
+        执行全部任务（阻塞直到完成）
+        
+        返回: 与 jobs 顺序一致的报告列表（格式见 SubtitleMergeEngine.run_series，另含 name）
+        """
+        self.log_message(f"批量合并 {len(self.jobs)} 部剧：同时处理 {self.series_workers} 部，共用 {self.workers} 个探测线程")
+        parse_executor = None
+        if self.workers > 1:
+            try:
+                # spawn：子进程只导入本模块，不继承各线程的状态
+                parse_executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+            except (OSError, ValueError, NotImplementedError) as e:
+                self.log_message(f"无法启动解析进程池，各剧逐个解析字幕: {e}")
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as probe_executor, \
+                    ThreadPoolExecutor(max_workers=self.series_workers) as series_executor:
+                futures = [series_executor.submit(self._run_job, job, probe_executor, parse_executor) for job in self.jobs]
+                reports = [future.result() for future in futures]
+            if self.probe_cache is not None:
+                self.log_message(f"探测缓存（所有剧）: 命中 {self.probe_cache.hits} 个，未命中 {self.probe_cache.misses} 个")
+            return reports
+        finally:
+            if parse_executor is not None:
+                parse_executor.shutdown(wait=False, cancel_futures=True)
+
+    def format_summary(self, reports):
+        """汇总各剧结果和耗时，返回文本行列表"""
+        status_names = {EXIT_OK: '成功', EXIT_MERGE_FAILED: '失败', EXIT_MATCH_FAILED: '字幕缺失', EXIT_SUBTITLE_PROBLEMS: '有问题'}
+        lines = ["=" * 70, f"批量合并汇总（共 {len(reports)} 部）", "=" * 70]
+        for report in reports:
+            merge = report.get('merge') or {}
+            timings = report.get('timings') or {}
+            problem_count = len(merge.get('time_disorder', ())) + len(merge.get('large_time_diff', ()))
+            status_name = '已取消' if report.get('cancelled') or merge.get('status') == 'cancelled' else status_names.get(report['exit_code'], report['exit_code'])
+            lines.append(f"{status_name} | {report['name']}: "
+                         f"{len(merge.get('episodes', ()))} 集, {merge.get('cue_count', 0)} 条字幕, "
+                         f"缺字幕 {len(report.get('unmatched_videos', ()))} 个, 问题 {problem_count} 个, "
+                         f"修正 {len(merge.get('corrected', ()))} 个")
+            lines.append(f"    耗时 {timings.get('total', 0.0):.2f}秒（扫描 {timings.get('scan', 0.0):.2f}，"
+                         f"检查 {timings.get('check', 0.0):.2f}，合并 {timings.get('merge', 0.0):.2f}）"
+                         + (f" → {merge['output_path']}" if merge.get('status') == 'ok' and 'outputs' not in merge else ""))
+            for output in merge.get('outputs', ()):
+                if output['status'] == 'ok':
+                    lines.append(f"    → {output['output_path']}")
+                else:
+                    lines.append(f"    ✗ EP{output['range'][0]}-EP{output['range'][1] or '最后'}: 未写出")
+        lines.append("=" * 70)
+        return lines
+
+def _write_json_report(report, report_path):
+    """写出JSON报告，report_path 为 - 时输出到标准输出"""
+    report_text = json.dumps(report, ensure_ascii=False, indent=2)
+    if report_path == '-':
+        print(report_text)
+    else:
+        with open(report_path, 'w', encoding='utf-8') as f:
+            f.write(report_text + '\n')
+
+def main(argv=None):
+    """命令行入口：扫描、检查并合并一部或多部剧的字幕，返回退出码"""
+    parser = argparse.ArgumentParser(description='按视频帧精确时长合并分集字幕（无界面版）')
+    parser.add_argument('--video-dir', help='视频文件夹（包含子文件夹）')
+    parser.add_argument('--srt-dir', help='字幕文件夹（包含子文件夹）')
+    parser.add_argument('--output', help='输出字幕文件路径')
+    parser.add_argument('--batch', help='批量合并：任务清单JSON文件，或包含多部剧文件夹的根目录')
+    parser.add_argument('--series-workers', type=int, default=2, help='批量合并时同时处理的剧数（默认2）')
+    parser.add_argument('--range', dest='episode_range', help='按文件名中的EP集数筛选，如 1-20、16-；多个范围用逗号分隔（如 1-20,16-20），一次写出多个文件，有范围没有写出时退出码为1；默认合并全部')
+    parser.add_argument('--workers', type=int, help='视频探测和字幕解析的并发数，默认等于CPU核心数')
+    parser.add_argument('--json-report', help='把每集偏移和问题列表写入JSON文件（- 表示标准输出）')
+    parser.add_argument('--ffprobe', help='ffprobe可执行文件路径，默认自动查找')
+    parser.add_argument('--no-sort', action='store_true', help='按字典序排序文件（默认智能数字排序）')
+    parser.add_argument('--no-suffix', action='store_true', help='输出文件名不添加集数后缀')
+    parser.add_argument('--no-backup', action='store_true', help='不备份已存在的输出文件')
+    parser.add_argument('--no-probe-cache', action='store_true', help='不使用用户缓存目录中的视频探测缓存和合并记录')
+    parser.add_argument('--verify-frames', action='store_true', help='逐帧解码校验帧数（较慢）')
+    parser.add_argument('--passthrough', action='store_true', help='直通合并：只改写序号和时间行')
+    parser.add_argument('--no-perf-report', action='store_true', help='不在输出文件旁写出性能报告（.perf.json）')
+    parser.add_argument('--strict', action='store_true', help='有视频缺少字幕、时间轴乱序或超出时长时以非零状态退出')
+    parser.add_argument('--log-level', choices=('debug', 'info', 'warning', 'error'), default='debug',
+                        help='日志级别：debug 显示逐集细节（默认），info 只显示进度和结果，warning 只显示警告和错误')
+    parser.add_argument('--watch', action='store_true', help='合并后继续监视文件夹，文件变化时自动增量合并（Ctrl+C 退出）')
+    parser.add_argument('--watch-interval', type=float, default=2.0, help='监视模式的轮询间隔秒数（默认2）')
+    parser.add_argument('--watch-debounce', type=float, default=3.0, help='最后一次变化后等待的秒数，再开始合并（默认3）')
+    args = parser.parse_args(argv)
+    try:
+        episode_range = None
+        if args.episode_range:
+            episode_ranges = parse_episode_ranges(args.episode_range)
+            episode_range = episode_ranges[0] if len(episode_ranges) == 1 else episode_ranges
+    except ValueError as e:
+        parser.error(str(e))
+    engine_options = {'auto_sort': not args.no_sort, 'auto_suffix': not args.no_suffix, 'backup': not args.no_backup,
+                      'verify_frames': args.verify_frames, 'passthrough': args.passthrough,
+                      'perf_report': not args.no_perf_report}
+
+    if args.batch:
+        if args.video_dir or args.srt_dir or args.output:
+            parser.error("--batch 不能与 --video-dir/--srt-dir/--output 同时使用")
+        if args.watch:
+            parser.error("--watch 只支持单部剧")
+        try:
+            jobs = discover_series_jobs(args.batch) if os.path.isdir(args.batch) else load_batch_manifest(args.batch)
+        except (OSError, ValueError) as e:
+            parser.error(f"无法读取批量任务: {e}")
+        if not jobs:
+            parser.error(f"{args.batch} 中没有找到同时包含【无字幕】和-英语SRT终版文件夹的剧")
+        if episode_range is not None:
+            for job in jobs:
+                job['range'] = job['range'] or episode_range
+        runner = BatchMergeRunner(jobs, args.workers, args.series_workers, args.ffprobe, not args.no_probe_cache,
+                                  engine_options, args.strict, log_level=LOG_LEVEL_NAMES[args.log_level])
+        batch_start_time = time.perf_counter()
+        reports = runner.run()
+        for line in runner.format_summary(reports):
+            print(line)
+        print(f"总耗时 {time.perf_counter() - batch_start_time:.2f} 秒")
+        exit_code = max(report['exit_code'] for report in reports)
+        if args.json_report:
+            _write_json_report({'series': reports, 'exit_code': exit_code}, args.json_report)
+        return exit_code
+
+    if not (args.video_dir and args.srt_dir and args.output):
+        parser.error("需要 --video-dir、--srt-dir 和 --output（或使用 --batch）")
+    engine = SubtitleMergeEngine(args.ffprobe, use_probe_cache=not args.no_probe_cache)
+    engine.video_folder, engine.srt_folder = args.video_dir, args.srt_dir
+    engine.log_level = LOG_LEVEL_NAMES[args.log_level]
+    for key, value in engine_options.items():
+        setattr(engine, key, value)
+    if args.workers:
+        engine.probe_workers = engine.parse_workers = max(1, args.workers)
+    if not engine.ffprobe_path:
+        engine.log_message("⚠ 警告：未找到ffprobe，只能探测内置解析器支持的MP4/MKV文件")
+    report = engine.run_series(args.output, episode_range, args.strict)
+    if args.json_report:
+        _write_json_report(report, args.json_report)
+    if args.watch:
+        def on_report(new_report):
+            nonlocal report
+            if new_report is None:
+                return
+            report = new_report
+            if args.json_report:
+                _write_json_report(report, args.json_report)
+        watcher = engine.watch_series(args.output, episode_range, args.strict,
+                                      args.watch_interval, args.watch_debounce, on_report)
+        try:
+            while watcher.is_alive():
+                watcher.join(0.5)
+        except KeyboardInterrupt:
+            watcher.stop()
+            engine.log_message("已停止监视。")
+    return report['exit_code']
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()  # 打包为exe后解析进程池需要
+    sys.exit(main())
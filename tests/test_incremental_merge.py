@@ -0,0 +1,157 @@
+"""
+增量重新合并（复用上次的逐集结果）的测试：复用、重新编号、重新启动后复用保存的记录，以及无法复用时改为读取解析
+
+用法:
+    python -m unittest discover -s tests
+"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import subtitle_engine as tool
+
+EPISODES = 3
+CUES_PER_EPISODE = 4
+VIDEO_FRAMES, VIDEO_FPS = 1500, 25.0  # 每集60秒
+
+
+def srt_text(episode, cues=CUES_PER_EPISODE):
+    blocks = []
+    for n in range(cues):
+        start = n * 5
+        blocks.append(f"{n + 1}\n00:00:{start:02d},000 --> 00:00:{start + 2:02d},500\nEP{episode} 第{n + 1}句\n")
+    return "\n".join(blocks)
+
+
+class QuietEngine(tool.SubtitleMergeEngine):
+    """日志记到列表中，不输出到标准错误"""
+
+    def __init__(self):
+        tool.SubtitleMergeEngine.__init__(self, ffprobe_path='ffprobe', use_probe_cache=False)
+        self.logs = []
+
+    def log_message(self, message, level=tool.LOG_INFO):
+        self.logs.append(message)
+
+
+class IncrementalMergeTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix='subtitle_merge_test_')
+        self.video_dir = os.path.join(self.temp_dir, '视频')
+        self.srt_dir = os.path.join(self.temp_dir, '字幕')
+        os.makedirs(self.video_dir)
+        os.makedirs(self.srt_dir)
+        for episode in range(1, EPISODES + 1):
+            open(os.path.join(self.video_dir, f'EP{episode}.mp4'), 'wb').close()
+            self.write_srt(episode, srt_text(episode))
+        self.output_path = os.path.join(self.temp_dir, '合并字幕.srt')
+        self.engine = self.make_engine()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def write_srt(self, episode, text):
+        with open(os.path.join(self.srt_dir, f'EP{episode}.srt'), 'w', encoding='utf-8') as f:
+            f.write(text)
+
+    def make_engine(self):
+        """扫描文件列表，时长直接写入（不调用ffprobe）"""
+        engine = QuietEngine()
+        engine.video_folder, engine.srt_folder = self.video_dir, self.srt_dir
+        engine.backup = engine.auto_suffix = engine.perf_report = False
+        engine.parse_workers = 1
+        engine.scan_file_lists()
+        for item in engine.video_files_data:
+            item[3], item[4], item[5] = VIDEO_FRAMES / VIDEO_FPS, VIDEO_FRAMES, VIDEO_FPS
+        return engine
+
+    def merge(self, engine=None):
+        engine = engine or self.engine
+        result = engine.merge_subtitles(self.output_path, engine.video_files_data, 1, EPISODES, show_completion_dialog=False)
+        with open(self.output_path, 'rb') as f:
+            return result, f.read()
+
+    def fresh_merge(self):
+        """不复用上次结果的完整合并，作为对照"""
+        return self.merge(self.make_engine())
+
+    def test_unchanged_episodes_are_reused(self):
+        first, first_data = self.merge()
+        self.assertEqual(first['status'], 'ok')
+        self.assertEqual(first['cue_count'], EPISODES * CUES_PER_EPISODE)
+        self.assertEqual(first['reused_count'], 0)
+
+        second, second_data = self.merge()
+        self.assertEqual(second['status'], 'ok')
+        self.assertEqual(second['reused_count'], EPISODES)
+        self.assertEqual(second_data, first_data)
+
+    def test_reused_episodes_are_renumbered(self):
+        self.merge()
+        # 第1集多一条字幕：后面两集的偏移不变，可以复用，但序号整体后移
+        self.write_srt(1, srt_text(1, CUES_PER_EPISODE + 1))
+        result, data = self.merge()
+        self.assertEqual(result['status'], 'ok')
+        self.assertEqual(result['reused_count'], EPISODES - 1)
+        self.assertEqual(result['cue_count'], EPISODES * CUES_PER_EPISODE + 1)
+        _, expected = self.fresh_merge()
+        self.assertEqual(data, expected)
+
+    def test_saved_artifacts_are_reused_after_restart(self):
+        db_path = os.path.join(self.temp_dir, 'merge_artifacts.sqlite3')
+        self.engine.merge_artifacts = tool.MergeArtifactCache(db_path)
+        _, first_data = self.merge()
+        # 新的引擎和缓存对象相当于重新启动程序，只能从数据库读回上次的记录
+        engine = self.make_engine()
+        engine.merge_artifacts = tool.MergeArtifactCache(db_path)
+        result, data = self.merge(engine)
+        self.assertEqual(result['reused_count'], EPISODES)
+        self.assertEqual(data, first_data)
+
+    def test_saved_artifacts_are_ignored_after_output_changes(self):
+        db_path = os.path.join(self.temp_dir, 'merge_artifacts.sqlite3')
+        self.engine.merge_artifacts = tool.MergeArtifactCache(db_path)
+        self.merge()
+        with open(self.output_path, 'ab') as f:
+            f.write(b'\n')
+        engine = self.make_engine()
+        engine.merge_artifacts = tool.MergeArtifactCache(db_path)
+        result, _ = self.merge(engine)
+        self.assertEqual(result['reused_count'], 0)
+
+    def test_falls_back_to_parsing_when_previous_output_unreadable(self):
+        _, first_data = self.merge()
+        real_open = open
+
+        def failing_open(path, *args, **kwargs):
+            if path == self.output_path and args[:1] == ('rb',):
+                raise OSError('模拟读取失败')
+            return real_open(path, *args, **kwargs)
+
+        with mock.patch('builtins.open', failing_open):
+            result = self.engine.merge_subtitles(self.output_path, self.engine.video_files_data, 1, EPISODES,
+                                                 show_completion_dialog=False)
+        self.assertEqual(result['status'], 'ok')
+        self.assertEqual(result['reused_count'], 0)
+        self.assertEqual(result['processed_count'], EPISODES)
+        with open(self.output_path, 'rb') as f:
+            self.assertEqual(f.read(), first_data)
+
+    def test_falls_back_to_parsing_after_skipped_episode(self):
+        self.merge()
+        # 第1集字幕在扫描后被删除：该集跳过，后面的集在问题列表中的序号变了，不能复用
+        os.remove(os.path.join(self.srt_dir, 'EP1.srt'))
+        result, data = self.merge()
+        self.assertEqual(result['status'], 'ok')
+        self.assertEqual(len(result['skipped']), 1)
+        self.assertEqual(result['reused_count'], 0)
+        self.assertEqual(result['cue_count'], (EPISODES - 1) * CUES_PER_EPISODE)
+        self.assertTrue(data.startswith(b'1\n00:01:00,000 --> 00:01:02,500\nEP2'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+"""
+两种SRT解析（parse_srt_text 和直通合并用的 read_srt_file_raw）的一致性测试：同一文件应得到相同的时间轴
+
+用法:
+    python -m unittest discover -s tests
+"""
+import codecs
+import os
+import random
+import shutil
+import sys
+import tempfile
+import unittest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'benchmarks'))
+import subtitle_engine as tool
+from synthetic_data import build_srt_text
+
+
+def normalize_text(text):
+    """直通模式保留原始字节，逐行去掉行尾空白后再与 parse_srt_text 的结果比较"""
+    return '\n'.join(line.rstrip() for line in text.split('\n'))
+
+
+class SrtParserAgreementTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix='subtitle_srt_parser_test_')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def write(self, data, name='test.srt'):
+        path = os.path.join(self.temp_dir, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def parse_both(self, data):
+        """两种方式解析同一文件，断言时间轴一致，返回 (文本解析结果, 直通解析结果)"""
+        path = self.write(data)
+        timeline, encoding = tool.read_srt_file(path)
+        raw_timeline, raw_encoding = tool.read_srt_file_raw(path)
+        self.assertEqual(raw_encoding, encoding)
+        self.assertEqual([int(value) for value in raw_timeline.starts], [int(value) for value in timeline.starts])
+        self.assertEqual([int(value) for value in raw_timeline.ends], [int(value) for value in timeline.ends])
+        # GBK文件的直通文本已转为UTF-8
+        self.assertEqual([normalize_text(text.decode('utf-8')) for text in raw_timeline.texts], list(timeline.texts))
+        self.assertEqual([position.decode('utf-8') for position in raw_timeline.positions], list(timeline.positions))
+        return timeline, raw_timeline
+
+    def test_synthetic_episodes(self):
+        rng = random.Random(0)
+        for encoding in ('utf-8', 'utf-8-sig', 'gbk'):
+            for disorder, overlong in ((False, False), (True, False), (False, True)):
+                text = build_srt_text(3, 50, 600.0, rng, disorder=disorder, overlong=overlong)
+                timeline, _ = self.parse_both(text.encode(encoding))
+                self.assertEqual(len(timeline), 51 if overlong else 50)
+
+    def test_utf16_is_left_to_text_parser(self):
+        text = build_srt_text(1, 5, 60.0, random.Random(0))
+        self.assertIsNone(tool.read_srt_file_raw(self.write(codecs.BOM_UTF16_LE + text.encode('utf-16-le'))))
+
+    def test_missing_index(self):
+        timeline, _ = self.parse_both(b"00:00:01,000 --> 00:00:02,000\nfirst\n\n2\n00:00:03,000 --> 00:00:04,000\nsecond\n")
+        self.assertEqual(list(timeline.texts), ['first', 'second'])
+
+    def test_whitespace_only_separator_lines(self):
+        timeline, _ = self.parse_both(b"1\n00:00:01,000 --> 00:00:02,000\nfirst\n  \n\t\n"
+                                      b"2\n00:00:03,000 --> 00:00:04,000\nsecond  \n \n3\n00:00:05,000 --> 00:00:06,000\nthird")
+        self.assertEqual(list(timeline.texts), ['first', 'second', 'third'])
+
+    def test_position_fields(self):
+        timeline, _ = self.parse_both(b"1\n00:00:01,000 --> 00:00:02,000 X1:100 X2:200 Y1:10 Y2:20\nfirst\n\n"
+                                      b"2\n00:00:03,000 --> 00:00:04,000\nsecond\n")
+        self.assertEqual(list(timeline.positions), ['X1:100 X2:200 Y1:10 Y2:20', ''])
+
+    def test_short_milliseconds_and_other_separators(self):
+        timeline, _ = self.parse_both(b"1\n00:00:01,5 --> 00:00:02,50\nfirst\n\n"
+                                      b"2\n00:00:03.000-->00:00:04.000\nsecond\n\n"
+                                      b"3\n 00:00:05,000  -->  00:00:06,000 \nthird\n")
+        self.assertEqual([int(value) for value in timeline.starts], [1005, 3000, 5000])
+        self.assertEqual([int(value) for value in timeline.ends], [2050, 4000, 6000])
+
+    def test_empty_text(self):
+        # 有序号行的空字幕保留，只有时间行一行的块不是有效字幕
+        timeline, _ = self.parse_both(b"1\n00:00:01,000 --> 00:00:02,000\n\n"
+                                      b"00:00:02,500 --> 00:00:02,800\n\n"
+                                      b"3\n00:00:03,000 --> 00:00:04,000\nthird\n")
+        self.assertEqual(list(timeline.texts), ['', 'third'])
+
+    def test_cr_only_line_endings(self):
+        timeline, _ = self.parse_both(b"1\r00:00:01,000 --> 00:00:02,000\rfirst\rline two\r\r"
+                                      b"2\r00:00:03,000 --> 00:00:04,000\rsecond\r")
+        self.assertEqual(list(timeline.texts), ['first\nline two', 'second'])
+
+    def test_crlf_and_multiple_blank_lines(self):
+        timeline, _ = self.parse_both(b"\r\n\r\n1\r\n00:00:01,000 --> 00:00:02,000\r\nfirst\r\n\r\n\r\n\r\n"
+                                      b"2\r\n00:00:03,000 --> 00:00:04,000\r\nsecond\r\n\r\n")
+        self.assertEqual(len(timeline), 2)
+
+    def test_garbage_timing_lines(self):
+        data = (b"1\r\n00:00:01,000 --> 00:00:02,000\r\nfirst\r\n\r\n"
+                b"2\r\nnot a timestamp\r\nbroken\r\n\r\n"
+                b"3\r\n00:00:03 --> 00:00:04\r\nbroken too\r\n\r\n"
+                b"4\r\n00:00:05,000 --> 00:00:06,000\r\nlast\r\n")
+        timeline, raw_timeline = self.parse_both(data)
+        self.assertEqual(list(timeline.texts), ['first', 'last'])
+        # 直通模式记录无法解析的时间行及其在原文件中的字节偏移
+        self.assertEqual([line for _, line in raw_timeline.invalid_lines], ['not a timestamp', '00:00:03 --> 00:00:04'])
+        for offset, line in raw_timeline.invalid_lines:
+            self.assertTrue(data[offset:].startswith(line.encode('utf-8')))
+
+    def test_gbk_text(self):
+        timeline, _ = self.parse_both("1\n00:00:01,000 --> 00:00:02,000\n第一句台词\n\n"
+                                      "2\n00:00:03,000 --> 00:00:04,000\n第二句\n".encode('gbk'))
+        self.assertEqual(list(timeline.texts), ['第一句台词', '第二句'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,178 @@
+"""
+内置视频信息读取（MP4/MOV 的 moov 头部、Matroska 的 EBML 头部）的测试，使用手工构造的最小文件
+
+用法:
+    python -m unittest discover -s tests
+"""
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import unittest
+from fractions import Fraction
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import subtitle_engine as tool
+
+
+def box(box_type, *children, large=False):
+    """MP4 box；large=True 时使用64位扩展大小"""
+    payload = b''.join(children)
+    if large:
+        return struct.pack('>I4sQ', 1, box_type, 16 + len(payload)) + payload
+    return struct.pack('>I4s', 8 + len(payload), box_type) + payload
+
+
+def full_box(box_type, payload, version=0):
+    return box(box_type, bytes([version, 0, 0, 0]) + payload)
+
+
+def mvhd(timescale, duration):
+    return full_box(b'mvhd', struct.pack('>III', 0, 0, timescale) + struct.pack('>I', duration) + bytes(80))
+
+
+def trak(handler, timescale, stts_entries, duration=None):
+    """一条轨道：mdhd + hdlr + stts + stsz（样本数取stts总和）"""
+    sample_count = sum(count for count, _ in stts_entries)
+    if duration is None:
+        duration = sum(count * delta for count, delta in stts_entries)
+    stts = full_box(b'stts', struct.pack('>I', len(stts_entries)) + b''.join(struct.pack('>II', *entry) for entry in stts_entries))
+    stsz = full_box(b'stsz', struct.pack('>II', 0, sample_count))
+    return box(b'trak', box(b'mdia',
+                            full_box(b'mdhd', struct.pack('>III', 0, 0, timescale) + struct.pack('>I', duration) + bytes(4)),
+                            full_box(b'hdlr', struct.pack('>I4s', 0, handler) + bytes(12)),
+                            box(b'minf', box(b'stbl', stts, stsz))))
+
+
+def cfr_video_trak(seconds=1440, fps=25):
+    return trak(b'vide', fps * 1000, [(seconds * fps, 1000)])
+
+
+def vfr_video_trak(seconds=1440):
+    # 帧间隔交替变化，stts条目超过 MP4_MAX_STTS_ENTRIES
+    entries = [(1, 40 if i % 2 else 41) for i in range(tool.MP4_MAX_STTS_ENTRIES + 2)]
+    return trak(b'vide', 1000, entries, duration=seconds * 1000)
+
+
+def cover_trak():
+    # 封面图：只有1个样本的视频轨道
+    return trak(b'vide', 25000, [(1, 1000)])
+
+
+def ebml_element(element_id, payload):
+    id_bytes = element_id.to_bytes((element_id.bit_length() + 7) // 8, 'big')
+    return id_bytes + (0x01 << 56 | len(payload)).to_bytes(8, 'big') + payload
+
+
+def ebml_uint(element_id, value):
+    return ebml_element(element_id, value.to_bytes(8, 'big'))
+
+
+class VideoInfoTestCase(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix='subtitle_video_info_test_')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def write(self, name, data):
+        path = os.path.join(self.temp_dir, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+
+class Mp4VideoInfoTest(VideoInfoTestCase):
+    def read(self, *boxes):
+        return tool.read_mp4_video_info(self.write('video.mp4', box(b'ftyp', b'isom') + b''.join(boxes)))
+
+    def test_constant_frame_rate(self):
+        info = self.read(box(b'moov', mvhd(1000, 1440000), cfr_video_trak()), box(b'mdat', bytes(16)))
+        self.assertEqual(info['nb_frames'], 36000)
+        self.assertEqual(info['fps'], Fraction(25))
+        self.assertAlmostEqual(info['stream_duration'], 1440.0)
+        self.assertAlmostEqual(info['container_duration'], 1440.0)
+
+    def test_audio_track_before_video(self):
+        info = self.read(box(b'moov', mvhd(1000, 1440000), trak(b'soun', 48000, [(1440 * 48000 // 1024, 1024)]),
+                             cfr_video_trak()))
+        self.assertEqual(info['nb_frames'], 36000)
+
+    def test_cover_track_after_video_is_ignored(self):
+        info = self.read(box(b'moov', mvhd(1000, 1440000), cfr_video_trak(), cover_trak()))
+        self.assertEqual(info['nb_frames'], 36000)
+
+    def test_variable_frame_rate_is_rejected(self):
+        self.assertIsNone(self.read(box(b'moov', mvhd(1000, 1440000), vfr_video_trak())))
+
+    def test_cover_track_after_rejected_video_is_not_used(self):
+        self.assertIsNone(self.read(box(b'moov', mvhd(1000, 1440000), vfr_video_trak(), cover_trak())))
+
+    def test_video_track_much_shorter_than_movie_is_rejected(self):
+        self.assertIsNone(self.read(box(b'moov', mvhd(1000, 1440000), cover_trak())))
+
+    def test_64bit_box_sizes(self):
+        info = self.read(box(b'mdat', bytes(16), large=True),
+                         box(b'moov', mvhd(1000, 1440000), box(b'trak', cfr_video_trak()[8:], large=True), large=True))
+        self.assertEqual(info['nb_frames'], 36000)
+
+    def test_fragmented_mp4_is_rejected(self):
+        self.assertIsNone(self.read(box(b'moov', mvhd(1000, 1440000), cfr_video_trak(), box(b'mvex'))))
+        self.assertIsNone(self.read(box(b'moof', bytes(8)), box(b'moov', mvhd(1000, 1440000), cfr_video_trak())))
+
+    def test_not_mp4(self):
+        self.assertIsNone(tool.read_mp4_video_info(self.write('video.mp4', b'not an mp4 file')))
+
+
+class MkvVideoInfoTest(VideoInfoTestCase):
+    def read(self, duration_ms, default_duration_ns, frame_tag=None, track_type=1):
+        info = ebml_element(tool.MKV_ID_INFO, ebml_uint(tool.MKV_ID_TIMECODE_SCALE, 1000000)
+                            + ebml_element(tool.MKV_ID_DURATION, struct.pack('>d', duration_ms)))
+        tracks = ebml_element(tool.MKV_ID_TRACKS, ebml_element(tool.MKV_ID_TRACK_ENTRY,
+                                                               ebml_uint(tool.MKV_ID_TRACK_TYPE, track_type)
+                                                               + ebml_uint(tool.MKV_ID_TRACK_UID, 7)
+                                                               + ebml_uint(tool.MKV_ID_DEFAULT_DURATION, default_duration_ns)))
+        cluster = ebml_element(tool.MKV_ID_CLUSTER, bytes(32))
+        tags = b''
+        if frame_tag is not None:
+            tags = ebml_element(tool.MKV_ID_TAGS, ebml_element(tool.MKV_ID_TAG,
+                ebml_element(tool.MKV_ID_TARGETS, ebml_uint(tool.MKV_ID_TAG_TRACK_UID, 7))
+                + ebml_element(tool.MKV_ID_SIMPLE_TAG, ebml_element(tool.MKV_ID_TAG_NAME, b'NUMBER_OF_FRAMES')
+                               + ebml_element(tool.MKV_ID_TAG_STRING, str(frame_tag).encode('ascii')))))
+        # Tags 在 Cluster 之后，通过 SeekHead 找到
+        seek_head_size = len(ebml_element(tool.MKV_ID_SEEKHEAD, ebml_element(tool.MKV_ID_SEEK,
+            ebml_uint(tool.MKV_ID_SEEK_ID, tool.MKV_ID_TAGS) + ebml_uint(tool.MKV_ID_SEEK_POSITION, 0))))
+        seek_head = ebml_element(tool.MKV_ID_SEEKHEAD, ebml_element(tool.MKV_ID_SEEK,
+            ebml_uint(tool.MKV_ID_SEEK_ID, tool.MKV_ID_TAGS)
+            + ebml_uint(tool.MKV_ID_SEEK_POSITION, seek_head_size + len(info) + len(tracks) + len(cluster))))
+        segment = ebml_element(tool.MKV_ID_SEGMENT, seek_head + info + tracks + cluster + tags)
+        header = ebml_element(tool.EBML_ID_HEADER, b'')
+        return tool.read_mkv_video_info(self.write('video.mkv', header + segment))
+
+    def test_frames_from_duration(self):
+        info = self.read(1440000.0, 40000000)
+        self.assertEqual(info['nb_frames'], 36000)
+        self.assertEqual(info['fps'], Fraction(25))
+        self.assertEqual(info['confidence'], 'high')
+
+    def test_frames_from_statistics_tag_after_cluster(self):
+        info = self.read(1440000.0, 40000000, frame_tag=36000)
+        self.assertEqual(info['nb_frames'], 36000)
+        self.assertEqual(info['confidence'], 'high')
+
+    def test_statistics_tag_disagreeing_with_duration_is_low_confidence(self):
+        self.assertEqual(self.read(1440000.0, 40000000, frame_tag=30000)['confidence'], 'low')
+
+    def test_duration_not_on_frame_boundary_is_low_confidence(self):
+        self.assertEqual(self.read(1440020.0, 40000000)['confidence'], 'low')
+
+    def test_no_video_track(self):
+        self.assertIsNone(self.read(1440000.0, 40000000, track_type=2))
+
+    def test_not_matroska(self):
+        self.assertIsNone(tool.read_mkv_video_info(self.write('video.mkv', b'not a matroska file')))
+
+
+if __name__ == '__main__':
+    unittest.main()
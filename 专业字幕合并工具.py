@@ -1,18 +1,201 @@
 import os
-import pysrt # type: ignore
-import subprocess
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 from tkinter.scrolledtext import ScrolledText
 import threading
-import time
-from pathlib import Path
-import re # 引入正则表达式库用于自然排序
 import sys
-import tempfile
-import math
+import multiprocessing
+from subtitle_engine import (SubtitleMergeEngine, SubtitleMatchIndex, BatchMergeRunner, parse_episode_ranges, find_series_folders,
+                             default_series_output, discover_series_jobs, EXIT_OK,
+                             LogPipeline, default_log_path, LOG_DEBUG, LOG_INFO, LOG_WARNING,
+                             EventChannel, EVENT_PROBE_DONE, EVENT_PROGRESS, EVENT_STATUS, EVENT_PROBLEM, EVENT_CALL, JobCancelled)
+
+LOG_DRAIN_INTERVAL_MS = 100  # 界面线程取出日志的间隔
+LOG_MAX_LINES = 5000  # 日志框最多保留的行数，更早的只在日志文件中
+LOG_LEVEL_CHOICES = (("详细", LOG_DEBUG), ("普通", LOG_INFO), ("仅警告", LOG_WARNING))
+UI_FRAME_INTERVAL_MS = 40  # 界面线程处理工作线程事件的间隔（约25帧/秒）
+LIST_WHEEL_ROWS = 3  # 文件列表鼠标滚轮每格滚动的行数
+
+class FileListModel:
+    """
+    文件列表的数据模型：保存全部行，排序和筛选都在模型中完成，界面只渲染可见的部分
+    
+    参数:
+        sort_key: 单元格文本 -> 排序键（自然排序）
+    """
+    def __init__(self, sort_key):
+        self.sort_key = sort_key
+        self.keys = []  # 行键（文件完整路径），与 rows 一一对应
+        self.rows = []  # 每行的列值列表，顺序即文件的全局顺序
+        self.key_index = {}  # 行键 -> 在 rows 中的位置
+        self.problems = {}  # 行键 -> 问题说明，用于“只显示有问题的文件”
+        self.sort_column = None  # None 表示按全局顺序
+        self.sort_reverse = False
+        self.problems_only = False
+        self.view = []  # 筛选、排序后要显示的行位置
+        self.view_dirty = False
+
+    def set_rows(self, keys, rows):
+        """整体替换列表内容，仍存在的文件保留问题标记"""
+        self.keys = list(keys)
+        self.rows = [list(row) for row in rows]
+        self.key_index = {key: i for i, key in enumerate(self.keys)}
+        self.problems = {key: text for key, text in self.problems.items() if key in self.key_index}
+        self.view_dirty = True
+
+    def clear(self):
+        self.problems = {}
+        self.set_rows([], [])
+
+    def get_row(self, key):
+        index = self.key_index.get(key)
+        return None if index is None else tuple(self.rows[index])
+
+    def update_row(self, key, changes):
+        """
+        修改一行中的若干列
+        
+        参数:
+            changes: {列位置: 新值}
+        返回: 该行是否存在
+        """
+        index = self.key_index.get(key)
+        if index is None:
+            return False
+        row = self.rows[index]
+        for column, value in changes.items():
+            row[column] = value
+        if self.sort_column in changes:
+            self.view_dirty = True
+        return True
+
+    def set_problems(self, problems):
+        self.problems = {key: text for key, text in problems.items() if key in self.key_index}
+        if self.problems_only:
+            self.view_dirty = True
+
+    def set_problems_only(self, problems_only):
+        self.problems_only = problems_only
+        self.view_dirty = True
+
+    def sort_by(self, column):
+        """按列排序：同一列再次点击时倒序，第三次恢复全局顺序"""
+        if self.sort_column != column:
+            self.sort_column, self.sort_reverse = column, False
+        elif not self.sort_reverse:
+            self.sort_reverse = True
+        else:
+            self.sort_column, self.sort_reverse = None, False
+        self.view_dirty = True
 
-class SubtitleMerger:
+    def display_values(self, index):
+        return tuple(self.rows[index]) + (self.problems.get(self.keys[index], ""),)
+
+    def refresh(self):
+        """筛选或排序条件、排序列的数据变化后重新计算要显示的行"""
+        if not self.view_dirty:
+            return
+        if self.problems_only:
+            view = [i for i, key in enumerate(self.keys) if key in self.problems]
+        else:
+            view = list(range(len(self.rows)))
+        if self.sort_column is not None:
+            column = self.sort_column
+            view.sort(key=lambda i: self.sort_key(str(self.rows[i][column])), reverse=self.sort_reverse)
+        self.view = view
+        self.view_dirty = False
+
+class VirtualFileList(FileListModel):
+    """
+    只渲染可见行的文件列表：Treeview 中只保留一屏的行，滚动时从数据模型重新填入内容，
+    几千个文件时插入、刷新和滚动的开销都只与可见行数有关
+    
+    参数:
+        parent: 放置列表和滚动条的容器
+        columns: [(列名, 标题, 宽度, 对齐方式, 是否拉伸)]，末尾会自动加上“问题”列
+    """
+    def __init__(self, parent, columns, sort_key):
+        FileListModel.__init__(self, sort_key)
+        self.titles = [title for _, title, _, _, _ in columns]
+        names = [name for name, _, _, _, _ in columns] + ["问题"]
+        self.tree = ttk.Treeview(parent, columns=names, show="headings", height=8)
+        for column, (name, title, width, anchor, stretch) in enumerate(columns):
+            self.tree.heading(name, text=title, command=lambda column=column: self.sort_by_column(column))
+            self.tree.column(name, width=width, anchor=anchor, stretch=stretch)
+        self.tree.heading("问题", text="问题"); self.tree.column("问题", width=90, anchor="w")
+        self.tree.tag_configure("problem", foreground="red")
+        self.scrollbar = ttk.Scrollbar(parent, orient="vertical", command=self.yview)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y); self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.first = 0  # 第一个可见行在 view 中的位置
+        self.slots = []  # Treeview 中实际存在的行ID，数量等于可见行数
+        self.shown = 0  # slots 中当前挂在列表上的行数（其余已 detach）
+        self._set_slot_count(8)
+        self.tree.bind("<Configure>", self._on_resize)
+        self.tree.bind("<MouseWheel>", self._on_wheel)
+        self.tree.bind("<Button-4>", self._on_wheel); self.tree.bind("<Button-5>", self._on_wheel)
+
+    def _set_slot_count(self, count):
+        while len(self.slots) < count:
+            row_id = self.tree.insert("", tk.END, values=())
+            self.tree.detach(row_id)
+            self.slots.append(row_id)
+        while len(self.slots) > count:
+            self.tree.delete(self.slots.pop())
+        self.shown = min(self.shown, count)
+
+    def _on_resize(self, event):
+        row_height = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        count = max(1, (event.height - row_height - 4) // row_height)  # 减去表头
+        if count != len(self.slots):
+            self._set_slot_count(count)
+            self.refresh()
+
+    def _on_wheel(self, event):
+        step = -LIST_WHEEL_ROWS if event.num == 4 or event.delta > 0 else LIST_WHEEL_ROWS
+        self.yview("scroll", step, "units")
+        return "break"
+
+    def yview(self, *args):
+        """滚动条回调：按 view 中的位置滚动，而不是滚动 Treeview 自身"""
+        if args[0] == "moveto":
+            self.first = int(round(float(args[1]) * len(self.view)))
+        elif args[0] == "scroll":
+            self.first += int(args[1]) * (max(1, len(self.slots)) if args[2] == "pages" else 1)
+        self.refresh()
+
+    def sort_by_column(self, column):
+        self.sort_by(column)
+        for i, title in enumerate(self.titles):
+            arrow = (" ▼" if self.sort_reverse else " ▲") if i == self.sort_column else ""
+            self.tree.heading(self.tree["columns"][i], text=title + arrow)
+        self.refresh()
+
+    def refresh(self):
+        FileListModel.refresh(self)
+        self.render()
+
+    def render(self):
+        """把 view 中从 first 开始的一屏数据写入可见行"""
+        total = len(self.view)
+        self.first = max(0, min(self.first, total - len(self.slots)))
+        shown = min(len(self.slots), total - self.first)
+        if shown < self.shown:
+            self.tree.detach(*self.slots[shown:self.shown])
+        for slot in range(self.shown, shown):
+            self.tree.move(self.slots[slot], "", slot)
+        self.shown = shown
+        for slot in range(shown):
+            index = self.view[self.first + slot]
+            tags = ("problem",) if self.keys[index] in self.problems else ()
+            self.tree.item(self.slots[slot], values=self.display_values(index), tags=tags)
+        if self.tree.selection():
+            self.tree.selection_remove(*self.tree.selection())
+        if total:
+            self.scrollbar.set(self.first / total, (self.first + shown) / total)
+        else:
+            self.scrollbar.set(0, 1)
+
+class SubtitleMerger(SubtitleMergeEngine):
     def __init__(self, root):
         self.root = root
         self.root.title("字幕合并工具 - by 不是绅士")
@@ -20,8 +203,13 @@ class SubtitleMerger:
         self.root.resizable(True, True)
         self.root.configure()  # 使用默认背景
 
-        # 初始化ffprobe路径
-        self.ffprobe_path = self._get_ffprobe_path()
+        # 日志先进入队列，由界面线程定时成批显示；完整日志写入用户缓存目录下的轮转日志文件
+        self.log_pipeline = LogPipeline(default_log_path())
+        # 工作线程不直接操作界面控件，进度、列表行更新和弹窗都通过事件通道交给界面线程按帧处理
+        self.ui_events = EventChannel()
+
+        # 扫描、匹配与合并流程（查找ffprobe、打开探测缓存）
+        SubtitleMergeEngine.__init__(self)
 
         self.style = ttk.Style()
         # 使用默认主题，不进行自定义样式配置
@@ -35,6 +223,8 @@ class SubtitleMerger:
         self.create_file_list_and_log_section()  # 合并文件列表和日志区域
         self.create_action_section()
         self.create_status_bar()
+        self.root.after(LOG_DRAIN_INTERVAL_MS, self._drain_log_queue)
+        self.root.after(UI_FRAME_INTERVAL_MS, self._pump_ui_events)
 
         # 在启动时显示欢迎信息
         self.log_message("字幕合并工具启动成功！")
@@ -58,46 +248,54 @@ class SubtitleMerger:
         self.log_message("   • 点击「合并全部字幕」合并所有文件")
         self.log_message("   • 或使用「自定义合并」指定集数范围（如EP1-EP20）")
 
-        # (filename, full_path, relative_subfolder, base_name_for_matching)
-        self.video_files_data = [] 
-        self.srt_files_data = []   
-        self.folder_durations = {}
-        self.total_duration_seconds = 0.0
-        self.processing = False
         self.auto_scan_scheduled = False  # 防止重复自动扫描的标志
+        self.busy = False  # 合并、批量合并或监视触发的自动合并正在进行
+        self.busy_lock = threading.Lock()  # 保护 busy 和 auto_scan_scheduled 的检查与设置（监视线程也会占用）
+        self.folder_watcher = None  # 监视模式的 FolderWatcher，未监视时为None
+        self.watch_probed = None  # 监视模式自动合并期间探测到的 {视频路径: (帧数显示, 时长显示)}，其余时间为None
 
-    def get_base_filename(self, filename_with_ext):
-        """获取不带后缀的文件主名，用于匹配"""
-        return os.path.splitext(filename_with_ext)[0]
+    def _is_busy(self):
+        """是否有扫描或合并任务正在进行（合并流程设置的 processing 也计入）"""
+        with self.busy_lock:
+            return self.busy or self.auto_scan_scheduled or self.processing
 
-    def natural_sort_key_for_filename(self, filename_str):
-        """针对纯文件名的自然排序键函数"""
-        return [int(text) if text.isdigit() else text.lower()
-                for text in re.split('([0-9]+)', filename_str)]
-    
-    def smart_folder_sort_key(self, folder_name):
-        """智能文件夹排序键函数，专门处理包含数字范围的文件夹名称"""
-        # 寻找文件夹名中的数字范围模式，如 "1-30", "31-61" 等
-        range_pattern = r'(\d+)-(\d+)'
-        range_matches = re.findall(range_pattern, folder_name)
+    def _try_begin_task(self, auto_scan=False):
+        """
+        没有其他任务时占用忙碌状态，检查和设置在同一把锁内完成（界面线程和监视线程都会调用）
         
-        if range_matches:
-            # 如果找到数字范围，使用第一个数字作为主要排序键
-            first_number = int(range_matches[0][0])
-            # 为了处理重叠范围，也考虑结束数字
-            last_number = int(range_matches[0][1])
-            # 使用起始数字作为主排序键，结束数字作为次排序键
-            return (first_number, last_number, folder_name.lower())
-        else:
-            # 如果没有找到范围，寻找单独的数字
-            numbers = re.findall(r'\d+', folder_name)
-            if numbers:
-                # 使用第一个找到的数字作为排序键
-                first_number = int(numbers[0])
-                return (first_number, 0, folder_name.lower())
+        参数: auto_scan - True时设置 auto_scan_scheduled，否则设置 busy；结束时以相同的 auto_scan 调用 _end_task 清除
+        返回: 占用成功返回True，已有任务在进行时返回False
+        """
+        with self.busy_lock:
+            if self.busy or self.auto_scan_scheduled or self.processing:
+                return False
+            if auto_scan:
+                self.auto_scan_scheduled = True
+            else:
+                self.busy = True
+            return True
+
+    def _end_task(self, auto_scan=False):
+        """释放 _try_begin_task 占用的忙碌状态（任意线程调用）"""
+        with self.busy_lock:
+            if auto_scan:
+                self.auto_scan_scheduled = False
             else:
-                # 如果没有数字，使用字母排序，但排在有数字的后面
-                return (float('inf'), 0, folder_name.lower())
+                self.busy = False
+
+    def _sync_engine_options(self):
+        """把界面中的路径和选项同步给合并流程（在界面线程中调用）"""
+        self.video_folder = self.video_folder_entry.get().strip()
+        self.srt_folder = self.srt_folder_entry.get().strip()
+        self.auto_sort = self.auto_sort_var.get()
+        self.backup = self.backup_var.get()
+        self.auto_suffix = self.auto_suffix_var.get()
+        try:
+            self.probe_workers = int(self.probe_workers_var.get())
+        except (ValueError, tk.TclError):
+            self.probe_workers = os.cpu_count() or 4
+        self.verify_frames = self.verify_frames_var.get()
+        self.passthrough = self.passthrough_var.get()
 
     def create_path_section(self):
         path_frame = ttk.LabelFrame(self.main_frame, text="路径设置", padding="15")
@@ -110,6 +308,9 @@ class SubtitleMerger:
                   style='Accent.TButton', width=20).pack(side=tk.LEFT, padx=5)
         ttk.Label(auto_recognize_frame, text="（自动识别包含【无字幕】和-英语SRT终版的文件夹）", 
                  foreground="gray").pack(side=tk.LEFT, padx=5)
+        self.batch_merge_button = ttk.Button(auto_recognize_frame, text="📦 批量合并多部剧", command=self.select_batch_root_folder,
+                                             width=18)
+        self.batch_merge_button.pack(side=tk.LEFT, padx=5)
         
         ttk.Label(path_frame, text="视频文件夹:").grid(row=1, column=0, sticky=tk.W, pady=5)
         self.video_folder_entry = ttk.Entry(path_frame, width=70)
@@ -184,6 +385,17 @@ class SubtitleMerger:
         self.total_videos_label = ttk.Label(merge_frame, text="(共0个视频)")
         self.total_videos_label.grid(row=0, column=7, padx=5, pady=10, sticky=tk.W)
         
+        # 多段合并：一次写出多个范围的文件，每集字幕只解析和检查一次
+        ttk.Label(merge_frame, text="多段合并:", 
+                 font=('Microsoft YaHei UI', 10, 'bold')).grid(row=1, column=1, padx=15, pady=(0,10), sticky=tk.W)
+        self.multi_range_entry = ttk.Entry(merge_frame, width=24)
+        self.multi_range_entry.grid(row=1, column=2, columnspan=4, padx=(5,2), pady=(0,10), sticky=tk.EW)
+        self.multi_range_entry.insert(0, "1-20, 16-20")
+        self.multi_merge_button = ttk.Button(merge_frame, text="开始多段合并",
+                                             command=self.start_multi_range_merge,
+                                             width=15, state=tk.DISABLED)
+        self.multi_merge_button.grid(row=1, column=6, padx=10, pady=(0,10), sticky=tk.W)
+        
         # 配置网格权重
         merge_frame.columnconfigure(8, weight=1)
         
@@ -195,33 +407,15 @@ class SubtitleMerger:
         ttk.Checkbutton(options_frame2, text="合并前备份原文件", variable=self.backup_var).grid(row=0, column=1, padx=(20,5), pady=5, sticky=tk.W)
         self.auto_suffix_var = tk.BooleanVar(value=True)
         ttk.Checkbutton(options_frame2, text="自动添加集数后缀", variable=self.auto_suffix_var).grid(row=0, column=2, padx=(20,5), pady=5, sticky=tk.W)
-        options_frame2.columnconfigure(3, weight=1)
-
-    def _get_ffprobe_path(self):
-        """获取ffprobe.exe的路径"""
-        # 1. 首先尝试从打包的资源中获取
-        if getattr(sys, 'frozen', False):
-            # 运行在PyInstaller打包的exe中
-            bundle_dir = sys._MEIPASS
-            ffprobe_path = os.path.join(bundle_dir, 'ffprobe.exe')
-            if os.path.exists(ffprobe_path):
-                return ffprobe_path
-        
-        # 2. 尝试在当前目录查找
-        current_dir_ffprobe = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ffprobe.exe')
-        if os.path.exists(current_dir_ffprobe):
-            return current_dir_ffprobe
-        
-        # 3. 检查系统PATH中是否有ffprobe
-        try:
-            subprocess.run(['ffprobe', '-version'], capture_output=True, check=True)
-            return 'ffprobe'
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            pass
-        
-        # 4. 如果都没有找到，返回None
-        return None
-
+        # 视频时长扫描的并发数，默认等于CPU核心数
+        ttk.Label(options_frame2, text="探测并发数:").grid(row=0, column=3, padx=(20,2), pady=5, sticky=tk.W)
+        self.probe_workers_var = tk.StringVar(value=str(os.cpu_count() or 4))
+        ttk.Spinbox(options_frame2, from_=1, to=64, width=5, textvariable=self.probe_workers_var).grid(row=0, column=4, padx=2, pady=5, sticky=tk.W)
+        self.verify_frames_var = tk.BooleanVar(value=False) # 默认不解码，使用容器元数据/数据包计数
+        ttk.Checkbutton(options_frame2, text="校验帧数（解码，较慢）", variable=self.verify_frames_var).grid(row=0, column=5, padx=(20,5), pady=5, sticky=tk.W)
+        self.passthrough_var = tk.BooleanVar(value=False) # 直通合并：只改写序号和时间行，字幕文本按原始字节复制
+        ttk.Checkbutton(options_frame2, text="直通合并（仅改时间行）", variable=self.passthrough_var).grid(row=0, column=6, padx=(20,5), pady=5, sticky=tk.W)
+        options_frame2.columnconfigure(6, weight=1)
 
     def create_file_list_and_log_section(self):
         # 创建水平布局的容器
@@ -233,21 +427,23 @@ class SubtitleMerger:
         files_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=False, padx=(0,5))
         files_frame.configure(width=400)  # 设置固定宽度
         
+        # 只看有问题的文件（扫描出错、缺少字幕、时间轴乱序、超出时长等），大批量时便于定位
+        list_filter_frame = ttk.Frame(files_frame); list_filter_frame.pack(fill=tk.X)
+        self.problems_only_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(list_filter_frame, text="只显示有问题的文件", variable=self.problems_only_var,
+                        command=self._on_problems_only_changed).pack(side=tk.LEFT)
+        self.list_problem_label = ttk.Label(list_filter_frame, text="", foreground="gray")
+        self.list_problem_label.pack(side=tk.LEFT, padx=5)
+        
         self.tab_control = ttk.Notebook(files_frame)
         
         # 视频文件标签页（第一个标签页）
         video_tab = ttk.Frame(self.tab_control)
         video_frame_inner = ttk.Frame(video_tab)
         video_frame_inner.pack(fill=tk.BOTH, expand=True)
-        columns_video = ("序号", "文件名", "帧数", "时长") # 增加帧数列
-        self.video_tree = ttk.Treeview(video_frame_inner, columns=columns_video, show="headings", height=8)
-        self.video_tree.heading("序号", text="全局序"); self.video_tree.heading("文件名", text="文件名")
-        self.video_tree.heading("帧数", text="帧数"); self.video_tree.heading("时长", text="时长")
-        self.video_tree.column("序号", width=60, anchor="center", stretch=tk.NO); self.video_tree.column("文件名", width=200, anchor="w")  # 减小文件名宽度
-        self.video_tree.column("帧数", width=80, anchor="center", stretch=tk.NO); self.video_tree.column("时长", width=100, anchor="center", stretch=tk.NO)
-        video_scrollbar_y = ttk.Scrollbar(video_frame_inner, orient="vertical", command=self.video_tree.yview)
-        self.video_tree.configure(yscrollcommand=video_scrollbar_y.set)
-        video_scrollbar_y.pack(side=tk.RIGHT, fill=tk.Y); self.video_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        columns_video = [("序号", "全局序", 60, "center", tk.NO), ("文件名", "文件名", 200, "w", tk.YES),  # 减小文件名宽度
+                         ("帧数", "帧数", 80, "center", tk.NO), ("时长", "时长", 100, "center", tk.NO)]  # 增加帧数列
+        self.video_list = VirtualFileList(video_frame_inner, columns_video, self.natural_sort_key_for_filename)
         # 添加视频文件标签页为第一个
         self.tab_control.add(video_tab, text="视频文件")
 
@@ -255,13 +451,8 @@ class SubtitleMerger:
         srt_tab = ttk.Frame(self.tab_control)
         srt_frame_inner = ttk.Frame(srt_tab)
         srt_frame_inner.pack(fill=tk.BOTH, expand=True)
-        columns_srt = ("序号", "文件名") # 删除"所在完整路径"列
-        self.srt_tree = ttk.Treeview(srt_frame_inner, columns=columns_srt, show="headings", height=8)
-        self.srt_tree.heading("序号", text="全局序"); self.srt_tree.heading("文件名", text="文件名")
-        self.srt_tree.column("序号", width=60, anchor="center", stretch=tk.NO); self.srt_tree.column("文件名", width=380, anchor="w")
-        srt_scrollbar_y = ttk.Scrollbar(srt_frame_inner, orient="vertical", command=self.srt_tree.yview)
-        self.srt_tree.configure(yscrollcommand=srt_scrollbar_y.set)
-        srt_scrollbar_y.pack(side=tk.RIGHT, fill=tk.Y); self.srt_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        columns_srt = [("序号", "全局序", 60, "center", tk.NO), ("文件名", "文件名", 290, "w", tk.YES)] # 删除"所在完整路径"列
+        self.srt_list = VirtualFileList(srt_frame_inner, columns_srt, self.natural_sort_key_for_filename)
         # 添加字幕文件标签页为第二个
         self.tab_control.add(srt_tab, text="字幕文件")
         
@@ -273,17 +464,34 @@ class SubtitleMerger:
         log_frame = ttk.LabelFrame(horizontal_frame, text="处理日志", padding="15")
         log_frame.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True, padx=(5,0))
         
+        # 显示级别：「普通」隐藏逐集、逐个视频的细节（日志文件中仍完整保留）
+        log_level_frame = ttk.Frame(log_frame); log_level_frame.pack(fill=tk.X, pady=(0,3))
+        ttk.Label(log_level_frame, text="显示级别:").pack(side=tk.LEFT)
+        self.log_level_var = tk.StringVar(value=LOG_LEVEL_CHOICES[0][0])
+        log_level_box = ttk.Combobox(log_level_frame, textvariable=self.log_level_var, state="readonly", width=8,
+                                     values=[label for label, _ in LOG_LEVEL_CHOICES])
+        log_level_box.pack(side=tk.LEFT, padx=5)
+        log_level_box.bind("<<ComboboxSelected>>", lambda event: self._on_log_level_changed())
+        if self.log_pipeline.log_path:
+            ttk.Label(log_level_frame, text=f"完整日志: {self.log_pipeline.log_path}", foreground="gray").pack(side=tk.LEFT, padx=5)
+        
         # 确保日志文本框有足够的最小高度
         self.log_text = ScrolledText(log_frame, width=50, height=20, wrap=tk.WORD, 
                                    font=("Consolas", 9))
         self.log_text.pack(fill=tk.BOTH, expand=True, padx=3, pady=3)
 
-
     def create_action_section(self):
         action_frame = ttk.Frame(self.main_frame, padding=(0, 5, 0, 0)); action_frame.pack(fill=tk.X, pady=(5,0))
         self.progress = ttk.Progressbar(action_frame, orient="horizontal", length=500, mode="determinate"); self.progress.pack(side=tk.LEFT, padx=(0,10), fill=tk.X, expand=True)
         self.clear_button = ttk.Button(action_frame, text="清空日志", command=self.clear_log); self.clear_button.pack(side=tk.RIGHT, padx=5)
         self.reset_button = ttk.Button(action_frame, text="🔄 重置", command=self.reset_all); self.reset_button.pack(side=tk.RIGHT, padx=5)
+        # 增量刷新：只探测新增或变化的视频
+        self.refresh_button = ttk.Button(action_frame, text="🔃 刷新列表", command=self.refresh_file_lists); self.refresh_button.pack(side=tk.RIGHT, padx=5)
+        # 监视模式：文件夹有新文件或文件被修改时自动增量合并
+        self.watch_button = ttk.Button(action_frame, text="👁 监视并自动合并", command=self.toggle_watch); self.watch_button.pack(side=tk.RIGHT, padx=5)
+        # 暂停/取消正在进行的扫描或合并（只在任务运行时可用）
+        self.cancel_button = ttk.Button(action_frame, text="✖ 取消", command=self.cancel_job, state=tk.DISABLED); self.cancel_button.pack(side=tk.RIGHT, padx=5)
+        self.pause_button = ttk.Button(action_frame, text="⏸ 暂停", command=self.toggle_pause, state=tk.DISABLED); self.pause_button.pack(side=tk.RIGHT, padx=5)
 
     def create_status_bar(self):
         self.status_bar = ttk.Label(self.root, text="就绪", relief=tk.FLAT, anchor=tk.W, padding=(10,5))
@@ -291,7 +499,7 @@ class SubtitleMerger:
 
     def start_merge_all(self):
         """合并全部字幕"""
-        if self.processing: 
+        if self._is_busy(): 
             messagebox.showinfo("提示", "处理中..."); 
             return
         output_path = self.output_file_entry.get().strip()
@@ -309,22 +517,25 @@ class SubtitleMerger:
             f"确定要合并全部字幕吗？\n\n详细信息：\n• 共{total_videos}个视频文件\n• 起始集数：第1集\n• 结束集数：第{total_videos}集")
         
         if result:
+            if not self._try_begin_task():
+                messagebox.showinfo("提示", "处理中...")
+                return
             self.log_message(f"开始合并全部字幕（第1-{total_videos}集）...")
             self.merge_all_button.config(state=tk.DISABLED)
             self.custom_merge_button.config(state=tk.DISABLED)
+            self.multi_merge_button.config(state=tk.DISABLED)
             
             # 找到第一集和最后一集的真实集数用于文件名后缀
             first_ep_num = self.get_episode_number_from_filename(self.video_files_data[0][0]) or 1
             last_ep_num = self.get_episode_number_from_filename(self.video_files_data[-1][0]) or total_videos
 
             # 传递整个列表
-            threading.Thread(target=self._merge_srt_files_thread, 
-                             args=(output_path, self.video_files_data, first_ep_num, last_ep_num, True), 
-                             daemon=True).start()
+            self._sync_engine_options()
+            self._start_job(self._merge_srt_files_thread, output_path, self.video_files_data, first_ep_num, last_ep_num, True)
 
     def start_custom_merge(self):
         """自定义范围合并 - 按文件名中的数字筛选"""
-        if self.processing: 
+        if self._is_busy(): 
             messagebox.showinfo("提示", "处理中..."); 
             return
         output_path = self.output_file_entry.get().strip()
@@ -351,25 +562,7 @@ class SubtitleMerger:
                 return
 
             # --- 核心逻辑：按文件名筛选 ---
-            videos_to_merge = []
-            unmatched_videos = []  # 记录无法提取集数的文件
-            
-            for video_data in self.video_files_data:
-                video_name = video_data[0]
-                episode_num = self.get_episode_number_from_filename(video_name)
-                
-                if episode_num is None:
-                    unmatched_videos.append(video_name)
-                elif start_num <= episode_num <= end_num:
-                    videos_to_merge.append(video_data)
-            
-            # 如果有无法识别集数的文件，给出更详细的提示
-            if unmatched_videos:
-                self.log_message(f"警告：以下 {len(unmatched_videos)} 个文件无法识别集数：")
-                for vid in unmatched_videos[:5]:  # 只显示前5个
-                    self.log_message(f"  • {vid}")
-                if len(unmatched_videos) > 5:
-                    self.log_message(f"  ... 还有 {len(unmatched_videos) - 5} 个文件")
+            videos_to_merge, unmatched_videos = self.select_episode_range(start_num, end_num)
             
             if not videos_to_merge:
                 # 更详细的错误提示
@@ -401,72 +594,65 @@ class SubtitleMerger:
                 f"确定要合并吗？")
             
             if result:
+                if not self._try_begin_task():
+                    messagebox.showinfo("提示", "处理中...")
+                    return
                 # 使用用户输入的原始范围作为文件名后缀
                 suffix_end_num = end_num if end_num != float('inf') else self.get_episode_number_from_filename(videos_to_merge[-1][0])
                 
                 self.log_message(f"开始按文件名集数合并 (范围: EP{start_num}-EP{suffix_end_num})...")
                 self.merge_all_button.config(state=tk.DISABLED)
                 self.custom_merge_button.config(state=tk.DISABLED)
+                self.multi_merge_button.config(state=tk.DISABLED)
                 
                 # 将筛选好的列表和用于后缀的起止编号传递给线程
-                threading.Thread(target=self._merge_srt_files_thread, 
-                                 args=(output_path, videos_to_merge, start_num, suffix_end_num, True), 
-                                 daemon=True).start()
+                self._sync_engine_options()
+                self._start_job(self._merge_srt_files_thread, output_path, videos_to_merge, start_num, suffix_end_num, True)
                 
         except ValueError:
             messagebox.showwarning("警告", "请输入有效的数字！")
 
-    def get_episode_number_from_filename(self, filename):
-        """从文件名中提取集数数字（仅识别EP前缀标准格式）"""
-        # 只匹配 EP + 数字 模式（例如：EP1, EP2, EP01, EP 1等）
-        # 忽略大小写，允许EP和数字之间有空格
-        ep_match = re.search(r'EP\s*(\d+)', filename, re.IGNORECASE)
-        if ep_match:
-            try:
-                return int(ep_match.group(1))
-            except (ValueError, IndexError):
-                return None
-        
-        # 如果没有EP前缀，返回None（不符合命名标准）
-        return None
+    def start_multi_range_merge(self):
+        """多段合并：一次合并多个集数范围（如 1-20, 16-20），每个范围输出一个文件"""
+        if self._is_busy(): 
+            messagebox.showinfo("提示", "处理中..."); 
+            return
+        output_path = self.output_file_entry.get().strip()
+        if not output_path: 
+            messagebox.showwarning("警告", "请选择输出路径."); 
+            return
+        if not self.video_files_data: 
+            messagebox.showwarning("警告", "无视频文件."); 
+            return
+        try:
+            episode_ranges = parse_episode_ranges(self.multi_range_entry.get())
+        except ValueError as e:
+            messagebox.showwarning("警告", f"{e}\n\n示例：1-20, 16-20, 1-60（结束留空表示到最后一集）")
+            return
 
-    def find_matching_subtitle(self, video_data_item):
-        """
-        统一的字幕匹配函数
-        
-        参数:
-            video_data_item: 视频数据项 [文件名, 完整路径, 基础名, 时长, 帧数, 帧率]
-            
-        返回:
-            匹配的字幕数据项 (srt_name, srt_full_path, srt_base_name) 或 None
-        """
-        video_name = video_data_item[0]
-        video_base_name = video_data_item[2]
-        
-        matched_srt_data = None
-        
-        # 1. 首先尝试精确匹配（忽略大小写）
-        for srt_data_item in self.srt_files_data:
-            srt_fn, srt_fp, srt_bn = srt_data_item
-            if srt_bn.lower() == video_base_name.lower():
-                matched_srt_data = srt_data_item
-                break
-        
-        # 2. 如果没有精确匹配，尝试EP模式匹配
-        if not matched_srt_data:
-            video_ep_match = re.search(r'EP\s*(\d+)', video_base_name, re.IGNORECASE)
-            if video_ep_match:
-                video_ep_num = int(video_ep_match.group(1))
-                
-                for srt_data_item in self.srt_files_data:
-                    srt_fn, srt_fp, srt_bn = srt_data_item
-                    srt_ep_match = re.search(r'EP\s*(\d+)', srt_bn, re.IGNORECASE)
-                    
-                    if srt_ep_match and int(srt_ep_match.group(1)) == video_ep_num:
-                        matched_srt_data = srt_data_item
-                        break
-        
-        return matched_srt_data
+        range_lines = []
+        for start_num, end_num in episode_ranges:
+            videos, _ = self.select_episode_range(start_num, end_num)
+            range_lines.append(f"• EP{start_num}-EP{end_num or '最后'}: {len(videos)} 个视频")
+        result = messagebox.askyesno("确认多段合并", 
+            f"将一次合并以下 {len(episode_ranges)} 个范围，每个范围输出一个文件：\n\n" + "\n".join(range_lines) + "\n\n确定要合并吗？")
+        if result:
+            if not self._try_begin_task():
+                messagebox.showinfo("提示", "处理中...")
+                return
+            self.log_message(f"开始多段合并: {self.multi_range_entry.get().strip()}")
+            self.merge_all_button.config(state=tk.DISABLED)
+            self.custom_merge_button.config(state=tk.DISABLED)
+            self.multi_merge_button.config(state=tk.DISABLED)
+            self._sync_engine_options()
+            self._start_job(self._merge_ranges_thread, output_path, episode_ranges)
+
+    def _merge_ranges_thread(self, output_path, episode_ranges):
+        try:
+            self.merge_episode_ranges(output_path, episode_ranges)
+        finally:
+            self._end_task()
+            self._restore_merge_buttons()
 
     def update_button_states(self):
         """更新按钮状态"""
@@ -479,25 +665,11 @@ class SubtitleMerger:
         if total_videos > 0:
             self.merge_all_button.config(state=tk.NORMAL)
             self.custom_merge_button.config(state=tk.NORMAL)
+            self.multi_merge_button.config(state=tk.NORMAL)
         else:
             self.merge_all_button.config(state=tk.DISABLED)
             self.custom_merge_button.config(state=tk.DISABLED)
-
-    def generate_output_filename_with_suffix(self, original_path, start_episode, end_episode):
-        """生成带集数后缀的输出文件名"""
-        if not self.auto_suffix_var.get():
-            return original_path
-            
-        path_obj = Path(original_path)
-        name_without_ext = path_obj.stem
-        extension = path_obj.suffix
-        directory = path_obj.parent
-        
-        # 生成集数后缀
-        suffix = f"{start_episode}-{end_episode}"
-        new_name = f"{name_without_ext}{suffix}{extension}"
-        
-        return str(directory / new_name)
+            self.multi_merge_button.config(state=tk.DISABLED)
 
     def select_video_folder(self):
         video_folder = filedialog.askdirectory(title="选择视频文件夹")
@@ -510,34 +682,81 @@ class SubtitleMerger:
     def select_output_file(self):
         output_file = filedialog.asksaveasfilename(defaultextension=".srt", filetypes=[("SRT 文件", "*.srt")], title="保存合并后的字幕文件")
         if output_file: self.output_file_entry.delete(0, tk.END); self.output_file_entry.insert(0, output_file)
-    
+
     def select_parent_folder(self):
         """选择父文件夹并自动识别视频和字幕文件夹"""
         parent_folder = filedialog.askdirectory(title="选择包含视频和字幕文件夹的父文件夹")
         if parent_folder:
             self.auto_recognize_folders(parent_folder)
-    
+
+    def select_batch_root_folder(self):
+        """选择包含多部剧的根文件夹，识别每部剧的视频和字幕文件夹后批量合并"""
+        if self._is_busy():
+            messagebox.showinfo("提示", "处理中...")
+            return
+        root_folder = filedialog.askdirectory(title="选择包含多部剧文件夹的根文件夹")
+        if not root_folder:
+            return
+        try:
+            jobs = discover_series_jobs(root_folder)
+        except OSError as e:
+            messagebox.showerror("错误", f"读取文件夹时发生错误：\n{str(e)}")
+            return
+        if not jobs:
+            messagebox.showwarning("未找到剧集", "根文件夹下没有同时包含【无字幕】和-英语SRT终版文件夹的剧。")
+            return
+        
+        names = "\n".join(f"• {job['name']}" for job in jobs[:10])
+        if len(jobs) > 10:
+            names += f"\n... 还有 {len(jobs) - 10} 部"
+        if not messagebox.askyesno("确认批量合并",
+                f"找到 {len(jobs)} 部剧：\n{names}\n\n"
+                f"每部剧合并全部字幕，输出到各自的 字幕/合并字幕.srt。\n确定要开始吗？"):
+            return
+        
+        if not self._try_begin_task():
+            messagebox.showinfo("提示", "处理中...")
+            return
+        self._sync_engine_options()
+        for button in (self.merge_all_button, self.custom_merge_button, self.multi_merge_button, self.batch_merge_button):
+            button.config(state=tk.DISABLED)
+        self.status_bar.config(text=f"正在批量合并 {len(jobs)} 部剧...")
+        self._start_job(self._batch_merge_thread, jobs)
+
+    def _batch_merge_thread(self, jobs):
+        try:
+            runner = BatchMergeRunner(jobs, self._get_probe_worker_count(),
+                                      engine_options={name: getattr(self, name) for name in self.OPTION_NAMES},
+                                      log=self.log_message, job_control=self.job_control)
+            reports = runner.run()
+            for line in runner.format_summary(reports):
+                self.log_message(line)
+            succeeded = sum(1 for report in reports if report['exit_code'] == EXIT_OK)
+            if self.job_control.cancelled:
+                return
+            self._notify('info' if succeeded == len(reports) else 'warning', "批量合并完成",
+                         f"成功 {succeeded}/{len(reports)} 部，各剧结果和耗时见日志。")
+        except Exception as e:
+            self.log_message(f"批量合并出错: {str(e)}")
+            self._notify('error', "错误", f"批量合并出错：\n{str(e)}")
+        finally:
+            self._end_task()
+            self._restore_merge_buttons()
+            self._ui_call(self.batch_merge_button.config, state=tk.NORMAL)
+            self.ui_events.publish(EVENT_STATUS, "就绪")
+
     def auto_recognize_folders(self, parent_folder):
         """自动识别父文件夹中的视频文件夹和字幕文件夹"""
         self.log_message("开始自动识别文件夹...")
         self.log_message(f"父文件夹: {parent_folder}")
         
-        video_folder = None
-        srt_folder = None
-        
-        # 遍历父文件夹中的所有子文件夹
+        # 遍历父文件夹中的所有子文件夹，查找包含【无字幕】和-英语SRT终版的文件夹
         try:
-            for item in os.listdir(parent_folder):
-                item_path = os.path.join(parent_folder, item)
-                if os.path.isdir(item_path):
-                    # 检查是否包含【无字幕】
-                    if "【无字幕】" in item:
-                        video_folder = item_path
-                        self.log_message(f"✓ 识别到视频文件夹: {item}")
-                    # 检查是否包含-英语SRT终版
-                    elif "-英语SRT终版" in item:
-                        srt_folder = item_path
-                        self.log_message(f"✓ 识别到字幕文件夹: {item}")
+            video_folder, srt_folder = find_series_folders(parent_folder)
+            if video_folder:
+                self.log_message(f"✓ 识别到视频文件夹: {os.path.basename(video_folder)}")
+            if srt_folder:
+                self.log_message(f"✓ 识别到字幕文件夹: {os.path.basename(srt_folder)}")
             
             # 验证识别结果
             if video_folder and srt_folder:
@@ -550,13 +769,13 @@ class SubtitleMerger:
                 self.srt_folder_entry.insert(0, srt_folder)
                 
                 # 自动设置输出路径：父文件夹/字幕/合并字幕.srt
-                output_folder = os.path.join(parent_folder, "字幕")
+                output_file = default_series_output(parent_folder)
+                output_folder = os.path.dirname(output_file)
                 # 创建输出文件夹（如果不存在）
                 if not os.path.exists(output_folder):
                     os.makedirs(output_folder)
                     self.log_message(f"✓ 创建输出文件夹: {output_folder}")
                 
-                output_file = os.path.join(output_folder, "合并字幕.srt")
                 self.output_file_entry.delete(0, tk.END)
                 self.output_file_entry.insert(0, output_file)
                 
@@ -595,598 +814,391 @@ class SubtitleMerger:
             messagebox.showerror("错误", f"识别文件夹时发生错误：\n{str(e)}")
 
     def update_file_lists(self):
+        if not self._try_begin_task(auto_scan=True):
+            messagebox.showinfo("提示", "正在处理中，请稍后再更新文件列表。")
+            return
+        self._rescan_all_file_lists()
+
+    def _rescan_all_file_lists(self):
+        """完整扫描文件列表并按条件启动自动扫描（界面线程）；调用前已占用 auto_scan_scheduled，由扫描线程或不扫描时释放"""
         self.log_message("正在扫描文件...")
-        # 重置自动扫描标志，允许新的扫描
-        self.auto_scan_scheduled = False
-        for tree in [self.video_tree, self.srt_tree, self.folder_duration_tree]: tree.delete(*tree.get_children())
-        self.video_files_data, self.srt_files_data, self.folder_durations = [], [], {}
-        self.total_duration_seconds = 0.0
+        self.video_list.clear(); self.srt_list.clear(); self._update_list_problem_label()
+        self._clear_folder_duration_tree()
         self.total_duration_label.config(text="视频总时长: 00:00:00")
         self.video_count_label.config(text="视频文件总数: 0"); self.srt_count_label.config(text="字幕文件总数: 0")
 
-        video_root_dir, srt_root_dir = self.video_folder_entry.get().strip(), self.srt_folder_entry.get().strip()
+        # --- 扫描、排序文件并重建匹配索引 ---
+        self._sync_engine_options()
+        self.scan_file_lists()
+
+        # --- 更新UI列表 ---
+        self._fill_file_trees()
         
-        # --- 扫描和初步收集文件 ---
-        raw_video_files, raw_srt_files = [], []
-        if os.path.isdir(video_root_dir):
-            for dirpath, _, filenames in os.walk(video_root_dir):
-                for f in filenames:
-                    if f.lower().endswith(('.mp4', '.mov', '.avi', '.mkv', '.wmv', '.flv')):
-                        # 使用列表，包含：[文件名, 完整路径, 基础名, 时长(秒), 帧数, 帧率]
-                        raw_video_files.append([f, os.path.join(dirpath, f), self.get_base_filename(f), 0.0, 0, 0.0])
+        # 更新按钮状态
+        self.update_button_states()
         
-        if os.path.isdir(srt_root_dir):
-            for dirpath, _, filenames in os.walk(srt_root_dir):
-                for f in filenames:
-                    if f.lower().endswith('.srt'):
-                        raw_srt_files.append((f, os.path.join(dirpath, f), self.get_base_filename(f)))
-
-        # --- 全局自然排序 ---
-        if self.auto_sort_var.get():
-            raw_video_files.sort(key=lambda x: self.natural_sort_key_for_filename(x[0]))
-            raw_srt_files.sort(key=lambda x: self.natural_sort_key_for_filename(x[0]))
-        else: # 传统字典序 (如果用户取消勾选)
-            raw_video_files.sort(key=lambda x: x[0].lower())
-            raw_srt_files.sort(key=lambda x: x[0].lower())
-            
-        self.video_files_data = raw_video_files
-        self.srt_files_data = raw_srt_files
+        # 检查是否应该进行自动扫描（仅在两个目录都有内容时进行）
+        self.check_and_start_auto_scan()
 
-        # --- 更新UI列表 ---
+    def _fill_file_trees(self, kept_values=None):
+        """
+        按 video_files_data / srt_files_data 的顺序重新填充两个文件列表
+        
+        参数:
+            kept_values: {视频完整路径: (帧数显示, 时长显示)}，未给出的视频显示为待扫描
+        """
+        kept_values = kept_values or {}
         self.video_count_label.config(text=f"视频文件总数: {len(self.video_files_data)}")
+        video_rows = []
         for i, video_item in enumerate(self.video_files_data):
-            name = video_item[0]
-            self.video_tree.insert("", tk.END, values=(i+1, name, "待扫描", "待扫描"))  # 添加帧数列
+            name, full_path = video_item[0], video_item[1]
+            framerate_display, duration_display = kept_values.get(full_path, ("待扫描", "待扫描"))
+            video_rows.append((i+1, name, framerate_display, duration_display))  # 添加帧数列
+        self.video_list.set_rows([item[1] for item in self.video_files_data], video_rows)
+        self.video_list.refresh()
             
         self.srt_count_label.config(text=f"字幕文件总数: {len(self.srt_files_data)}")
-        for i, (name, full_path, _) in enumerate(self.srt_files_data):
-            self.srt_tree.insert("", tk.END, values=(i+1, name))
+        self.srt_list.set_rows([full_path for _, full_path, _ in self.srt_files_data],
+                               [(i+1, name) for i, (name, _, _) in enumerate(self.srt_files_data)])
+        self.srt_list.refresh()
+        self._update_list_problem_label()
+
+    def refresh_file_lists(self):
+        """增量刷新文件列表：未变化的视频保留扫描结果，只探测新增或修改过的视频"""
+        if not self._try_begin_task(auto_scan=True):
+            messagebox.showinfo("提示", "正在处理中，请稍后再刷新。")
+            return
+        self._sync_engine_options()
+        if self.scanned_video_folder != self.video_folder or not self.video_durations_counted:
+            # 换了文件夹或还没扫描过时长，按完整扫描处理，占用的状态直接交给完整扫描
+            self._rescan_all_file_lists()
+            return
+        self.log_message("正在增量刷新文件列表...")
+        self._start_job(self._scan_video_duration_thread, None, True)  # 遍历文件夹也在工作线程中进行
+
+    def _refill_trees_after_rescan(self, changed_paths):
+        """增量重新扫描后重建文件列表（界面线程），未变化的视频保留已显示的扫描结果"""
+        kept_values = {}
+        for full_path, values in zip(self.video_list.keys, self.video_list.rows):
+            if full_path not in changed_paths:
+                kept_values[full_path] = (values[2], values[3])
+        self._fill_file_trees(kept_values)
+
+    def toggle_watch(self):
+        """开始或停止监视模式"""
+        if self.folder_watcher is not None:
+            self._stop_watch()
+            return
+        output_path = self.output_file_entry.get().strip()
+        if not output_path:
+            messagebox.showwarning("警告", "请选择输出路径.")
+            return
+        if not self.video_files_data:
+            messagebox.showwarning("警告", "无视频文件.")
+            return
+        # 合并范围取自定义合并的起止集数，默认 1 到 0 表示合并全部
+        try:
+            custom_start_text = self.custom_start_entry.get().strip()
+            custom_end_text = self.custom_end_entry.get().strip()
+            start_num = int(custom_start_text) if custom_start_text else 1
+            end_num = int(custom_end_text) if custom_end_text and custom_end_text != "0" else None
+        except ValueError:
+            messagebox.showwarning("警告", "请输入有效的数字！")
+            return
+        if start_num <= 0 or (end_num is not None and start_num > end_num):
+            messagebox.showwarning("警告", "自定义合并的集数范围无效！")
+            return
+        self.watch_episode_range = None if start_num == 1 and end_num is None else (start_num, end_num)
+
+        self._sync_engine_options()
+        self.folder_watcher = self.watch_series(output_path, self.watch_episode_range,
+                                                on_report=self._on_watch_report, on_start=self._on_watch_start)
+        self.watch_button.config(text="⏹ 停止监视")
+        range_text = "全部" if self.watch_episode_range is None else f"EP{start_num}-EP{end_num or '最后'}"
+        self.log_message(f"开始监视文件夹：有新文件或文件被修改时自动合并{range_text}字幕到 {os.path.basename(output_path)}")
+        self.status_bar.config(text="正在监视文件夹...")
+
+    def _stop_watch(self):
+        if self.folder_watcher is None:
+            return
+        self.folder_watcher.stop()
+        self.folder_watcher = None
+        self.watch_button.config(text="👁 监视并自动合并")
+        self.log_message("已停止监视文件夹。")
 
-        if not self.video_files_data and os.path.isdir(video_root_dir): self.log_message("未在视频目录找到支持的视频文件。")
-        if not self.srt_files_data and os.path.isdir(srt_root_dir): self.log_message("未在字幕目录找到SRT文件。")
-        if self.video_files_data or self.srt_files_data: self.log_message("文件扫描完成。")
-        
-        # 更新按钮状态
-        self.update_button_states()
+    def _on_watch_start(self, changed_paths):
+        """
+        监视线程回调：每批文件变化自动合并前占用忙碌状态，直到界面刷新完成（_finish_watch_run）才释放
         
-        # 检查是否应该进行自动扫描（仅在两个目录都有内容时进行）
-        self.check_and_start_auto_scan()
+        返回: 正在处理其他任务时返回False，稍后重试
+        """
+        if not self._try_begin_task():
+            return False
+        self.job_control.reset()
+        self.watch_probed = {}
+        self._ui_call(self._set_job_buttons, True)
+        self._ui_call(self._disable_merge_buttons)
+        return True
+
+    def _on_watch_report(self, report):
+        """监视线程回调：自动合并结束（report 为 run_series 的报告，被取消或出错时为None），界面刷新交给界面线程"""
+        problems = None
+        if report is not None:
+            problems = self._list_problems_from(report['unmatched_videos'], report['time_disorder'], report['large_time_diff'])
+        self._ui_call(self._finish_watch_run, problems)
+        self.ui_events.publish(EVENT_STATUS, "正在监视文件夹...")  # 在合并本身的状态之后
+
+    def _finish_watch_run(self, problems):
+        """监视模式自动合并后按扫描结果重建文件列表和时长统计（界面线程），再释放忙碌状态"""
+        try:
+            # 已计入统计的视频保留显示的扫描结果，本次探测的视频（包括列表中原来没有的）取探测结果
+            kept_values = {full_path: (values[2], values[3]) for full_path, values in zip(self.video_list.keys, self.video_list.rows)
+                           if full_path in self.video_durations_counted}
+            kept_values.update(self.watch_probed or {})
+            self._fill_file_trees(kept_values)
+            self._show_folder_durations()
+            self.update_button_states()
+            if problems is not None:
+                self._show_list_problems(*problems)
+        finally:
+            self.watch_probed = None
+            self._end_task()
+            self._set_job_buttons(False)
+
+    def _clear_folder_duration_tree(self):
+        """清空文件夹时长列表（在界面线程中调用，工作线程通过 _ui_call 调用）"""
+        self.folder_duration_tree.delete(*self.folder_duration_tree.get_children())
+
+    def _show_folder_durations(self):
+        """按当前统计刷新总时长标签和文件夹时长列表"""
+        self.total_duration_label.config(text=f"视频总时长: {self.format_duration_minutes_only(self.total_duration_seconds)}")
+        self._clear_folder_duration_tree()
+        # 使用智能排序来显示文件夹时长，按数字大小排序
+        for folder, dur_sec in self.sorted_folder_durations(): 
+            self.folder_duration_tree.insert("", tk.END, values=(folder, self.format_duration_minutes_only(dur_sec)))
 
     def check_and_start_auto_scan(self):
-        """检查条件并启动自动扫描"""
+        """检查条件并启动自动扫描（已占用 auto_scan_scheduled，不扫描时释放）"""
         video_folder = self.video_folder_entry.get().strip()
         srt_folder = self.srt_folder_entry.get().strip()
         
         # 条件：有视频文件 且 (有字幕文件 或 至少设置了字幕文件夹路径)
         should_scan = (
             self.video_files_data and  # 有视频文件
-            (self.srt_files_data or srt_folder) and  # 有字幕文件或至少设置了字幕文件夹
-            not self.auto_scan_scheduled  # 未安排过自动扫描
+            (self.srt_files_data or srt_folder)  # 有字幕文件或至少设置了字幕文件夹
         )
         
         if should_scan:
-            self.auto_scan_scheduled = True
             self.log_message("检测到视频和字幕文件夹都已设置，开始自动扫描时长...")
-            threading.Thread(target=self._scan_video_duration_thread, daemon=True).start()
+            self._start_job(self._scan_video_duration_thread)
         else:
+            self._end_task(auto_scan=True)
             self.status_bar.config(text="文件列表已更新。")
 
-    def _scan_video_duration_thread(self):
-        self.log_message("开始扫描视频时长...")
-        self.status_bar.config(text="正在扫描视频时长..."); self.root.update_idletasks()
-        self.total_duration_seconds = 0.0; self.folder_durations.clear(); self.folder_duration_tree.delete(*self.folder_duration_tree.get_children())
-        total_files_to_scan = len(self.video_files_data); self.progress["maximum"] = total_files_to_scan; self.progress["value"] = 0
+    def _scan_video_duration_thread(self, video_paths=None, rescan=False):
+        """
+        探测视频时长并检查字幕问题（工作线程），结束时释放 auto_scan_scheduled
         
-        video_tree_items = self.video_tree.get_children() # 获取treeview中的item ID列表
-
-        for i, video_data_item in enumerate(self.video_files_data): # 遍历已排序的数据列表
-            video_name = video_data_item[0]
-            video_full_path = video_data_item[1]
-            # 假设 self.video_files_data 和 video_tree_items 顺序一致
-            tree_item_id = video_tree_items[i] if i < len(video_tree_items) else None
-
-            video_root_dir = Path(self.video_folder_entry.get().strip())
-            try:
-                relative_folder = str(Path(os.path.dirname(video_full_path)).relative_to(video_root_dir))
-                if relative_folder == ".": relative_folder = "根目录"
-            except ValueError:
-                relative_folder = Path(os.path.dirname(video_full_path)).name # Fallback
-
+        参数:
+            video_paths: 只探测这些视频，None表示全部
+            rescan: 先增量重新扫描文件列表，改为只探测新增或修改过的视频
+        """
+        try:
+            if rescan:
+                video_paths, _ = self.rescan_file_lists()
+                self._ui_call(self._refill_trees_after_rescan, video_paths)
+            if video_paths is None:
+                self._ui_call(self._clear_folder_duration_tree)
+            probe = video_paths is None or len(video_paths) > 0
             try:
-                # 获取基于帧的精确信息
-                total_frames, fps_decimal, duration = self.get_video_frame_info_ffprobe(video_full_path)
-                
-                # 同时获取ffprobe直接报告的duration（用于文件夹时长统计）
-                raw_duration = self.get_video_duration_ffprobe(video_full_path)
-                
-                if total_frames is not None and fps_decimal is not None and duration is not None:
-                    # 存储完整信息：[文件名, 路径, 基础名, 时长, 帧数, 帧率]
-                    video_data_item[3] = duration
-                    video_data_item[4] = total_frames
-                    video_data_item[5] = fps_decimal
-                    
-                    # 文件夹时长统计使用ffprobe直接报告的duration（类似Windows属性）
-                    self.total_duration_seconds += raw_duration
-                    self.folder_durations[relative_folder] = self.folder_durations.get(relative_folder, 0.0) + raw_duration
-                    
-                    formatted_duration = self.format_duration(duration)
-                    framerate_display = f"{total_frames}f@{fps_decimal:.2f}fps"
-                    
-                    if tree_item_id:
-                        current_values = list(self.video_tree.item(tree_item_id, 'values'))
-                        current_values[2] = framerate_display  # 帧数和帧率
-                        current_values[3] = formatted_duration  # 时长
-                        self.video_tree.item(tree_item_id, values=tuple(current_values))
-                    
-                    self.log_message(f"[{i+1}/{total_files_to_scan}] {relative_folder}/{video_name}: {formatted_duration} ({framerate_display})")
-                else:
-                    # 回退到旧方法
-                    duration = self.get_video_duration_ffprobe(video_full_path)
-                    framerate = self.get_video_framerate_ffprobe(video_full_path)
-                    video_data_item[3] = duration
-                    self.total_duration_seconds += duration
-                    self.folder_durations[relative_folder] = self.folder_durations.get(relative_folder, 0.0) + duration
-                    formatted_duration = self.format_duration(duration)
-                    if tree_item_id:
-                        current_values = list(self.video_tree.item(tree_item_id, 'values'))
-                        current_values[2] = framerate
-                        current_values[3] = formatted_duration
-                        self.video_tree.item(tree_item_id, values=tuple(current_values))
-                    self.log_message(f"[{i+1}/{total_files_to_scan}] {relative_folder}/{video_name}: {formatted_duration} ({framerate})")
-            except Exception as e:
-                self.log_message(f"扫描 {video_name} 出错: {str(e)}")
-                if tree_item_id:
-                    current_values = list(self.video_tree.item(tree_item_id, 'values'))
-                    current_values[2] = "错误"  # 帧数列
-                    current_values[3] = "错误"  # 时长列
-                    self.video_tree.item(tree_item_id, values=tuple(current_values))
+                if probe:
+                    self.scan_video_durations(video_paths)
             finally:
-                self.progress["value"] = i + 1
-                self.root.after(0, self.root.update_idletasks)
-        
-        self.total_duration_label.config(text=f"视频总时长: {self.format_duration_minutes_only(self.total_duration_seconds)}")
-        # 使用智能排序来显示文件夹时长，按数字大小排序
-        sorted_folders = sorted(self.folder_durations.items(), key=lambda x: self.smart_folder_sort_key(x[0]))
-        for folder, dur_sec in sorted_folders: 
-            self.folder_duration_tree.insert("", tk.END, values=(folder, self.format_duration_minutes_only(dur_sec)))
-        self.log_message(f"扫描完成！视频总时长: {self.format_duration(self.total_duration_seconds)}")
-        if self.folder_durations: self.log_message("各文件夹时长已更新。")
-        
-        # 扫描完成后，如果启用了"自动识别后5个"，重新计算集数范围
-        # if hasattr(self, 'auto_last5_var') and self.auto_last5_var.get():
-        #     self.root.after(0, self.on_auto_last5_changed)
-        
-        # 扫描完成后，更新按钮状态
-        self.root.after(0, self.update_button_states)
-        
-        # 重置自动扫描标志，允许下次重新选择文件夹时再次自动扫描
-        self.auto_scan_scheduled = False
-        
-        # 扫描完成后立即检查字幕文件问题
-        self.root.after(0, self.check_subtitle_problems_after_scan)
-        
-        # 检查视频和字幕的匹配情况
-        self.root.after(0, self.check_video_subtitle_matching)
-            
-        self.status_bar.config(text="视频时长扫描完成。"); self.progress["value"] = 0; self.root.after(0, self.root.update_idletasks)
-
-    def check_subtitle_problems_after_scan(self):
-        """扫描完成后检查字幕文件问题并弹窗提醒"""
-        if not self.video_files_data or not self.srt_files_data:
-            return
-        
-        self.log_message("开始检查字幕文件问题...")
-        
-        time_disorder_subtitles = []
-        large_time_diff_subtitles = []
-        
-        # 遍历所有字幕文件进行检查
-        for srt_idx, (srt_name, srt_full_path, srt_base_name) in enumerate(self.srt_files_data):
-            # 尝试匹配对应的视频
-            matched_video_data = None
-            video_idx = -1
-            
-            # 反向匹配：从字幕找视频
-            for v_idx, video_data_item in enumerate(self.video_files_data):
-                video_base_name = video_data_item[2]
+                # 取消时也显示已探测部分的统计
+                self._ui_call(self._show_folder_durations)
                 
-                # 精确匹配
-                if srt_base_name.lower() == video_base_name.lower():
-                    matched_video_data = video_data_item
-                    video_idx = v_idx
-                    break
-                
-                # EP模式匹配
-                srt_ep_match = re.search(r'EP\s*(\d+)', srt_base_name, re.IGNORECASE)
-                if srt_ep_match:
-                    srt_ep_num = int(srt_ep_match.group(1))
-                    video_name = video_data_item[0]
-                    video_ep_match = re.search(r'EP\s*(\d+)', video_name, re.IGNORECASE)
-                    if video_ep_match and int(video_ep_match.group(1)) == srt_ep_num:
-                        matched_video_data = video_data_item
-                        video_idx = v_idx
-                        break
-            
-            if not matched_video_data:
-                continue
+                # 扫描完成后，更新按钮状态
+                self._ui_call(self.update_button_states)
             
-            video_name = matched_video_data[0]
-            video_duration_seconds = matched_video_data[3]
+            # 扫描完成后立即检查字幕文件问题和视频字幕匹配情况（在工作线程中解析，问题通过事件通道弹窗并标记到列表）
+            self._ui_call(self._show_list_problems, *self._collect_list_problems())
             
-            # 检查字幕文件
-            try:
-                subs = pysrt.open(srt_full_path, encoding='utf-8')
-            except UnicodeDecodeError:
-                try:
-                    subs = pysrt.open(srt_full_path, encoding='gbk')
-                except:
-                    continue
-            except:
-                continue
-            
-            # 检查时间轴乱序
-            if len(subs) > 1:
-                for idx in range(1, len(subs)):
-                    prev_sub = subs[idx - 1]
-                    curr_sub = subs[idx]
-                    
-                    prev_time_ms = (prev_sub.start.hours * 3600000 + 
-                                   prev_sub.start.minutes * 60000 + 
-                                   prev_sub.start.seconds * 1000 + 
-                                   prev_sub.start.milliseconds)
-                    curr_time_ms = (curr_sub.start.hours * 3600000 + 
-                                   curr_sub.start.minutes * 60000 + 
-                                   curr_sub.start.seconds * 1000 + 
-                                   curr_sub.start.milliseconds)
-                    
-                    if curr_time_ms < prev_time_ms:
-                        regression_details = f"第{idx}条 ({self.format_duration(curr_time_ms/1000)}) < 第{idx+1}条 ({self.format_duration(prev_time_ms/1000)})"
-                        disorder_info = {
-                            'video_name': video_name,
-                            'srt_name': srt_name,
-                            'episode_num': video_idx + 1,  # 序号
-                            'episode_display': srt_name,  # 显示文件名
-                            'details': regression_details
-                        }
-                        time_disorder_subtitles.append(disorder_info)
-                        break
-            
-            # 检查字幕超出视频时长
-            if len(subs) > 0 and video_duration_seconds > 0:
-                max_end_time_ms = 0
-                for sub in subs:
-                    end_time_ms = (sub.end.hours * 3600000 + 
-                                  sub.end.minutes * 60000 + 
-                                  sub.end.seconds * 1000 + 
-                                  sub.end.milliseconds)
-                    if end_time_ms > max_end_time_ms:
-                        max_end_time_ms = end_time_ms
-                
-                srt_end_time_seconds = max_end_time_ms / 1000.0
-                time_diff = srt_end_time_seconds - video_duration_seconds
-                
-                if time_diff > 3.0:
-                    large_diff_info = {
-                        'video_name': video_name,
-                        'srt_name': srt_name,
-                        'episode_num': video_idx + 1,  # 序号
-                        'episode_display': srt_name,  # 显示文件名
-                        'time_diff': time_diff,
-                        'srt_end': self.format_duration(srt_end_time_seconds),
-                        'video_duration': self.format_duration(video_duration_seconds)
-                    }
-                    large_time_diff_subtitles.append(large_diff_info)
-        
-        # 显示检查结果
-        has_problems = large_time_diff_subtitles or time_disorder_subtitles
-        
-        if has_problems:
-            self.show_subtitle_problems_dialog(time_disorder_subtitles, large_time_diff_subtitles)
-        else:
-            self.log_message("✓ 字幕文件检查完成，未发现问题！")
-
-    def show_subtitle_problems_dialog(self, time_disorder_subtitles, large_time_diff_subtitles):
-        """显示字幕问题弹窗"""
-        self.log_message("")
-        self.log_message("="*70)
-        self.log_message("🚨 检测到字幕文件存在问题！")
-        self.log_message("="*70)
-        
-        warning_details = []
-        
-        # 处理时间轴乱序
-        if time_disorder_subtitles:
-            self.log_message(f"\n【时间轴乱序】检测到 {len(time_disorder_subtitles)} 个字幕文件：")
-            for info in time_disorder_subtitles:
-                # 使用文件名显示，而不是序号
-                file_display = os.path.splitext(info['srt_name'])[0]  # 去掉扩展名
-                self.log_message(f"🔀 {file_display}: {info['srt_name']}")
-                self.log_message(f"   问题: {info['details']}")
-                warning_details.append(f"{file_display}: 时间轴乱序")
-        
-        # 处理超出3秒
-        if large_time_diff_subtitles:
-            self.log_message(f"\n【超出时长】检测到 {len(large_time_diff_subtitles)} 个字幕文件：")
-            for info in large_time_diff_subtitles:
-                # 使用文件名显示，而不是序号
-                file_display = os.path.splitext(info['srt_name'])[0]  # 去掉扩展名
-                self.log_message(f"⏰ {file_display}: {info['srt_name']}")
-                self.log_message(f"   超出: {info['time_diff']:.3f}秒")
-                warning_details.append(f"{file_display}: 超出 {info['time_diff']:.1f}秒")
-        
-        self.log_message("="*70)
-        
-        # 弹窗提醒
-        warning_message = "⚠️ 检测到字幕文件存在问题，建议修复后再合并！\n\n"
-        
-        if time_disorder_subtitles:
-            warning_message += f"🔀 时间轴乱序：{len(time_disorder_subtitles)} 个文件\n"
-            warning_message += "   • 字幕时间轴前后顺序混乱\n"
-            warning_message += "   • 拖入视频软件会显示很长\n\n"
-        
-        if large_time_diff_subtitles:
-            warning_message += f"⏰ 超出时长：{len(large_time_diff_subtitles)} 个文件\n"
-            warning_message += "   • 字幕比视频长超过3秒\n"
-            warning_message += "   • 可能版本不匹配\n\n"
-        
-        warning_message += "问题文件详情：\n"
-        display_items = warning_details[:8]
-        warning_message += "\n".join(display_items)
-        
-        if len(warning_details) > 8:
-            warning_message += f"\n... 还有 {len(warning_details) - 8} 个文件"
-        
-        warning_message += "\n\n⚠️ 建议先修复这些问题，再进行字幕合并！"
-        
-        messagebox.showwarning("字幕文件问题警告", warning_message)
+            self.ui_events.publish(EVENT_STATUS, "视频时长扫描完成。" if probe else "文件列表已刷新，没有需要重新扫描的视频。")
+        finally:
+            # 重置自动扫描标志，允许下次重新选择文件夹时再次自动扫描
+            self._end_task(auto_scan=True)
+            self.ui_events.publish(EVENT_PROGRESS, 0, None)
 
-    def check_video_subtitle_matching(self):
-        """检查所有视频是否都能找到对应的字幕文件"""
-        if not self.video_files_data or not self.srt_files_data:
-            return
-        
-        self.log_message("开始检查视频与字幕的匹配情况...")
-        
-        unmatched_videos = []
-        
-        # 遍历所有视频文件，检查是否有对应的字幕
-        for video_idx, video_data_item in enumerate(self.video_files_data):
-            video_name = video_data_item[0]
-            
-            # 使用统一的匹配函数
-            matched_srt_data = self.find_matching_subtitle(video_data_item)
-            
-            # 如果找不到匹配的字幕，记录下来
-            if not matched_srt_data:
-                # 尝试提取EP集数用于显示
-                ep_num = self.get_episode_number_from_filename(video_name)
-                ep_display = f"EP{ep_num}" if ep_num else "未知集数"
-                
-                unmatched_videos.append({
-                    'index': video_idx + 1,
-                    'name': video_name,
-                    'ep_display': ep_display
-                })
-        
-        # 如果有视频找不到字幕，弹窗警告
-        if unmatched_videos:
-            self.log_message("")
-            self.log_message("="*70)
-            self.log_message("❌ 视频与字幕匹配检查失败！")
-            self.log_message("="*70)
-            self.log_message(f"发现 {len(unmatched_videos)} 个视频文件无法找到对应的字幕：")
-            self.log_message("")
-            
-            for info in unmatched_videos:
-                self.log_message(f"❌ 序号{info['index']} ({info['ep_display']}): {info['name']}")
-            
-            self.log_message("")
-            self.log_message("="*70)
-            self.log_message("⚠️ 警告：如果继续合并，这些视频的时长会被跳过，")
-            self.log_message("      导致后续字幕的时间轴偏移出现严重错误！")
-            self.log_message("="*70)
-            
-            # 弹窗警告
-            warning_message = f"⚠️ 发现 {len(unmatched_videos)} 个视频无法找到对应的字幕文件！\n\n"
-            warning_message += "❌ 缺少字幕的视频：\n"
-            
-            # 最多显示10个
-            display_items = unmatched_videos[:10]
-            for info in display_items:
-                warning_message += f"• 序号{info['index']} ({info['ep_display']}): {info['name']}\n"
-            
-            if len(unmatched_videos) > 10:
-                warning_message += f"... 还有 {len(unmatched_videos) - 10} 个文件\n"
-            
-            warning_message += "\n⚠️ 严重警告：\n"
-            warning_message += "• 如果继续合并，这些视频的时长会被跳过\n"
-            warning_message += "• 会导致后续所有字幕的时间轴偏移错误\n"
-            warning_message += "• 合并后的字幕将无法正常使用\n\n"
-            warning_message += "🔧 建议解决方案：\n"
-            warning_message += "1. 检查字幕文件命名是否与视频一致\n"
-            warning_message += "2. 确保所有视频都有对应的字幕文件\n"
-            warning_message += "3. 确认字幕文件是否都包含EP前缀（如EP1、EP2）\n\n"
-            warning_message += "📋 匹配规则：\n"
-            warning_message += "• 优先：完全相同的文件名（不含扩展名）\n"
-            warning_message += "• 其次：EP+数字匹配（如EP1匹配EP1）"
-            
-            messagebox.showerror("视频字幕匹配失败", warning_message)
-        else:
-            self.log_message("✓ 视频与字幕匹配检查通过！所有视频都找到了对应的字幕文件。")
-
-    def format_duration(self, seconds_float):
-        if not isinstance(seconds_float, (int, float)) or seconds_float < 0: return "00:00:00,000"
-        milliseconds = int((seconds_float % 1) * 1000)
-        seconds_int = int(seconds_float)
-        hours = seconds_int // 3600
-        minutes = (seconds_int % 3600) // 60
-        seconds = seconds_int % 60
-        return f"{hours:02d}:{minutes:02d}:{seconds:02d},{milliseconds:03d}"
-    
-    def format_duration_minutes_only(self, seconds_float):
-        """格式化时长为分钟:秒格式（用于文件夹时长显示）"""
-        if not isinstance(seconds_float, (int, float)) or seconds_float < 0: return "00:00"
-        seconds_int = int(seconds_float)
-        total_minutes = seconds_int // 60
-        seconds = seconds_int % 60
-        return f"{total_minutes}:{seconds:02d}"
-
-    def get_video_duration_ffprobe(self, video_path):
+    def _start_job(self, target, *args):
+        """在工作线程中运行扫描或合并任务，运行期间可暂停和取消"""
+        self.job_control.reset()
+        self._set_job_buttons(True)
+        threading.Thread(target=self._run_job, args=(target,) + args, daemon=True).start()
+
+    def _run_job(self, target, *args):
         try:
-            if not self.ffprobe_path:
-                self.log_message(f"警告: ffprobe不可用，跳过 '{os.path.basename(video_path)}' 时长获取")
-                return 0.0
-                
-            video_path_str = str(video_path); startupinfo = None
-            if os.name == 'nt': startupinfo = subprocess.STARTUPINFO(); startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW; startupinfo.wShowWindow = subprocess.SW_HIDE
-            process = subprocess.Popen(
-                [self.ffprobe_path, '-v', 'error', '-show_entries', 'format=duration', '-of', 'default=noprint_wrappers=1:nokey=1', video_path_str],
-                stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, startupinfo=startupinfo)
-            stdout, stderr = process.communicate(timeout=30)
-            if process.returncode != 0 or stderr: self.log_message(f"警告: ffprobe未能获取 '{os.path.basename(video_path_str)}' 时长. 错误: {stderr.strip() if stderr else '未知'}"); return 0.0
-            output = stdout.strip()
-            if not output: self.log_message(f"警告: ffprobe未能获取 '{os.path.basename(video_path_str)}' 时长 (无输出)."); return 0.0
-            # 使用Decimal来保持高精度
-            from decimal import Decimal, ROUND_HALF_UP
-            duration_decimal = Decimal(output).quantize(Decimal('0.001'), rounding=ROUND_HALF_UP)
-            return float(duration_decimal)
-        except subprocess.TimeoutExpired: self.log_message(f"获取 '{os.path.basename(video_path_str)}' 时长超时。"); return 0.0
-        except FileNotFoundError: self.log_message("错误: ffprobe 命令未找到。"); self.root.after(0, lambda: messagebox.showerror("ffprobe错误", "ffprobe 未找到")); return 0.0
-        except ValueError: self.log_message(f"无法转换ffprobe输出为时长: {output if 'output' in locals() else ''}"); return 0.0
-        except Exception as e: self.log_message(f"ffprobe获取 '{os.path.basename(video_path_str)}' 时长未知错误: {e}"); return 0.0
-
-    def get_video_framerate_ffprobe(self, video_path):
-        """获取视频帧率"""
+            target(*args)
+        except JobCancelled:
+            self.log_message("任务已取消。", LOG_WARNING)
+        finally:
+            if self.job_control.cancelled:
+                self.ui_events.publish(EVENT_STATUS, "已取消")
+            self._ui_call(self._set_job_buttons, False)
+
+    def _set_job_buttons(self, running):
+        self.pause_button.config(state=tk.NORMAL if running else tk.DISABLED, text="⏸ 暂停")
+        self.cancel_button.config(state=tk.NORMAL if running else tk.DISABLED)
+
+    def toggle_pause(self):
+        """暂停或继续当前任务：正在运行的ffprobe会先完成，之后的视频和字幕在检查点等待"""
+        if self.job_control.paused:
+            self.job_control.resume()
+            self.pause_button.config(text="⏸ 暂停")
+            self.log_message("任务继续。")
+            self.status_bar.config(text="继续处理...")
+        else:
+            self.job_control.pause()
+            self.pause_button.config(text="▶ 继续")
+            self.log_message("任务已暂停，正在运行的视频探测完成后停下。")
+            self.status_bar.config(text="已暂停")
+
+    def cancel_job(self):
+        """取消当前任务：结束正在运行的ffprobe，已探测的结果保留在缓存中，合并的输出文件保持不变"""
+        self.job_control.cancel()
+        self.pause_button.config(state=tk.DISABLED); self.cancel_button.config(state=tk.DISABLED)
+        self.log_message("正在取消...", LOG_WARNING)
+        self.status_bar.config(text="正在取消...")
+
+    def _collect_list_problems(self):
+        """
+        检查字幕问题和视频字幕匹配情况，整理成文件列表的问题标记（可在工作线程调用）
+        
+        返回: ({视频路径: 问题说明}, {字幕路径: 问题说明})
+        """
+        time_disorder_subtitles, large_time_diff_subtitles = self.check_subtitle_problems_after_scan()
+        unmatched_videos = self.check_video_subtitle_matching()
+        return self._list_problems_from(unmatched_videos, time_disorder_subtitles, large_time_diff_subtitles)
+
+    def _list_problems_from(self, unmatched_videos, time_disorder_subtitles, large_time_diff_subtitles):
+        """把匹配检查和字幕检查的结果整理成文件列表的问题标记（与检查在同一线程调用），返回值同 _collect_list_problems"""
+        video_problems, srt_problems = {}, {}
+        
+        def add(problems, key, text):
+            problems[key] = f"{problems[key]}；{text}" if key in problems else text
+        
+        for info in unmatched_videos:
+            add(video_problems, self.video_files_data[info['index'] - 1][1], "缺少字幕")
+        for info in time_disorder_subtitles:
+            add(video_problems, self.video_files_data[info['episode_num'] - 1][1], "时间轴乱序")
+            add(srt_problems, info['srt_path'], "时间轴乱序")
+        for info in large_time_diff_subtitles:
+            text = f"超出{info['time_diff']:.1f}秒"
+            add(video_problems, self.video_files_data[info['episode_num'] - 1][1], text)
+            add(srt_problems, info['srt_path'], text)
+        if self.video_files_data:
+            for srt_item in self.srt_files_data:
+                if not self.match_index.match_video(srt_item)[1]:
+                    add(srt_problems, srt_item[1], "无对应视频")
+        return video_problems, srt_problems
+
+    def _show_list_problems(self, video_problems, srt_problems):
+        """把问题标记写入两个文件列表（界面线程），扫描出错的视频也算作有问题"""
+        video_problems = dict(video_problems)
+        for full_path, values in zip(self.video_list.keys, self.video_list.rows):
+            if values[3] == "错误":
+                video_problems[full_path] = f"扫描错误；{video_problems[full_path]}" if full_path in video_problems else "扫描错误"
+        self.video_list.set_problems(video_problems); self.video_list.refresh()
+        self.srt_list.set_problems(srt_problems); self.srt_list.refresh()
+        self._update_list_problem_label()
+
+    def _update_list_problem_label(self):
+        video_count, srt_count = len(self.video_list.problems), len(self.srt_list.problems)
+        self.list_problem_label.config(text=f"有问题: 视频 {video_count} 个，字幕 {srt_count} 个" if video_count or srt_count else "")
+
+    def _on_problems_only_changed(self):
+        problems_only = self.problems_only_var.get()
+        for file_list in (self.video_list, self.srt_list):
+            file_list.set_problems_only(problems_only)
+            file_list.first = 0
+            file_list.refresh()
+
+    def _ui_call(self, func, *args, **kwargs):
+        """在界面线程的下一帧执行 func（任意线程调用）"""
+        self.ui_events.publish(EVENT_CALL, func, args, kwargs)
+
+    def _on_video_probed(self, index, framerate_display, duration_display):
+        """扫描结果按视频路径发给界面线程，同一帧内的多次更新合并后写入列表"""
+        full_path = self.video_files_data[index][1]
+        if self.watch_probed is not None:
+            self.watch_probed[full_path] = (framerate_display, duration_display)  # 列表重建前新增的视频不在列表中
+        self.ui_events.publish(EVENT_PROBE_DONE, full_path, framerate_display, duration_display)
+
+    def _on_progress(self, value, maximum=None):
+        self.ui_events.publish(EVENT_PROGRESS, value, maximum)
+
+    def _on_status(self, text):
+        self.ui_events.publish(EVENT_STATUS, text)
+
+    def _notify(self, kind, title, message):
+        self.ui_events.publish(EVENT_PROBLEM, kind, title, message)
+
+    def _pump_ui_events(self):
+        """按固定帧率处理工作线程发来的事件"""
         try:
-            if not self.ffprobe_path:
-                return "未知"
-                
-            video_path_str = str(video_path); startupinfo = None
-            if os.name == 'nt': 
-                startupinfo = subprocess.STARTUPINFO()
-                startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-                startupinfo.wShowWindow = subprocess.SW_HIDE
-            
-            # 使用ffprobe获取帧率信息
-            process = subprocess.Popen(
-                [self.ffprobe_path, '-v', 'error', '-select_streams', 'v:0', '-show_entries', 'stream=r_frame_rate', '-of', 'default=noprint_wrappers=1:nokey=1', video_path_str],
-                stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, startupinfo=startupinfo)
-            stdout, stderr = process.communicate(timeout=15)
-            
-            if process.returncode != 0 or stderr: 
-                return "错误"
-            
-            output = stdout.strip()
-            if not output: 
-                return "未知"
-            
-            # 解析帧率，通常格式为 "30/1" 或 "29970/1000"
-            if '/' in output:
-                numerator, denominator = output.split('/')
-                framerate = float(numerator) / float(denominator)
-                # 格式化为常见的帧率显示
-                if framerate.is_integer():
-                    return f"{int(framerate)}fps"
-                else:
-                    # 对于常见的帧率进行特殊处理
-                    if abs(framerate - 23.976) < 0.1:
-                        return "23.98fps"
-                    elif abs(framerate - 29.97) < 0.1:
-                        return "29.97fps"
-                    elif abs(framerate - 59.94) < 0.1:
-                        return "59.94fps"
-                    else:
-                        return f"{framerate:.2f}fps"
-            else:
-                framerate = float(output)
-                return f"{framerate:.2f}fps" if not framerate.is_integer() else f"{int(framerate)}fps"
-                
-        except subprocess.TimeoutExpired: 
-            return "超时"
-        except (FileNotFoundError, ValueError, ZeroDivisionError): 
-            return "错误"
-        except Exception: 
-            return "未知"
-
-    def get_video_frame_info_ffprobe(self, video_path):
-        """获取视频的帧数和精确帧率，并计算基于帧的精确时长"""
+            self._apply_ui_events()
+        finally:
+            self.root.after(UI_FRAME_INTERVAL_MS, self._pump_ui_events)
+
+    def _apply_ui_events(self):
+        batch = self.ui_events.drain()
+        # 先按顺序执行界面操作（可能重建列表），再写入合并后的行更新，最后更新进度和状态
+        for kind, payload in batch['ordered']:
+            if kind == EVENT_CALL:
+                func, args, kwargs = payload
+                func(*args, **kwargs)
+            elif kind == EVENT_PROBLEM:
+                problem_kind, title, message = payload
+                show = {'info': messagebox.showinfo, 'warning': messagebox.showwarning, 'error': messagebox.showerror}[problem_kind]
+                show(title, message)
+        if batch['rows']:
+            # 只改数据模型（列表已重建时不在其中的视频会被忽略），每帧只重绘一次可见行
+            for full_path, (framerate_display, duration_display) in batch['rows'].items():
+                self.video_list.update_row(full_path, {2: framerate_display, 3: duration_display})  # 帧数和帧率、时长
+            self.video_list.refresh()
+        if batch['progress'] is not None:
+            value, maximum = batch['progress']
+            if maximum is not None:
+                self.progress["maximum"] = maximum
+            self.progress["value"] = value
+        if batch['status'] is not None:
+            self.status_bar.config(text=batch['status'])
+
+    def log_message(self, message, level=LOG_INFO):
+        """记录日志（任意线程）：只放入队列，由 _drain_log_queue 在界面线程中成批显示"""
+        self.log_pipeline.put(message, level)
+
+    def _on_log_level_changed(self):
+        self.log_level = dict(LOG_LEVEL_CHOICES).get(self.log_level_var.get(), LOG_DEBUG)
+
+    def _drain_log_queue(self):
+        """定时取出队列中的日志，一次插入日志框，并只保留最近 LOG_MAX_LINES 行"""
         try:
-            if not self.ffprobe_path:
-                return None, None, None
-                
-            video_path_str = str(video_path)
-            startupinfo = None
-            if os.name == 'nt':
-                startupinfo = subprocess.STARTUPINFO()
-                startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-                startupinfo.wShowWindow = subprocess.SW_HIDE
-            
-            # 1. 获取帧率（分数形式，以获得最高精度）
-            process_fps = subprocess.Popen(
-                [self.ffprobe_path, '-v', 'error', '-select_streams', 'v:0', 
-                 '-show_entries', 'stream=r_frame_rate', 
-                 '-of', 'default=noprint_wrappers=1:nokey=1', video_path_str],
-                stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, startupinfo=startupinfo)
-            stdout_fps, stderr_fps = process_fps.communicate(timeout=15)
-            
-            if process_fps.returncode != 0 or not stdout_fps.strip():
-                self.log_message(f"  错误：无法获取 '{os.path.basename(video_path_str)}' 的帧率。{stderr_fps.strip()}")
-                return None, None, None
-
-            # 2. 获取总帧数
-            process_frames = subprocess.Popen(
-                [self.ffprobe_path, '-v', 'error', '-select_streams', 'v:0',
-                 '-show_entries', 'stream=nb_frames',
-                 '-of', 'default=noprint_wrappers=1:nokey=1', video_path_str],
-                stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, startupinfo=startupinfo)
-            stdout_frames, stderr_frames = process_frames.communicate(timeout=30)
-            
-            # 如果 nb_frames 不可用，尝试 count_frames（更慢但更可靠）
-            if not stdout_frames.strip() or stdout_frames.strip() == 'N/A':
-                self.log_message(f"  警告：nb_frames不可用，为 '{os.path.basename(video_path_str)}' 使用count_frames方法（较慢）")
-                process_frames = subprocess.Popen(
-                    [self.ffprobe_path, '-v', 'error', '-select_streams', 'v:0',
-                     '-count_frames', '-show_entries', 'stream=nb_read_frames',
-                     '-of', 'default=noprint_wrappers=1:nokey=1', video_path_str],
-                    stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, startupinfo=startupinfo)
-                stdout_frames, stderr_frames = process_frames.communicate(timeout=60)
-
-            if process_frames.returncode != 0 or not stdout_frames.strip() or stdout_frames.strip() == 'N/A':
-                self.log_message(f"  错误：无法获取 '{os.path.basename(video_path_str)}' 的总帧数。{stderr_frames.strip()}")
-                return None, None, None
-
-            # 3. 解析并计算
-            fps_str = stdout_fps.strip()
-            if '/' in fps_str:
-                fps_num, fps_den = map(int, fps_str.split('/'))
-                if fps_den == 0: return None, None, None # 防止除以零
-                fps_decimal = fps_num / fps_den
-            else:
-                fps_decimal = float(fps_str)
-
-            total_frames = int(stdout_frames.strip())
-            
-            # 核心逻辑：使用帧数和帧率计算精确时长（秒）
-            if fps_decimal > 0:
-                calculated_duration = total_frames / fps_decimal
-            else:
-                return None, None, None
-
-            return total_frames, fps_decimal, calculated_duration
-            
-        except Exception as e:
-            self.log_message(f"获取视频帧信息失败: {str(e)}")
-            return None, None, None
+            records = self.log_pipeline.drain()
+            lines = [f"[{timestamp}] {message}\n" for timestamp, level, message in records if level >= self.log_level]
+            if lines:
+                self.log_text.insert(tk.END, ''.join(lines))
+                line_count = int(self.log_text.index('end-1c').split('.')[0])
+                if line_count > LOG_MAX_LINES:
+                    self.log_text.delete('1.0', f'{line_count - LOG_MAX_LINES + 1}.0')
+                self.log_text.see(tk.END)
+        finally:
+            self.root.after(LOG_DRAIN_INTERVAL_MS, self._drain_log_queue)
 
-    def log_message(self, message):
-        timestamp = time.strftime("%H:%M:%S", time.localtime()); self.root.after(0, lambda: self._append_log_message(f"[{timestamp}] {message}\n"))
-    def _append_log_message(self, formatted_message):
-        self.log_text.insert(tk.END, formatted_message); self.log_text.see(tk.END)
     def clear_log(self): self.log_text.delete(1.0, tk.END)
-    
+
     def reset_all(self):
         """重置所有内容，清空路径和文件列表"""
-        if self.processing:
+        if self._is_busy():
             messagebox.showinfo("提示", "正在处理中，无法重置。")
             return
         
@@ -1196,7 +1208,16 @@ class SubtitleMerger:
         
         if not result:
             return
-        
+        if not self._try_begin_task():  # 确认期间监视模式可能开始了自动合并
+            messagebox.showinfo("提示", "正在处理中，无法重置。")
+            return
+        try:
+            self._stop_watch()
+            self._reset_all_state()
+        finally:
+            self._end_task()
+
+    def _reset_all_state(self):
         # 清空路径输入框
         self.video_folder_entry.delete(0, tk.END)
         self.srt_folder_entry.delete(0, tk.END)
@@ -1209,16 +1230,20 @@ class SubtitleMerger:
         self.custom_end_entry.insert(0, "0")
         
         # 清空文件列表
-        self.video_tree.delete(*self.video_tree.get_children())
-        self.srt_tree.delete(*self.srt_tree.get_children())
-        self.folder_duration_tree.delete(*self.folder_duration_tree.get_children())
+        self.video_list.clear(); self.video_list.refresh()
+        self.srt_list.clear(); self.srt_list.refresh()
+        self._update_list_problem_label()
+        self._clear_folder_duration_tree()
         
         # 重置数据
         self.video_files_data = []
         self.srt_files_data = []
-        self.folder_durations = {}
-        self.total_duration_seconds = 0.0
-        self.auto_scan_scheduled = False
+        self.match_index = SubtitleMatchIndex([], [])
+        self.subtitle_cache.clear()
+        self.merge_artifacts.clear()
+        self._reset_duration_stats()
+        self.scanned_video_folder = None
+        self.video_file_stats = {}
         
         # 更新标签
         self.video_count_label.config(text="视频文件总数: 0")
@@ -1229,6 +1254,7 @@ class SubtitleMerger:
         # 禁用合并按钮
         self.merge_all_button.config(state=tk.DISABLED)
         self.custom_merge_button.config(state=tk.DISABLED)
+        self.multi_merge_button.config(state=tk.DISABLED)
         
         # 重置进度条
         self.progress["value"] = 0
@@ -1241,617 +1267,38 @@ class SubtitleMerger:
         
         self.log_message("✓ 所有内容已重置，可以开始新的任务！")
 
-    def _backup_output_file(self, output_path):
-        """备份已存在的输出文件"""
-        if not self.backup_var.get() or not os.path.exists(output_path):
-            return
-        
-        backup_idx = 0
-        backup_path_base = output_path + ".bak"
-        backup_path = backup_path_base
-        
-        while os.path.exists(backup_path):
-            backup_idx += 1
-            backup_path = f"{backup_path_base}{backup_idx}"
-        
-        try:
-            os.rename(output_path, backup_path)
-            self.log_message(f"已创建备份: {backup_path}")
-        except Exception as e:
-            self.log_message(f"备份失败: {str(e)}")
-
-    def _check_subtitle_time_disorder(self, subs, srt_name):
-        """
-        检查字幕时间轴是否乱序
-        
-        返回: (是否乱序, 详细信息字符串)
-        """
-        if len(subs) <= 1:
-            return False, ""
-        
-        for idx in range(1, len(subs)):
-            prev_sub = subs[idx - 1]
-            curr_sub = subs[idx]
-            
-            prev_time_ms = (prev_sub.start.hours * 3600000 + 
-                           prev_sub.start.minutes * 60000 + 
-                           prev_sub.start.seconds * 1000 + 
-                           prev_sub.start.milliseconds)
-            curr_time_ms = (curr_sub.start.hours * 3600000 + 
-                           curr_sub.start.minutes * 60000 + 
-                           curr_sub.start.seconds * 1000 + 
-                           curr_sub.start.milliseconds)
-            
-            if curr_time_ms < prev_time_ms:
-                regression_details = f"第{idx}条 ({self.format_duration(curr_time_ms/1000)}) < 第{idx+1}条 ({self.format_duration(prev_time_ms/1000)})"
-                return True, regression_details
-        
-        return False, ""
-
-    def _check_and_fix_subtitle_duration(self, subs, video_duration_seconds, video_name, srt_name, processed_count):
-        """
-        检查并修正字幕时长
-        
-        返回: (修正信息dict或None, 超出时长问题dict或None)
-        """
-        if len(subs) == 0:
-            return None, None
-        
-        # 找到最大结束时间
-        max_end_time_ms = 0
-        max_end_sub = None
-        for sub in subs:
-            end_time_ms = (sub.end.hours * 3600000 + 
-                          sub.end.minutes * 60000 + 
-                          sub.end.seconds * 1000 + 
-                          sub.end.milliseconds)
-            if end_time_ms > max_end_time_ms:
-                max_end_time_ms = end_time_ms
-                max_end_sub = sub
-        
-        srt_end_time_seconds = max_end_time_ms / 1000.0
-        time_diff = srt_end_time_seconds - video_duration_seconds
-        
-        if abs(time_diff) <= 0.01:
-            self.log_message(f"  ✓ 字幕时长完美（差异 {time_diff:.3f}秒）")
-            return None, None
-        
-        if time_diff > 0:
-            # 字幕超出视频时长
-            formatted_vid_dur = self.format_duration(video_duration_seconds)
-            self.log_message(f"  ⚠️ 警告：字幕结束时间超出视频时长 {time_diff:.3f}秒")
-            self.log_message(f"     字幕最大结束: {self.format_duration(srt_end_time_seconds)}")
-            self.log_message(f"     视频时长: {formatted_vid_dur}")
-            
-            if time_diff > 3.0:
-                # 超过3秒，记录问题但不修正
-                large_diff_info = {
-                    'video_name': video_name,
-                    'srt_name': srt_name,
-                    'episode_num': processed_count + 1,
-                    'episode_display': srt_name,
-                    'time_diff': time_diff,
-                    'srt_end': self.format_duration(srt_end_time_seconds),
-                    'video_duration': formatted_vid_dur
-                }
-                self.log_message(f"     ⚠️ 超出时间过长（>{time_diff:.3f}秒），建议检查字幕和视频是否匹配")
-                return None, large_diff_info
-            else:
-                # 小于3秒，自动修正
-                correction_info = {
-                    'video_name': video_name,
-                    'srt_name': srt_name,
-                    'episode_num': processed_count + 1,
-                    'episode_display': srt_name,
-                    'time_diff': time_diff,
-                    'srt_end': self.format_duration(srt_end_time_seconds),
-                    'video_duration': formatted_vid_dur
-                }
-                
-                # 修正最大结束时间的字幕
-                if max_end_sub:
-                    video_duration_ms = round(video_duration_seconds * 1000)
-                    max_end_sub.end.hours = video_duration_ms // 3600000
-                    max_end_sub.end.minutes = (video_duration_ms % 3600000) // 60000
-                    max_end_sub.end.seconds = (video_duration_ms % 60000) // 1000
-                    max_end_sub.end.milliseconds = video_duration_ms % 1000
-                    
-                    self.log_message(f"     ✓ 已自动修正为: {formatted_vid_dur}")
-                
-                return correction_info, None
-        elif time_diff < -0.01:
-            # 字幕提前结束是正常的
-            self.log_message(f"  ℹ️ 字幕提前结束 {abs(time_diff):.3f}秒（正常）")
-        
-        return None, None
-
-    def _apply_time_offset_to_subtitle(self, subs, offset_ms):
-        """
-        对字幕应用时间偏移
-        
-        参数:
-            subs: 字幕对象列表
-            offset_ms: 偏移量（毫秒）
-        """
-        for sub in subs:
-            # 转换开始时间为毫秒
-            start_ms = (sub.start.hours * 3600000 + 
-                       sub.start.minutes * 60000 + 
-                       sub.start.seconds * 1000 + 
-                       sub.start.milliseconds)
-            new_start_ms = start_ms + offset_ms
-            
-            sub.start.hours = new_start_ms // 3600000
-            sub.start.minutes = (new_start_ms % 3600000) // 60000
-            sub.start.seconds = (new_start_ms % 60000) // 1000
-            sub.start.milliseconds = new_start_ms % 1000
-            
-            # 转换结束时间为毫秒
-            end_ms = (sub.end.hours * 3600000 + 
-                     sub.end.minutes * 60000 + 
-                     sub.end.seconds * 1000 + 
-                     sub.end.milliseconds)
-            new_end_ms = end_ms + offset_ms
-            
-            sub.end.hours = new_end_ms // 3600000
-            sub.end.minutes = (new_end_ms % 3600000) // 60000
-            sub.end.seconds = (new_end_ms % 60000) // 1000
-            sub.end.milliseconds = new_end_ms % 1000
-
-    def _show_merge_problems_summary(self, time_disorder_subtitles, large_time_diff_subtitles, show_dialog=True):
-        """显示合并过程中发现的问题汇总"""
-        has_problems = large_time_diff_subtitles or time_disorder_subtitles
-        
-        if not has_problems:
-            return
-        
-        self.log_message("")
-        self.log_message("="*70)
-        self.log_message("🚨🚨🚨 字幕文件问题汇总 🚨🚨🚨")
-        self.log_message("="*70)
-        
-        warning_details = []
-        
-        # 处理时间轴乱序
-        if time_disorder_subtitles:
-            self.log_message(f"\n【时间轴乱序】检测到 {len(time_disorder_subtitles)} 个字幕文件时间轴混乱：")
-            self.log_message("")
-            for info in time_disorder_subtitles:
-                file_display = os.path.splitext(info['srt_name'])[0]
-                self.log_message(f"🔀 {file_display}: {info['srt_name']}")
-                self.log_message(f"   视频: {info['video_name']}")
-                self.log_message(f"   问题: {info['details']}")
-                self.log_message("")
-                warning_details.append(f"{file_display}: 时间轴乱序")
-        
-        # 处理超出3秒
-        if large_time_diff_subtitles:
-            self.log_message(f"\n【超出时长】检测到 {len(large_time_diff_subtitles)} 个字幕文件超出视频时长超过3秒：")
-            self.log_message("")
-            for info in large_time_diff_subtitles:
-                file_display = os.path.splitext(info['srt_name'])[0]
-                self.log_message(f"⏰ {file_display}: {info['srt_name']}")
-                self.log_message(f"   视频: {info['video_name']}")
-                self.log_message(f"   超出: {info['time_diff']:.3f}秒")
-                self.log_message(f"   字幕结束: {info['srt_end']}")
-                self.log_message(f"   视频时长: {info['video_duration']}")
-                self.log_message("")
-                warning_details.append(f"{file_display}: 超出 {info['time_diff']:.1f}秒")
-        
-        self.log_message("="*70)
-        self.log_message("⚠️ 以上字幕文件未自动修正，建议手动检查！")
-        self.log_message("="*70)
-        self.log_message("")
-        
-        if not show_dialog:
-            return
-        
-        # 统一弹窗提醒
-        warning_message = "检测到字幕文件存在以下问题：\n\n"
-        
-        if time_disorder_subtitles:
-            warning_message += f"🔀 时间轴乱序：{len(time_disorder_subtitles)} 个文件\n"
-            warning_message += "   • 字幕时间轴前后顺序混乱\n"
-            warning_message += "   • 拖入视频软件会显示很长\n\n"
-        
-        if large_time_diff_subtitles:
-            warning_message += f"⏰ 超出时长：{len(large_time_diff_subtitles)} 个文件\n"
-            warning_message += "   • 字幕比视频长超过3秒\n"
-            warning_message += "   • 可能版本不匹配\n\n"
-        
-        warning_message += "可能的原因：\n"
-        warning_message += "• 字幕和视频版本不匹配\n"
-        warning_message += "• 字幕文件本身有问题\n"
-        warning_message += "• 视频帧率与字幕制作时不一致\n\n"
-        warning_message += "问题文件详情：\n"
-        
-        display_items = warning_details[:8]
-        warning_message += "\n".join(display_items)
-        
-        if len(warning_details) > 8:
-            warning_message += f"\n... 还有 {len(warning_details) - 8} 个文件"
-        
-        warning_message += "\n\n⚠️ 这些文件未自动修正，建议手动检查后重新处理！"
-        
-        self.root.after(0, lambda: messagebox.showwarning("字幕文件问题警告", warning_message))
-
-    def _show_correction_summary(self, corrected_subtitles):
-        """显示字幕修正汇总"""
-        if not corrected_subtitles:
-            self.log_message("")
-            self.log_message("="*70)
-            self.log_message("✓✓✓ 所有字幕时长检查通过！✓✓✓")
-            self.log_message("="*70)
-            self.log_message("所有字幕文件的结束时间都与视频时长完美匹配（误差<0.01秒）")
-            self.log_message("="*70)
-            self.log_message("")
-            return
-        
-        self.log_message("")
-        self.log_message("="*70)
-        self.log_message("⚠️⚠️⚠️ 字幕时长修正汇总报告 ⚠️⚠️⚠️")
-        self.log_message("="*70)
-        self.log_message(f"检测到 {len(corrected_subtitles)} 个字幕文件的结束时间超出视频时长，已自动修正：")
-        self.log_message("")
-        for info in corrected_subtitles:
-            self.log_message(f"❌ 第{info['episode_num']}集: {info['srt_name']}")
-            self.log_message(f"   视频: {info['video_name']}")
-            self.log_message(f"   超出: {info['time_diff']:.3f}秒")
-            self.log_message(f"   原字幕结束时间: {info['srt_end']}")
-            self.log_message(f"   修正为视频时长: {info['video_duration']}")
-            self.log_message("")
-        self.log_message("="*70)
-        self.log_message("✓ 所有超出的字幕已自动修正，确保后续集数字幕偏移准确！")
-        self.log_message("="*70)
-        self.log_message("")
-
-
     def _merge_srt_files_thread(self, output_path, videos_to_process, start_num_for_suffix, end_num_for_suffix, show_completion_dialog=True):
-        self.processing = True
-        self.status_bar.config(text="正在合并字幕...")
-        self.root.update_idletasks()
-        
-        # 生成带后缀的输出文件名
-        final_output_path = self.generate_output_filename_with_suffix(output_path, start_num_for_suffix, end_num_for_suffix)
-        self.log_message(f"字幕合并开始: {final_output_path}")
-        
         try:
-            # 1. 验证视频列表
-            selected_videos_data = videos_to_process
-            if not selected_videos_data:
-                self.log_message("错误：没有需要处理的视频文件。")
-                self.root.after(0, lambda: messagebox.showerror("错误", "未找到视频。"))
-                return
+            self.merge_subtitles(output_path, videos_to_process, start_num_for_suffix, end_num_for_suffix, show_completion_dialog)
+        finally:
+            self._end_task()
+            self._restore_merge_buttons()
 
-            self.log_message(f"准备合并 {len(selected_videos_data)} 个视频对应的字幕...")
-            all_subs_combined = pysrt.SubRipFile()
-            self.progress["maximum"] = len(selected_videos_data)
-            self.progress["value"] = 0
-            self.root.after(0, self.root.update_idletasks)
-
-            # 2. 备份已存在的输出文件
-            self._backup_output_file(final_output_path)
-
-            # 3. 初始化变量
-            cumulative_duration_ms = 0
-            corrected_subtitles = []
-            large_time_diff_subtitles = []
-            time_disorder_subtitles = []
-            processed_count = 0
-            for i, video_data_item in enumerate(selected_videos_data):
-                video_name = video_data_item[0]
-                video_full_path = video_data_item[1]
-                video_base_name = video_data_item[2]
-                video_duration_seconds = video_data_item[3]
-                video_frames = video_data_item[4] if len(video_data_item) > 4 else 0
-                video_fps = video_data_item[5] if len(video_data_item) > 5 else 0.0
-
-                # 核心逻辑：使用基于帧的精确时长
-                current_video_duration_seconds = 0.0
-                if video_fps > 0 and video_frames > 0:
-                    current_video_duration_seconds = video_frames / video_fps
-                else:
-                    # 如果帧信息缺失，回退到旧的时长，并发出严重警告
-                    current_video_duration_seconds = video_duration_seconds
-                    self.log_message(f"严重警告：视频 '{video_name}' 帧信息缺失，将使用可能不准确的流时长进行计算。")
-
-                # 确保我们使用的是预扫描的权威时长，不再实时获取
-                if current_video_duration_seconds == 0.0 or current_video_duration_seconds is None:
-                    self.log_message(f"严重警告：视频 '{video_name}' 在合并时计算出的时长为0。")
-                    self.log_message(f"         这将导致后续字幕的偏移量不准确。请在合并前确保所有视频时长都已成功扫描。")
-                    # 将时长强制设为0，避免None值导致崩溃
-                    current_video_duration_seconds = 0.0
-
-                # 使用统一的匹配函数
-                matched_srt_data = self.find_matching_subtitle(video_data_item)
-                
-                # 如果找到匹配，记录日志（仅当是EP模式匹配时）
-                if matched_srt_data:
-                    srt_fn = matched_srt_data[0]
-                    # 如果不是精确匹配，说明是通过EP模式匹配的
-                    if matched_srt_data[2].lower() != video_base_name.lower():
-                        self.log_message(f"通过EP集数匹配: 视频'{video_name}'与字幕'{srt_fn}'")
-                
-                if not matched_srt_data:
-                    self.log_message(f"❌ 严重错误：视频 '{video_name}' 找不到匹配的字幕文件！")
-                    self.log_message(f"             这会导致后续所有字幕的时间轴偏移错误。")
-                    self.log_message(f"             合并已终止，请先解决字幕匹配问题。")
-                    
-                    # 弹窗提示并终止合并
-                    error_msg = f"❌ 合并终止！\n\n"
-                    error_msg += f"视频文件找不到对应的字幕：\n"
-                    error_msg += f"• 视频: {video_name}\n"
-                    error_msg += f"• 位置: 第 {processed_count + 1} 个待处理文件\n\n"
-                    error_msg += f"⚠️ 如果继续合并，后续所有字幕的时间轴都会错位！\n\n"
-                    error_msg += f"🔧 请检查：\n"
-                    error_msg += f"1. 字幕文件是否存在\n"
-                    error_msg += f"2. 字幕文件命名是否与视频匹配\n"
-                    error_msg += f"3. 字幕文件是否包含EP前缀\n\n"
-                    error_msg += f"提示：合并前应该已检查过匹配情况，\n"
-                    error_msg += f"      如果仍出现此错误，请重新扫描文件。"
-                    
-                    self.root.after(0, lambda m=error_msg: messagebox.showerror("合并失败", m))
-                    return  # 直接终止合并
-
-                srt_name, srt_full_path, _ = matched_srt_data
-
-                if current_video_duration_seconds == 0.0 and i < len(selected_videos_data) - 1:
-                    self.log_message(f"警告：视频 '{video_name}' 时长为0。后续字幕偏移可能不准确。")
-
-                # 显示偏移信息
-                formatted_vid_dur = self.format_duration(current_video_duration_seconds)
-                formatted_offset = self.format_duration(cumulative_duration_ms / 1000.0)
-                
-                # 计算剪辑软件格式的时间（时:分:秒:帧）- 使用当前视频的帧率
-                if video_fps > 0:
-                    offset_hours = cumulative_duration_ms // 3600000
-                    offset_minutes = (cumulative_duration_ms % 3600000) // 60000
-                    offset_seconds_int = (cumulative_duration_ms % 60000) // 1000
-                    offset_ms_remainder = cumulative_duration_ms % 1000
-                    # 将剩余毫秒转换为帧数（使用当前视频的帧率）
-                    offset_frames = int((offset_ms_remainder / 1000.0) * video_fps)
-                    editor_format_offset = f"{offset_hours:02d}:{offset_minutes:02d}:{offset_seconds_int:02d}:{offset_frames:02d}"
-                else:
-                    editor_format_offset = "00:00:00:00"
-                
-                frame_info = f"{video_frames}帧@{video_fps:.3f}fps" if video_frames > 0 else "帧信息缺失"
-                self.log_message(f"处理字幕 [{processed_count+1}/{len(selected_videos_data)}]: '{srt_name}'")
-                self.log_message(f"  视频: '{video_name}' ({frame_info}, 时长: {formatted_vid_dur})")
-                self.log_message(f"  偏移: {formatted_offset} | 剪辑格式: {editor_format_offset} (累积: {cumulative_duration_ms}ms)")
-                
-                try:
-                    subs_for_current_file = pysrt.open(srt_full_path, encoding='utf-8')
-                except UnicodeDecodeError:
-                    try: 
-                        self.log_message(f"'{srt_name}' UTF-8解码失败，尝试GBK...")
-                        subs_for_current_file = pysrt.open(srt_full_path, encoding='gbk')
-                    except Exception as enc_e: 
-                        self.log_message(f"错误: 无法解码字幕 '{srt_name}': {enc_e}")
-                        # 即使解码失败，也必须累加时长，否则后续偏移会错误
-                        if video_duration_seconds > 0:
-                            video_duration_ms = math.ceil(video_duration_seconds * 1000)
-                            cumulative_duration_ms += video_duration_ms
-                            formatted_cumulative = self.format_duration(cumulative_duration_ms / 1000.0)
-                            self.log_message(f"  累积时长（解码失败后）: {cumulative_duration_ms}ms ({formatted_cumulative})")
-                        self.progress["value"] = i + 1
-                        continue
-                except Exception as e: 
-                    self.log_message(f"错误: 打开字幕 '{srt_name}' 失败: {e}")
-                    # 即使打开失败，也必须累加时长，否则后续偏移会错误
-                    if video_duration_seconds > 0:
-                        video_duration_ms = math.ceil(video_duration_seconds * 1000)
-                        cumulative_duration_ms += video_duration_ms
-                        formatted_cumulative = self.format_duration(cumulative_duration_ms / 1000.0)
-                        self.log_message(f"  累积时长（打开失败后）: {cumulative_duration_ms}ms ({formatted_cumulative})")
-                    self.progress["value"] = i + 1
-                    self.root.after(0, self.root.update_idletasks)
-                    continue
-                
-                # 检测字幕时间轴顺序
-                is_disorder, disorder_details = self._check_subtitle_time_disorder(subs_for_current_file, srt_name)
-                if is_disorder:
-                    self.log_message(f"  ⚠️ 检测到时间轴倒退: {disorder_details}")
-                    disorder_info = {
-                        'video_name': video_name,
-                        'srt_name': srt_name,
-                        'episode_num': processed_count + 1,
-                        'episode_display': srt_name,
-                        'details': disorder_details
-                    }
-                    time_disorder_subtitles.append(disorder_info)
-                    self.log_message(f"  ⚠️ 此字幕文件时间轴混乱，建议手动检查修复")
-                
-                # 检测并修正字幕时长
-                correction_info, large_diff_info = self._check_and_fix_subtitle_duration(
-                    subs_for_current_file, current_video_duration_seconds, 
-                    video_name, srt_name, processed_count
-                )
-                
-                if correction_info:
-                    corrected_subtitles.append(correction_info)
-                if large_diff_info:
-                    large_time_diff_subtitles.append(large_diff_info)
-                
-                # 应用时间偏移
-                if cumulative_duration_ms > 0:
-                    self.log_message(f"  应用偏移: {cumulative_duration_ms}毫秒 ({self.format_duration(cumulative_duration_ms / 1000.0)})")
-                    self._apply_time_offset_to_subtitle(subs_for_current_file, cumulative_duration_ms)
-                elif cumulative_duration_ms == 0:
-                    self.log_message(f"  首个视频，无需偏移")
-                else:
-                    self.log_message(f"  警告：累积时长异常，跳过偏移")
-                
-                all_subs_combined.extend(subs_for_current_file)
-                
-                # 累加时长（整数毫秒运算，完全精确）
-                # 在添加到合并列表之后立即累加，确保下一个视频使用正确的偏移量
-                if current_video_duration_seconds > 0:
-                    video_duration_ms = round(current_video_duration_seconds * 1000)
-                    cumulative_duration_ms += video_duration_ms  # 整数加法，完全精确，不会有任何误差累积
-                    formatted_cumulative = self.format_duration(cumulative_duration_ms / 1000.0)
-                    self.log_message(f"  累加后时长: {cumulative_duration_ms}ms ({formatted_cumulative})")
-                
-                processed_count +=1
-                self.progress["value"] = i + 1; self.root.after(0, self.root.update_idletasks)
-            
-            self.log_message(f"共成功匹配并处理了 {processed_count} 对影音文件。")
-            
-            # ===== 显示所有需要人工检查的字幕问题汇总 =====
-            # 统一弹窗提醒：时间轴乱序 + 超出3秒的情况
-            has_problems = large_time_diff_subtitles or time_disorder_subtitles
-            
-            if has_problems:
-                self.log_message("")
-                self.log_message("="*70)
-                self.log_message("🚨🚨🚨 字幕文件问题汇总 🚨🚨🚨")
-                self.log_message("="*70)
-                
-                warning_details = []
-                
-                # 处理时间轴乱序的情况
-                if time_disorder_subtitles:
-                    self.log_message(f"\n【时间轴乱序】检测到 {len(time_disorder_subtitles)} 个字幕文件时间轴混乱：")
-                    self.log_message("")
-                    for info in time_disorder_subtitles:
-                        file_display = os.path.splitext(info['srt_name'])[0]  # 去掉扩展名
-                        self.log_message(f"🔀 {file_display}: {info['srt_name']}")
-                        self.log_message(f"   视频: {info['video_name']}")
-                       
-                        self.log_message(f"   问题: {info['details']}")
-                        self.log_message("")
-                        warning_details.append(f"{file_display}: 时间轴乱序")
-                
-                # 处理超出3秒的情况
-                if large_time_diff_subtitles:
-                    self.log_message(f"\n【超出时长】检测到 {len(large_time_diff_subtitles)} 个字幕文件超出视频时长超过3秒：")
-                    self.log_message("")
-                    for info in large_time_diff_subtitles:
-                        file_display = os.path.splitext(info['srt_name'])[0]  # 去掉扩展名
-                        self.log_message(f"⏰ {file_display}: {info['srt_name']}")
-                        self.log_message(f"   视频: {info['video_name']}")
-                        self.log_message(f"   超出: {info['time_diff']:.3f}秒")
-                        self.log_message(f"   字幕结束: {info['srt_end']}")
-                        self.log_message(f"   视频时长: {info['video_duration']}")
-                        self.log_message("")
-                        warning_details.append(f"{file_display}: 超出 {info['time_diff']:.1f}秒")
-                
-                self.log_message("="*70)
-                self.log_message("⚠️ 以上字幕文件未自动修正，建议手动检查！")
-                self.log_message("="*70)
-                self.log_message("")
-                
-                # 统一弹窗提醒用户
-                warning_message = "检测到字幕文件存在以下问题：\n\n"
-                
-                if time_disorder_subtitles:
-                    warning_message += f"🔀 时间轴乱序：{len(time_disorder_subtitles)} 个文件\n"
-                    warning_message += "   • 字幕时间轴前后顺序混乱\n"
-                    warning_message += "   • 拖入视频软件会显示很长\n\n"
-                
-                if large_time_diff_subtitles:
-                    warning_message += f"⏰ 超出时长：{len(large_time_diff_subtitles)} 个文件\n"
-                    warning_message += "   • 字幕比视频长超过3秒\n"
-                    warning_message += "   • 可能版本不匹配\n\n"
-                
-                warning_message += "可能的原因：\n"
-                warning_message += "• 字幕和视频版本不匹配\n"
-                warning_message += "• 字幕文件本身有问题\n"
-                warning_message += "• 视频帧率与字幕制作时不一致\n\n"
-                warning_message += "问题文件详情：\n"
-                
-                # 限制弹窗显示的条目数量，避免过长
-                display_items = warning_details[:8]  # 最多显示8个
-                warning_message += "\n".join(display_items)
-                
-                if len(warning_details) > 8:
-                    warning_message += f"\n... 还有 {len(warning_details) - 8} 个文件"
-                
-                warning_message += "\n\n⚠️ 这些文件未自动修正，建议手动检查后重新处理！"
-                
-                if show_completion_dialog:
-                    self.root.after(0, lambda: messagebox.showwarning("字幕文件问题警告", warning_message))
-            
-            if corrected_subtitles:
-                self.log_message("")
-                self.log_message("="*70)
-                self.log_message("⚠️⚠️⚠️ 字幕时长修正汇总报告 ⚠️⚠️⚠️")
-                self.log_message("="*70)
-                self.log_message(f"检测到 {len(corrected_subtitles)} 个字幕文件的结束时间超出视频时长，已自动修正：")
-                self.log_message("")
-                for info in corrected_subtitles:
-                    self.log_message(f"❌ 第{info['episode_num']}集: {info['srt_name']}")
-                    self.log_message(f"   视频: {info['video_name']}")
-                    self.log_message(f"   超出: {info['time_diff']:.3f}秒")
-                    self.log_message(f"   原字幕结束时间: {info['srt_end']}")
-                    self.log_message(f"   修正为视频时长: {info['video_duration']}")
-                    self.log_message("")
-                self.log_message("="*70)
-                self.log_message("✓ 所有超出的字幕已自动修正，确保后续集数字幕偏移准确！")
-                self.log_message("="*70)
-                self.log_message("")
-            else:
-                self.log_message("")
-                self.log_message("="*70)
-                self.log_message("✓✓✓ 所有字幕时长检查通过！✓✓✓")
-                self.log_message("="*70)
-                self.log_message("所有字幕文件的结束时间都与视频时长完美匹配（误差<0.01秒）")
-                self.log_message("="*70)
-                self.log_message("")
-            # ===== 汇总结束 =====
-            
-            if len(all_subs_combined) > 0:
-                all_subs_combined.save(final_output_path, encoding='utf-8')
-                msg_s = f"字幕合并成功！共 {len(all_subs_combined)} 条字幕 ({processed_count}个文件)."; self.log_message(msg_s)
-                if show_completion_dialog:
-                    self.root.after(0, lambda m=msg_s: messagebox.showinfo("成功", m))
-            else:
-                warn_m = "合并结束，未找到有效字幕内容或未成功配对文件。"; self.log_message(warn_m)
-                if show_completion_dialog:
-                    self.root.after(0, lambda m=warn_m: messagebox.showwarning("无内容", m))
+    def _disable_merge_buttons(self):
+        for button in (self.merge_all_button, self.custom_merge_button, self.multi_merge_button):
+            button.config(state=tk.DISABLED)
 
-        except Exception as e:
-            import traceback; error_details = f"合并过程严重错误: {e}\n{traceback.format_exc()}"
-            self.log_message(error_details)
-            if show_completion_dialog:
-                self.root.after(0, lambda m=error_details: messagebox.showerror("严重错误", m))
-        finally:
-            self.processing = False
-            # 恢复按钮状态
-            has_videos = len(self.video_files_data) > 0
-            self.root.after(0, lambda: self.merge_all_button.config(state=tk.NORMAL if has_videos else tk.DISABLED))
-            self.root.after(0, lambda: self.custom_merge_button.config(state=tk.NORMAL if has_videos else tk.DISABLED))
-            self.root.after(0, lambda: self.status_bar.config(text="就绪"))
-            self.root.after(0, lambda: self.progress.config(value=0)); self.root.after(0, self.root.update_idletasks)
+    def _restore_merge_buttons(self):
+        """合并结束后恢复按钮状态"""
+        has_videos = len(self.video_files_data) > 0
+        for button in (self.merge_all_button, self.custom_merge_button, self.multi_merge_button):
+            self._ui_call(button.config, state=tk.NORMAL if has_videos else tk.DISABLED)
 
     def get_video_duration_from_tree_or_probe(self, video_full_path, video_name, original_list_idx):
-        """辅助函数: 尝试从Treeview获取时长，否则调用ffprobe"""
+        """辅助函数: 尝试从列表的数据模型（video_files_data）取扫描过的时长，否则调用ffprobe"""
         video_duration_seconds = 0.0
-        if original_list_idx != -1 and original_list_idx < len(self.video_tree.get_children()):
-            video_item_id = self.video_tree.get_children()[original_list_idx]
-            duration_str = self.video_tree.item(video_item_id, 'values')[3]  # 时长列现在是索引3
-            if duration_str not in ["待扫描", "错误"]:
-                try:
-                    # 处理包含毫秒的时间格式 "00:00:00,000" 或 "00:00:00.000"
-                    parts = duration_str.split(':')
-                    if len(parts) == 3:
-                        h, m = int(parts[0]), int(parts[1])
-                        # 处理秒部分，可能包含小数
-                        s_part = parts[2].replace(',', '.')  # 统一替换逗号为点号
-                        s = float(s_part)
-                        video_duration_seconds = float(h * 3600 + m * 60 + s)
-                    else:
-                        # 原始处理方式作为后备
-                        h, m, s = map(int, duration_str.split(':'))
-                        video_duration_seconds = float(h * 3600 + m * 60 + s)
-                except ValueError:
-                    self.log_message(f"警告：列表解析视频 '{video_name}' 时长 ('{duration_str}')失败。重新获取。")
-                    video_duration_seconds = self.get_video_duration_ffprobe(video_full_path)
+        if 0 <= original_list_idx < len(self.video_files_data):
+            video_duration_seconds = float(self.video_files_data[original_list_idx][3] or 0.0)  # 扫描时写入的时长（秒）
+            if video_duration_seconds <= 0:
+                self.log_message(f"警告：视频 '{video_name}' 尚未扫描时长，直接获取。")
+                video_duration_seconds = self.get_video_duration_ffprobe(video_full_path)
         else:
             self.log_message(f"警告：视频 '{video_name}' 未在列表找到，直接获取时长。")
             video_duration_seconds = self.get_video_duration_ffprobe(video_full_path)
         return video_duration_seconds
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # 打包为exe后解析进程池需要
     root = tk.Tk()
     app = SubtitleMerger(root)
     root.mainloop()